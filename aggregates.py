@@ -1,6 +1,6 @@
-import time
+import asyncio, time
 from typing import Optional
-from db import upsert_agg, get_agg, upsert_position, get_position, add_event
+from db import load_wallet_state, save_wallet_state
 from dex import dexscreener_token
 
 async def price_for_mint(mint: str) -> float:
@@ -13,10 +13,25 @@ async def price_for_mint(mint: str) -> float:
         pass
     return 0.0
 
-async def apply_swap_event(ev: dict):
-    # Update positions and realized PnL with an avg-cost model (lightweight)
-    addr = ev["address"]
-    ts = int(ev["ts"] or time.time())
+# Called as fn(address, results) after each committed batch (alerts, stats).
+# Listeners run inline on the event loop and must not block.
+SWAP_LISTENERS: list = []
+
+def add_swap_listener(fn):
+    SWAP_LISTENERS.append(fn)
+
+def notify_swap_listeners(address: str, results: list):
+    # Also used by the bot to deliver batches committed by tracker workers
+    for fn in SWAP_LISTENERS:
+        try:
+            fn(address, results)
+        except Exception:
+            pass
+
+def _apply_one(state: dict, positions: dict, dirty: set, ev: dict, prices: dict, mint_pnl: Optional[dict] = None) -> tuple[str, float]:
+    # Update positions and realized PnL with an avg-cost model (lightweight).
+    # Mutates `state`/`positions` in memory and returns (event summary, pnl_usd).
+    # PnL realized per sold mint is added to `mint_pnl` ({mint: pnl_usd}) if given.
     sig = ev.get("sig")
 
     in_mint = ev["in"].get("mint")
@@ -24,18 +39,11 @@ async def apply_swap_event(ev: dict):
     out_mint = ev["out"].get("mint")
     out_qty = float(ev["out"].get("qty") or 0)
 
-    agg = await get_agg(addr) or {}
-    total_trades = int(agg.get("total_trades", 0)) + 1
-    wins = int(agg.get("wins", 0))
-    losses = int(agg.get("losses", 0))
-    realized_usd = float(agg.get("realized_pnl_usd", 0) or 0)
-    realized_sol = float(agg.get("realized_pnl_sol", 0) or 0)
-    best_play_sig = agg.get("best_play_sig")
-    best_play_pnl_usd = float(agg.get("best_play_pnl_usd", 0) or 0)
+    state["total_trades"] += 1
 
     # Price lookups (could be 0 if not on DexScreener)
-    in_price = await price_for_mint(in_mint) if in_mint else 0.0
-    out_price = await price_for_mint(out_mint) if out_mint else 0.0
+    in_price = prices.get(in_mint, 0.0) if in_mint else 0.0
+    out_price = prices.get(out_mint, 0.0) if out_mint else 0.0
 
     # Naive notional values
     in_notional = in_qty * in_price
@@ -46,7 +54,7 @@ async def apply_swap_event(ev: dict):
     pnl_usd = 0.0
 
     # If out_mint corresponds to a token we previously held and we're decreasing qty, compute realized PnL
-    pos = await get_position(addr, out_mint) if out_mint else None
+    pos = positions.get(out_mint) if out_mint else None
     if pos:
         prev_qty = float(pos.get("qty", 0) or 0)
         prev_avg = float(pos.get("avg_cost_usd", 0) or 0)
@@ -56,20 +64,24 @@ async def apply_swap_event(ev: dict):
             proceeds = sell_qty * out_price
             cost_basis = sell_qty * prev_avg
             pnl_usd = proceeds - cost_basis
+            if mint_pnl is not None:
+                mint_pnl[out_mint] = mint_pnl.get(out_mint, 0.0) + pnl_usd
             # Reduce position
             new_qty = max(0.0, prev_qty - sell_qty)
             # avg_cost remains same if qty>0
-            await upsert_position(addr, out_mint, new_qty, prev_avg if new_qty>0 else 0.0)
-    else:
+            positions[out_mint] = {"qty": new_qty, "avg_cost_usd": prev_avg if new_qty>0 else 0.0}
+            dirty.add(out_mint)
+    elif out_mint:
         # If no prior position for out_mint and we are receiving out_mint (buy), update avg cost
         if out_qty > 0:
             # treat in_notional as cost for out_qty
             avg_cost = (in_notional / out_qty) if out_qty else 0.0
-            await upsert_position(addr, out_mint, out_qty, avg_cost)
+            positions[out_mint] = {"qty": out_qty, "avg_cost_usd": avg_cost}
+            dirty.add(out_mint)
 
     # If we are spending in_mint (selling), update positions for in_mint
     if in_qty > 0:
-        pos_in = await get_position(addr, in_mint) if in_mint else None
+        pos_in = positions.get(in_mint) if in_mint else None
         if pos_in:
             prev_qty = float(pos_in.get("qty", 0) or 0)
             prev_avg = float(pos_in.get("avg_cost_usd", 0) or 0)
@@ -78,36 +90,82 @@ async def apply_swap_event(ev: dict):
             cost_basis = sell_qty * prev_avg
             pnl_from_sale = proceeds - cost_basis
             pnl_usd += pnl_from_sale
+            if mint_pnl is not None:
+                mint_pnl[in_mint] = mint_pnl.get(in_mint, 0.0) + pnl_from_sale
             new_qty = max(0.0, prev_qty - sell_qty)
-            await upsert_position(addr, in_mint, new_qty, prev_avg if new_qty>0 else 0.0)
+            positions[in_mint] = {"qty": new_qty, "avg_cost_usd": prev_avg if new_qty>0 else 0.0}
+            dirty.add(in_mint)
 
     # Update aggregate counters
     if pnl_usd > 0:
-        wins += 1
+        state["wins"] += 1
     elif pnl_usd < 0:
-        losses += 1
-
-    realized_usd += pnl_usd
-
-    if pnl_usd > best_play_pnl_usd:
-        best_play_pnl_usd = pnl_usd
-        best_play_sig = sig
-        best_summary = f"Swap {in_qty:.6g} {in_mint} -> {out_qty:.6g} {out_mint} | PnL ${pnl_usd:.2f}"
-    else:
-        best_summary = agg.get("best_play_summary") or ""
-
-    await add_event(addr, ts, sig or "", f"SWAP: {in_qty:.6g} {in_mint} -> {out_qty:.6g} {out_mint} | pnl ${pnl_usd:.2f}")
-
-    await upsert_agg(
-        addr,
-        last_sig=sig,
-        total_trades=total_trades,
-        wins=wins,
-        losses=losses,
-        realized_pnl_sol=realized_sol,
-        realized_pnl_usd=realized_usd,
-        best_play_sig=best_play_sig,
-        best_play_pnl_usd=best_play_pnl_usd,
-        best_play_summary=best_summary,
-        updated_at=int(time.time())
+        state["losses"] += 1
+
+    state["realized_pnl_usd"] += pnl_usd
+
+    if pnl_usd > state["best_play_pnl_usd"]:
+        state["best_play_pnl_usd"] = pnl_usd
+        state["best_play_sig"] = sig
+        state["best_play_summary"] = f"Swap {in_qty:.6g} {in_mint} -> {out_qty:.6g} {out_mint} | PnL ${pnl_usd:.2f}"
+
+    state["last_sig"] = sig
+    return f"SWAP: {in_qty:.6g} {in_mint} -> {out_qty:.6g} {out_mint} | pnl ${pnl_usd:.2f}", pnl_usd
+
+async def apply_swap_events(address: str, events: list[dict], last_sig: Optional[str] = None):
+    # Batch form of apply_swap_event: one read of the wallet's aggregate and the
+    # positions the events touch, in-memory avg-cost math, one write transaction.
+    # `last_sig` (if given) advances the wallet cursor in the same transaction.
+    # Returns one result dict per event once the batch is committed.
+    if not events and last_sig is None:
+        return []
+    mints = []
+    for ev in events:
+        for leg in (ev["in"], ev["out"]):
+            m = leg.get("mint")
+            if m and m not in mints:
+                mints.append(m)
+
+    (agg, positions), prices = await asyncio.gather(
+        load_wallet_state(address, mints),
+        asyncio.gather(*[price_for_mint(m) for m in mints]),
     )
+    prices = dict(zip(mints, prices))
+    agg = agg or {}
+    state = {
+        "last_sig": agg.get("last_sig"),
+        "total_trades": int(agg.get("total_trades", 0) or 0),
+        "wins": int(agg.get("wins", 0) or 0),
+        "losses": int(agg.get("losses", 0) or 0),
+        "realized_pnl_sol": float(agg.get("realized_pnl_sol", 0) or 0),
+        "realized_pnl_usd": float(agg.get("realized_pnl_usd", 0) or 0),
+        "best_play_sig": agg.get("best_play_sig"),
+        "best_play_pnl_usd": float(agg.get("best_play_pnl_usd", 0) or 0),
+        "best_play_summary": agg.get("best_play_summary") or "",
+    }
+
+    dirty = set()
+    mint_pnl = {}
+    rows = []
+    results = []
+    for ev in events:
+        ts = int(ev["ts"] or time.time())
+        summary, pnl_usd = _apply_one(state, positions, dirty, ev, prices, mint_pnl)
+        rows.append((ts, ev.get("sig") or "", summary))
+        results.append({
+            "address": address, "ts": ts, "sig": ev.get("sig"), "in": ev["in"], "out": ev["out"],
+            "pnl_usd": pnl_usd, "summary": summary,
+            "in_price": prices.get(ev["in"].get("mint"), 0.0), "out_price": prices.get(ev["out"].get("mint"), 0.0),
+        })
+
+    if last_sig is not None:
+        state["last_sig"] = last_sig
+    state["updated_at"] = int(time.time())
+    await save_wallet_state(address, state, {m: positions[m] for m in dirty}, rows, mint_pnl)
+    if results:
+        notify_swap_listeners(address, results)
+    return results
+
+async def apply_swap_event(ev: dict):
+    results = await apply_swap_events(ev["address"], [ev])
+    return results[0] if results else None
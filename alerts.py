@@ -0,0 +1,131 @@
+import asyncio, heapq, time
+from typing import Awaitable, Callable
+from pyrogram.errors import FloodWait
+from ratelimit import TokenBucket
+
+# Alert fan-out: an in-memory reverse index (address -> {user_id: name}) turns
+# each committed swap into per-chat lines, and a send queue delivers them
+# within Telegram's limits (global msgs/s, one message per chat per interval).
+# Lines that pile up for a chat while it waits are merged into one message.
+# Sends run concurrently (up to max_inflight, one per chat at a time) so the
+# global rate, not the Telegram round trip, bounds throughput.
+
+TG_MAX_LEN = 4096
+
+class SendQueue:
+    def __init__(self, send: Callable[[int, str], Awaitable[None]], global_rate: float = 25, per_chat_interval: float = 1.1,
+                 max_inflight: int = 16):
+        self.send = send
+        self.bucket = TokenBucket(global_rate)
+        self.per_chat_interval = per_chat_interval
+        self._slots = asyncio.Semaphore(max_inflight)
+        self._sending: set = set()  # chats with a send in flight
+        self._tasks: set = set()
+        self._pending: dict[int, list[str]] = {}
+        self._next_ok: dict[int, float] = {}  # chat -> earliest next send
+        self._heap: list = []  # (due, chat_id)
+        self._scheduled: set = set()
+        self._wake = asyncio.Event()
+        self.sent = 0
+        self.merged = 0
+        self.flood_waits = 0
+        self.dropped = 0
+
+    def enqueue(self, chat_id: int, line: str):
+        self._pending.setdefault(chat_id, []).append(line)
+        if chat_id not in self._scheduled:
+            self._schedule(chat_id, max(time.monotonic(), self._next_ok.get(chat_id, 0)))
+
+    def _schedule(self, chat_id: int, due: float):
+        self._scheduled.add(chat_id)
+        heapq.heappush(self._heap, (due, chat_id))
+        self._wake.set()
+
+    def _take(self, chat_id: int) -> str:
+        # Merge as many queued lines as fit in one Telegram message
+        lines = self._pending.get(chat_id) or []
+        parts, size = [], 0
+        while lines and (not parts or size + len(lines[0]) + 2 <= TG_MAX_LEN):
+            line = lines.pop(0)[:TG_MAX_LEN]
+            parts.append(line)
+            size += len(line) + 2
+        if not lines:
+            self._pending.pop(chat_id, None)
+        if len(parts) > 1:
+            self.merged += len(parts) - 1
+        return "\n\n".join(parts)
+
+    def depth(self) -> int:
+        return sum(len(v) for v in self._pending.values())
+
+    async def run(self):
+        while True:
+            if not self._heap:
+                self._wake.clear()
+                await self._wake.wait()
+                continue
+            due, chat_id = self._heap[0]
+            delay = due - time.monotonic()
+            if delay > 0:
+                self._wake.clear()
+                try:
+                    await asyncio.wait_for(self._wake.wait(), timeout=delay)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            heapq.heappop(self._heap)
+            self._scheduled.discard(chat_id)
+            if chat_id not in self._pending or chat_id in self._sending:
+                # Nothing left, or rescheduled when the in-flight send finishes
+                continue
+            await self._slots.acquire()
+            await self.bucket.acquire()
+            self._sending.add(chat_id)
+            task = asyncio.create_task(self._deliver(chat_id, self._take(chat_id)))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+            if len(self._next_ok) > 10000:
+                now = time.monotonic()
+                self._next_ok = {c: t for c, t in self._next_ok.items() if t > now}
+
+    async def _deliver(self, chat_id: int, text: str):
+        try:
+            await self.send(chat_id, text)
+            self.sent += 1
+            self._next_ok[chat_id] = time.monotonic() + self.per_chat_interval
+        except FloodWait as e:
+            # Put the text back in front and hold this chat for the requested time
+            self.flood_waits += 1
+            self._pending.setdefault(chat_id, []).insert(0, text)
+            self._next_ok[chat_id] = time.monotonic() + float(e.value or 1)
+        except Exception:
+            # Blocked bot, deleted chat, ...: drop the message
+            self.dropped += 1
+        finally:
+            self._sending.discard(chat_id)
+            self._slots.release()
+            if chat_id in self._pending and chat_id not in self._scheduled:
+                self._schedule(chat_id, max(time.monotonic(), self._next_ok.get(chat_id, 0)))
+
+class AlertDispatcher:
+    # Subscribers and their names come from the tracked registry (db.TRACKED),
+    # the same one ingestion follows, so there is no second copy to keep in sync
+    def __init__(self, queue: SendQueue, registry, max_age: float = 900):
+        self.queue = queue
+        self.registry = registry
+        self.max_age = max_age
+
+    def on_swaps(self, address: str, results: list):
+        # Swap listener: fan out fresh events to every user tracking `address`
+        users = self.registry.subscribers(address)
+        if not users:
+            return
+        # Backfilled history is recorded but not alerted
+        cutoff = time.time() - self.max_age
+        fresh = [r for r in results if r["ts"] >= cutoff]
+        if not fresh:
+            return
+        for user_id, name in users.items():
+            label = f"{name} ({address[:4]}…{address[-4:]})" if name else address
+            for r in fresh:
+                self.queue.enqueue(user_id, f"🔔 **{label}**\n{r['summary']}\n`{r['sig'] or ''}`")
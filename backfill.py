@@ -0,0 +1,96 @@
+import asyncio
+from typing import Optional
+from helio import PARSER, summarize_helius_tx
+from aggregates import apply_swap_events
+from metrics import SKIPPED_SIGNATURES
+
+# Gap backfill for one wallet: page back through getSignaturesForAddress with
+# the `before` cursor until last_sig (or max_depth), parse pages as they
+# arrive, then apply oldest-first. Each parsed chunk is committed together
+# with last_sig = its newest signature, so a crash midway leaves a valid
+# cursor and the next poll resumes from there. A signature Helius didn't
+# parse stops the backfill (with an error) before it: nothing past it is
+# applied and the cursor stays below it, so the next poll retries it. After
+# `max_parse_attempts` such polls the signature is skipped (and counted) so
+# one bad signature can't stall the wallet for good.
+
+# signature -> polls in a row that Helius returned nothing for it
+PARSE_FAILURES: dict[str, int] = {}
+
+async def new_signature_pages(sol, address: str, last_sig: Optional[str], max_depth: int,
+                              first_page: int = 25, page_size: int = 100, listed: Optional[set] = None):
+    # Yields newest-first pages of signatures strictly newer than last_sig.
+    # `listed` collects every signature the RPC returned, cursor included.
+    before = None
+    seen = 0
+    limit = first_page
+    while seen < max_depth:
+        limit = min(limit, max_depth - seen)
+        sigs = await sol.get_signatures(address, before=before, limit=limit)
+        page = [s.get("signature") for s in sigs if s.get("signature")]
+        if listed is not None:
+            listed.update(page)
+        if not page:
+            return
+        if last_sig and last_sig in page:
+            page = page[:page.index(last_sig)]
+            if page:
+                yield page
+            return
+        yield page
+        seen += len(page)
+        if len(sigs) < limit:
+            # Reached the start of the wallet's history
+            return
+        before = page[-1]
+        limit = page_size
+
+async def backfill_wallet(sol, address: str, last_sig: Optional[str], max_depth: int,
+                          page_size: int = 100, concurrency: int = 4, max_parse_attempts: int = 5,
+                          listed: Optional[set] = None) -> int:
+    # Returns the number of new signatures processed
+    sem = asyncio.Semaphore(concurrency)
+
+    async def parse(chunk: list[str]):
+        async with sem:
+            return await PARSER.parse(address, chunk)
+
+    chunks = []  # newest-first: (signatures, parse task)
+    try:
+        async for page in new_signature_pages(sol, address, last_sig, max_depth, page_size=page_size, listed=listed):
+            for i in range(0, len(page), page_size):
+                chunk = page[i:i+page_size]
+                chunks.append((chunk, asyncio.create_task(parse(chunk))))
+
+        total = 0
+        for chunk, task in reversed(chunks):
+            by_sig = {(tx.get("signature") or tx.get("txHash")): tx for tx in await task}
+            # Oldest first; the cursor only passes a signature that wasn't parsed
+            # once it has failed max_parse_attempts polls
+            events = []
+            applied = None
+            for sig in reversed(chunk):
+                tx = by_sig.get(sig)
+                if tx is None:
+                    failures = PARSE_FAILURES.get(sig, 0) + 1
+                    if failures < max_parse_attempts:
+                        PARSE_FAILURES[sig] = failures
+                        break
+                    PARSE_FAILURES.pop(sig, None)
+                    SKIPPED_SIGNATURES.inc()
+                    applied = sig
+                    total += 1
+                    continue
+                PARSE_FAILURES.pop(sig, None)
+                events.extend(summarize_helius_tx(tx, address))
+                applied = sig
+                total += 1
+            if applied is not None:
+                await apply_swap_events(address, events, last_sig=applied)
+            if applied != chunk[0]:
+                raise RuntimeError(f"Helius returned no parse for {address} signature {sig}; retrying from {applied or last_sig}")
+        return total
+    finally:
+        for _, task in chunks:
+            if not task.done():
+                task.cancel()
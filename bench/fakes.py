@@ -0,0 +1,214 @@
+import asyncio, random, time, ujson, websockets
+from aiohttp import web
+
+# Local stand-ins for Solana RPC (HTTP + logsSubscribe WS), Helius v0
+# transactions and DexScreener tokens, serving the shapes SolClient,
+# helio.helius_parse and dex.dexscreener_tokens read. Every request pays
+# `latency` seconds (with jitter) and fails with probability `error_rate`.
+
+B58 = "123456789ABCDEFGHJKLMNPQRSTUVWXYZabcdefghijkmnopqrstuvwxyz"
+
+def b58encode(raw: bytes) -> str:
+    n = int.from_bytes(raw, "big")
+    out = ""
+    while n:
+        n, r = divmod(n, 58)
+        out = B58[r] + out
+    pad = len(raw) - len(raw.lstrip(b"\0"))
+    return "1" * pad + out
+
+def random_pubkey(rng: random.Random) -> str:
+    return b58encode(bytes(rng.getrandbits(8) for _ in range(32)))
+
+class FakeChain:
+    # Synthetic swap history; `created` keeps the monotonic time each tx appeared
+    def __init__(self, n_wallets: int, n_mints: int = 50, seed: int = 1):
+        self.rng = random.Random(seed)
+        self.wallets = [random_pubkey(self.rng) for _ in range(n_wallets)]
+        self.mints = [random_pubkey(self.rng) for _ in range(n_mints)]
+        self.prices = {m: self.rng.uniform(0.0001, 200) for m in self.mints}
+        self.history: dict[str, list[str]] = {}  # wallet -> signatures, oldest first
+        self.txs: dict[str, dict] = {}
+        self.created: dict[str, float] = {}
+        self.listeners: list = []
+        self._n = 0
+
+    def new_tx(self, wallet: str) -> str:
+        self._n += 1
+        sig = b58encode(self._n.to_bytes(8, "big") + bytes(self.rng.getrandbits(8) for _ in range(56)))
+        a, b = self.rng.sample(self.mints, 2)
+        self.txs[sig] = {
+            "signature": sig,
+            "timestamp": int(time.time()),
+            "type": "SWAP",
+            # Padding stands in for the instruction/account blobs real responses carry
+            "instructions": [{"programId": a, "data": "x" * 64, "accounts": [wallet, a, b]}] * 4,
+            "accountData": [{"account": wallet, "nativeBalanceChange": -5000, "tokenBalanceChanges": []}] * 6,
+            "tokenTransfers": [{"fromUserAccount": wallet, "mint": a, "tokenAmount": 1.0}] * 2,
+            "events": {"swap": [{
+                "user": wallet,
+                "tokenInputs": [{"mint": a, "amount": round(self.rng.uniform(1, 1000), 6)}],
+                "tokenOutputs": [{"mint": b, "amount": round(self.rng.uniform(1, 1000), 6)}],
+            }]},
+        }
+        self.history.setdefault(wallet, []).append(sig)
+        self.created[sig] = time.monotonic()
+        for fn in self.listeners:
+            fn(wallet, sig)
+        return sig
+
+    def pick_wallet(self) -> str:
+        # Skewed activity: a few hot wallets, a long idle tail
+        i = min(len(self.wallets) - 1, int(self.rng.paretovariate(1.2)) - 1)
+        return self.wallets[i] if self.rng.random() < 0.7 else self.rng.choice(self.wallets)
+
+    async def produce(self, rate: float, until: float):
+        while time.monotonic() < until:
+            self.new_tx(self.pick_wallet())
+            await asyncio.sleep(self.rng.expovariate(rate))
+
+class FakeServers:
+    def __init__(self, chain: FakeChain, latency: float = 0.02, error_rate: float = 0.0, host: str = "127.0.0.1"):
+        self.chain = chain
+        self.latency = latency
+        self.error_rate = error_rate
+        self.host = host
+        self.counts = {"rpc": 0, "helius": 0, "dex": 0, "ws_notifications": 0, "errors": 0}
+        self._runner = None
+        self._ws_server = None
+        self._ws_subs: dict[str, list] = {}  # wallet -> [(ws, sub id)]
+        self.http_port = 0
+        self.ws_port = 0
+
+    async def _delay_or_fail(self) -> bool:
+        await asyncio.sleep(self.latency * random.uniform(0.5, 1.5))
+        if random.random() < self.error_rate:
+            self.counts["errors"] += 1
+            return True
+        return False
+
+    # ---- Solana JSON-RPC ----
+    def _rpc_result(self, method: str, params: list):
+        if method == "getSignaturesForAddress":
+            opts = params[1] if len(params) > 1 and isinstance(params[1], dict) else {}
+            hist = self.chain.history.get(params[0], [])
+            newest_first = hist[::-1]
+            start = 0
+            if opts.get("before"):
+                try:
+                    start = newest_first.index(opts["before"]) + 1
+                except ValueError:
+                    start = len(newest_first)
+            page = newest_first[start:start + int(opts.get("limit") or 1000)]
+            return [{"signature": s, "slot": 1, "err": None, "memo": None, "blockTime": self.chain.txs[s]["timestamp"]} for s in page]
+        if method == "getBalance":
+            return {"context": {"slot": 1}, "value": 1_000_000_000}
+        if method == "getMultipleAccounts":
+            return {"context": {"slot": 1}, "value": [{"lamports": 1_000_000_000, "owner": "11111111111111111111111111111111", "data": ["", "base64"], "executable": False, "rentEpoch": 0} for _ in params[0]]}
+        return None
+
+    async def rpc(self, request: web.Request):
+        self.counts["rpc"] += 1
+        body = await request.json(loads=ujson.loads)
+        if await self._delay_or_fail():
+            return web.Response(status=429, text="rate limited")
+        calls = body if isinstance(body, list) else [body]
+        out = [{"jsonrpc": "2.0", "id": c.get("id"), "result": self._rpc_result(c.get("method"), c.get("params") or [])} for c in calls]
+        return web.json_response(out if isinstance(body, list) else out[0], dumps=ujson.dumps)
+
+    # ---- Helius ----
+    async def helius(self, request: web.Request):
+        self.counts["helius"] += 1
+        sigs = await request.json(loads=ujson.loads)
+        if await self._delay_or_fail():
+            return web.Response(status=429, text="rate limited")
+        return web.json_response([self.chain.txs[s] for s in sigs if s in self.chain.txs], dumps=ujson.dumps)
+
+    # ---- DexScreener ----
+    async def dex(self, request: web.Request):
+        self.counts["dex"] += 1
+        if await self._delay_or_fail():
+            return web.Response(status=429, text="rate limited")
+        pairs = []
+        for mint in request.match_info["addrs"].split(","):
+            price = self.chain.prices.get(mint)
+            if price is None:
+                continue
+            pairs.append({
+                "chainId": "solana",
+                "pairAddress": mint[::-1],
+                "baseToken": {"address": mint, "name": mint[:6], "symbol": mint[:4]},
+                "quoteToken": {"address": "So11111111111111111111111111111111111111112", "symbol": "SOL"},
+                "priceUsd": str(price),
+                "liquidity": {"usd": 100000},
+                "volume": {"h1": 1000, "h6": 6000, "h24": 24000},
+                "txns": {"h1": {"buys": 10, "sells": 8}},
+                "fdv": 1e6,
+                "marketCap": 1e6,
+            })
+        return web.json_response({"pairs": pairs}, dumps=ujson.dumps)
+
+    # ---- logsSubscribe ----
+    async def _ws_handler(self, ws):
+        next_sub = 0
+        mine = []
+        try:
+            async for raw in ws:
+                msg = ujson.loads(raw)
+                if msg.get("method") == "logsSubscribe":
+                    next_sub += 1
+                    wallet = msg["params"][0]["mentions"][0]
+                    self._ws_subs.setdefault(wallet, []).append((ws, next_sub))
+                    mine.append((wallet, next_sub))
+                    await ws.send(ujson.dumps({"jsonrpc": "2.0", "id": msg["id"], "result": next_sub}))
+                elif msg.get("method") == "logsUnsubscribe":
+                    await ws.send(ujson.dumps({"jsonrpc": "2.0", "id": msg["id"], "result": True}))
+        except websockets.ConnectionClosed:
+            pass
+        finally:
+            for wallet, sub in mine:
+                subs = self._ws_subs.get(wallet) or []
+                if (ws, sub) in subs:
+                    subs.remove((ws, sub))
+
+    def _on_tx(self, wallet: str, sig: str):
+        for ws, sub in list(self._ws_subs.get(wallet) or []):
+            self.counts["ws_notifications"] += 1
+            msg = {"jsonrpc": "2.0", "method": "logsNotification", "params": {
+                "subscription": sub,
+                "result": {"context": {"slot": 1}, "value": {"signature": sig, "err": None, "logs": []}},
+            }}
+            asyncio.ensure_future(ws.send(ujson.dumps(msg)))
+
+    async def start(self):
+        app = web.Application(client_max_size=64 * 2**20)
+        app.router.add_post("/", self.rpc)
+        app.router.add_post("/v0/transactions", self.helius)
+        app.router.add_get("/latest/dex/tokens/{addrs}", self.dex)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self.host, 0)
+        await site.start()
+        self.http_port = site._server.sockets[0].getsockname()[1]
+        self._ws_server = await websockets.serve(self._ws_handler, self.host, 0, max_size=2**22)
+        self.ws_port = self._ws_server.sockets[0].getsockname()[1]
+        self.chain.listeners.append(self._on_tx)
+
+    def env(self) -> dict:
+        base = f"http://{self.host}:{self.http_port}"
+        return {
+            "PRIMARY_RPC_URL": base + "/",
+            "FALLBACK_RPC_URL": base + "/?fallback",
+            "QUICKNODE_RPC_URL": "",
+            "HELLOMOON_RPC_URL": "",
+            "WS_RPC_URL": f"ws://{self.host}:{self.ws_port}",
+            "HELIUS_URL": base + "/v0/transactions?api-key=",
+            "DEXSCREENER_URL": base + "/latest/dex/tokens/",
+        }
+
+    async def close(self):
+        if self._ws_server is not None:
+            self._ws_server.close()
+            await self._ws_server.wait_closed()
+        if self._runner is not None:
+            await self._runner.cleanup()
@@ -0,0 +1,180 @@
+import argparse, asyncio, importlib, json, os, resource, subprocess, sys, tempfile, time
+
+# Offline throughput benchmark. Each scale runs in its own process against the
+# local fakes in bench/fakes.py, driving the real scheduler -> poll_wallet ->
+# helius parse -> summarize_helius_tx -> apply_swap_events pipeline (or the
+# logsSubscribe path with --mode ws).
+#
+#   python -m bench.run --wallets 100,1000,10000,50000 --duration 60
+#   python -m bench.run --wallets 1000 --compare bench/results/<previous>.json
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(ROOT, "bench", "results")
+
+def percentile(xs: list, q: float) -> float:
+    if not xs:
+        return 0.0
+    xs = sorted(xs)
+    return xs[min(len(xs) - 1, int(q * len(xs)))]
+
+async def run_single(args) -> dict:
+    from bench.fakes import FakeChain, FakeServers
+
+    chain = FakeChain(args.single, n_mints=args.mints, seed=args.seed)
+    servers = FakeServers(chain, latency=args.latency_ms / 1000, error_rate=args.error_rate)
+    await servers.start()
+
+    tmp = tempfile.mkdtemp(prefix="solbench-")
+    os.environ.update(servers.env())
+    os.environ.update({
+        "SQLITE_PATH": os.path.join(tmp, "bench.db"),
+        "INGEST_MODE": args.mode,
+        "POLL_INTERVAL": str(args.poll_interval),
+        "POLL_RATE": str(args.poll_rate),
+        "POLL_CONCURRENCY": str(args.poll_concurrency),
+        "RPC_HEDGE": "0",
+    })
+    os.chdir(ROOT)  # init_db reads schema.sql relative to cwd
+    tracker = importlib.import_module("tracker")
+    import db
+    from aggregates import add_swap_listener
+
+    from helio import start_decoder, close_decoder
+    start_decoder(tracker.SETTINGS.helius_decode_workers)
+    await db.init_db()
+    latencies = []
+    applied = 0
+    measure_from = float("inf")
+
+    def on_swaps(address, results):
+        # Only swaps created inside the measured window count
+        nonlocal applied
+        now = time.monotonic()
+        for r in results:
+            created = chain.created.get(r["sig"])
+            if created is not None and created >= measure_from:
+                applied += 1
+                latencies.append(now - created)
+    add_swap_listener(on_swaps)
+
+    # Give every wallet a cursor so polls only chase new activity
+    for w in chain.wallets:
+        chain.new_tx(w)
+    for w in chain.wallets:
+        tracker.SCHEDULER.add(w)
+    tasks = [asyncio.create_task(tracker.SCHEDULER.run())]
+    if tracker.WS_MODE:
+        tasks.append(asyncio.create_task(tracker.LOGS.run()))
+        for w in chain.wallets:
+            await tracker.LOGS.add(w)
+
+    # Warm-up: let the initial pass over all wallets settle before measuring
+    await asyncio.sleep(args.warmup if args.warmup is not None else args.poll_interval * 1.5)
+    st0 = db.db_stats()
+    counts0 = dict(servers.counts)
+
+    t0 = measure_from = time.monotonic()
+    await chain.produce(args.tx_rate, t0 + args.duration)
+    await asyncio.sleep(args.drain)
+    elapsed = time.monotonic() - t0
+
+    for t in tasks:
+        t.cancel()
+    sched = tracker.SCHEDULER.stats()
+    counts = {k: servers.counts[k] - counts0.get(k, 0) for k in servers.counts}
+    st = db.db_stats()
+    writes = st["writes"] - st0["writes"]
+    commits = st["commits"] - st0["commits"]
+    from http_client import close_http
+    await close_http()
+    await db.close_db()
+    close_decoder()
+    await servers.close()
+
+    return {
+        "wallets": args.single,
+        "mode": args.mode,
+        "duration_s": round(elapsed, 2),
+        "tx_rate": args.tx_rate,
+        "events": applied,
+        "events_per_s": round(applied / elapsed, 2) if elapsed else 0.0,
+        "latency_p50_s": round(percentile(latencies, 0.50), 4),
+        "latency_p90_s": round(percentile(latencies, 0.90), 4),
+        "latency_p99_s": round(percentile(latencies, 0.99), 4),
+        "db_write_jobs_per_event": round(writes / applied, 3) if applied else None,
+        "db_commits_per_event": round(commits / applied, 3) if applied else None,
+        "requests": counts,
+        "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        "scheduler": sched,
+    }
+
+def print_table(rows: list, baseline: dict | None = None):
+    cols = ["wallets", "events_per_s", "latency_p50_s", "latency_p99_s", "db_commits_per_event", "peak_rss_mb"]
+    print(" | ".join(f"{c:>20}" for c in cols))
+    base = {(r["wallets"], r["mode"]): r for r in (baseline or {}).get("runs", [])}
+    for r in rows:
+        cells = []
+        prev = base.get((r["wallets"], r["mode"]))
+        for c in cols:
+            v = r.get(c)
+            cell = f"{v}"
+            if prev and c != "wallets" and isinstance(v, (int, float)) and isinstance(prev.get(c), (int, float)) and prev[c]:
+                cell += f" ({(v - prev[c]) / prev[c] * 100:+.0f}%)"
+            cells.append(f"{cell:>20}")
+        print(" | ".join(cells))
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__)
+    ap.add_argument("--wallets", default="100,1000,10000", help="comma-separated wallet counts")
+    ap.add_argument("--duration", type=float, default=30)
+    ap.add_argument("--warmup", type=float, default=None, help="seconds before measuring (default 1.5x poll interval)")
+    ap.add_argument("--drain", type=float, default=5)
+    ap.add_argument("--tx-rate", type=float, default=50, help="synthetic swaps per second")
+    ap.add_argument("--mints", type=int, default=50)
+    ap.add_argument("--latency-ms", type=float, default=20)
+    ap.add_argument("--error-rate", type=float, default=0.0)
+    ap.add_argument("--poll-interval", type=float, default=15)
+    ap.add_argument("--poll-rate", type=float, default=200, help="scheduler polls per second budget")
+    ap.add_argument("--poll-concurrency", type=int, default=64)
+    ap.add_argument("--mode", choices=["poll", "ws"], default="poll")
+    ap.add_argument("--seed", type=int, default=1)
+    ap.add_argument("--compare", help="previous results JSON to diff against")
+    ap.add_argument("--out", default=RESULTS_DIR)
+    ap.add_argument("--single", type=int, help=argparse.SUPPRESS)
+    args = ap.parse_args()
+
+    if args.single:
+        print(json.dumps(asyncio.run(run_single(args))))
+        return
+
+    runs = []
+    for n in [int(x) for x in args.wallets.split(",") if x]:
+        # One process per scale keeps RSS and module state independent
+        cmd = [sys.executable, "-m", "bench.run", "--single", str(n)]
+        if args.warmup is not None:
+            cmd += ["--warmup", str(args.warmup)]
+        for flag in ("duration", "drain", "tx_rate", "mints", "latency_ms", "error_rate",
+                     "poll_interval", "poll_rate", "poll_concurrency", "mode", "seed"):
+            cmd += ["--" + flag.replace("_", "-"), str(getattr(args, flag))]
+        proc = subprocess.run(cmd, cwd=ROOT, capture_output=True, text=True)
+        if proc.returncode != 0:
+            print(proc.stderr, file=sys.stderr)
+            sys.exit(proc.returncode)
+        runs.append(json.loads(proc.stdout.strip().splitlines()[-1]))
+        print(f"{n} wallets: {runs[-1]['events_per_s']} ev/s, p99 {runs[-1]['latency_p99_s']}s", file=sys.stderr)
+
+    os.makedirs(args.out, exist_ok=True)
+    stamp = time.strftime("%Y%m%d-%H%M%S", time.gmtime())
+    path = os.path.join(args.out, f"{stamp}-{args.mode}.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"created": stamp, "args": vars(args), "runs": runs}, f, indent=2)
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+    print_table(runs, baseline)
+    print(f"saved {path}")
+
+if __name__ == "__main__":
+    main()
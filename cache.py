@@ -0,0 +1,89 @@
+import asyncio, time
+from collections import OrderedDict
+
+class TTLCache:
+    # In-process TTL + LRU cache with stale-while-revalidate and single-flight
+    # loads: concurrent misses for one key share a single fetch. `fetch` must
+    # raise on failure; whatever it returns, None included, is cached.
+    def __init__(self, fetch, ttl: float, stale_ttl: float, max_entries: int, negative_ttl: float = 10):
+        self.fetch = fetch
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.negative_ttl = negative_ttl
+        self.max_entries = max(1, max_entries)
+        self._data: OrderedDict = OrderedDict()  # key -> (value, fetched_at)
+        self._inflight: dict = {}
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+
+    def _fresh_for(self, value) -> float:
+        # "Not found" answers are kept briefly so new listings show up soon
+        return self.ttl if value is not None else self.negative_ttl
+
+    async def _load(self, key):
+        task = asyncio.current_task()
+        try:
+            value = await self.fetch(key)
+            # Invalidated mid-fetch: waiters still get the value, the cache doesn't
+            if self._inflight.get(key) is task:
+                self._data[key] = (value, time.monotonic())
+                self._data.move_to_end(key)
+                while len(self._data) > self.max_entries:
+                    self._data.popitem(last=False)
+            return value
+        finally:
+            if self._inflight.get(key) is task:
+                del self._inflight[key]
+
+    def _refresh(self, key) -> asyncio.Task:
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.create_task(self._load(key))
+            self._inflight[key] = task
+        return task
+
+    async def get(self, key):
+        entry = self._data.get(key)
+        if entry is not None:
+            value, at = entry
+            age = time.monotonic() - at
+            fresh = self._fresh_for(value)
+            if age < fresh:
+                self.hits += 1
+                self._data.move_to_end(key)
+                return value
+            if age < fresh + self.stale_ttl:
+                # Serve stale, refresh in the background; errors keep the old entry
+                self.stale_hits += 1
+                self._data.move_to_end(key)
+                self._refresh(key).add_done_callback(lambda t: t.cancelled() or t.exception())
+                return value
+        self.misses += 1
+        # shield: one caller giving up must not cancel the shared fetch
+        return await asyncio.shield(self._refresh(key))
+
+    def peek(self, key):
+        # Cached value (fresh or stale) without ever fetching; None on a miss
+        entry = self._data.get(key)
+        return entry[0] if entry is not None else None
+
+    def warm(self, keys):
+        # Start background loads for keys not cached yet; _inflight holds the tasks
+        for key in keys:
+            if key not in self._data:
+                self._refresh(key).add_done_callback(lambda t: t.cancelled() or t.exception())
+
+    def invalidate(self, key):
+        # The next get() starts a new fetch even if one is in flight
+        self._data.pop(key, None)
+        self._inflight.pop(key, None)
+
+    def stats(self) -> dict:
+        return {
+            "size": len(self._data),
+            "inflight": len(self._inflight),
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+        }
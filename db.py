@@ -1,88 +1,148 @@
-import aiosqlite, time
 from typing import Optional, List, Tuple
 from settings import SETTINGS
+from metrics import db_op
+from storage import Storage
+from registry import TrackedRegistry
+
+# Storage entry points used by the rest of the bot. Each call is timed and
+# forwarded to the configured backend (STORAGE_BACKEND=sqlite|postgres).
+
+def make_backend() -> Storage:
+    if SETTINGS.storage_backend == "postgres":
+        from pg_store import PostgresStorage
+        return PostgresStorage(
+            SETTINGS.pg_dsn,
+            min_size=SETTINGS.pg_pool_min,
+            max_size=SETTINGS.pg_pool_max,
+            partition_days=SETTINGS.pg_partition_days,
+            retention_days=SETTINGS.events_retention_days,
+        )
+    from sqlite_store import SQLiteStorage
+    return SQLiteStorage(
+        SETTINGS.sqlite_path,
+        readers=SETTINGS.sqlite_readers,
+        batch_max=SETTINGS.sqlite_batch_max,
+        stmt_cache=SETTINGS.sqlite_stmt_cache,
+    )
+
+BACKEND = make_backend()
+
+# Tracked addresses in this process; load it with all_tracks() at startup
+TRACKED = TrackedRegistry()
 
 async def init_db():
-    async with aiosqlite.connect(SETTINGS.sqlite_path) as db:
-        with open("schema.sql", "r", encoding="utf-8") as f:
-            await db.executescript(f.read())
-        await db.commit()
+    await BACKEND.start()
+
+async def close_db():
+    await BACKEND.close()
 
+def db_stats() -> dict:
+    return BACKEND.stats()
+
+# Called as fn(address) after a write to a wallet's aggregate or events
+# commits in this process (reply caches). Must not block.
+WRITE_LISTENERS: list = []
+
+def add_write_listener(fn):
+    WRITE_LISTENERS.append(fn)
+
+def _notify_write(address: str):
+    for fn in WRITE_LISTENERS:
+        try:
+            fn(address)
+        except Exception:
+            pass
+
+# ---------------- Queries ----------------
+
+@db_op
 async def add_user(user_id: int):
-    async with aiosqlite.connect(SETTINGS.sqlite_path) as db:
-        await db.execute("INSERT OR IGNORE INTO users(user_id, created_at) VALUES(?,?)", (user_id, int(time.time())))
-        await db.commit()
+    await BACKEND.add_user(user_id)
 
+@db_op
 async def add_track(user_id: int, address: str, name: Optional[str]):
-    async with aiosqlite.connect(SETTINGS.sqlite_path) as db:
-        await db.execute(
-            "INSERT OR IGNORE INTO tracked_wallets(user_id,address,name,created_at) VALUES(?,?,?,?)",
-            (user_id, address, name, int(time.time()))
-        )
-        await db.commit()
+    await BACKEND.add_track(user_id, address, name)
+    TRACKED.add(user_id, address, name)
 
+@db_op
 async def rm_track(user_id: int, address: str) -> int:
-    async with aiosqlite.connect(SETTINGS.sqlite_path) as db:
-        cur = await db.execute("DELETE FROM tracked_wallets WHERE user_id=? AND address=?", (user_id, address))
-        await db.commit()
-        return cur.rowcount
+    deleted = await BACKEND.rm_track(user_id, address)
+    if deleted:
+        TRACKED.remove(user_id, address)
+    return deleted
 
+@db_op
 async def list_tracks(user_id: int) -> List[Tuple[str, Optional[str]]]:
-    async with aiosqlite.connect(SETTINGS.sqlite_path) as db:
-        cur = await db.execute("SELECT address, COALESCE(name,'') FROM tracked_wallets WHERE user_id=? ORDER BY created_at DESC", (user_id,))
-        return await cur.fetchall()
+    return await BACKEND.list_tracks(user_id)
 
+@db_op
+async def all_tracks() -> List[Tuple[int, str, Optional[str]]]:
+    return await BACKEND.all_tracks()
+
+@db_op
+async def tracked_addresses() -> set:
+    return await BACKEND.tracked_addresses()
+
+@db_op
 async def upsert_agg(address: str, **kwargs):
     # Minimal UPSERT helper
-    fields = ["last_sig","total_trades","wins","losses","realized_pnl_sol","realized_pnl_usd","best_play_sig","best_play_pnl_usd","best_play_summary","updated_at"]
-    cols = ",".join(fields)
-    placeholders = ",".join(["?"]*len(fields))
-    values = [kwargs.get(k) for k in fields]
-    async with aiosqlite.connect(SETTINGS.sqlite_path) as db:
-        await db.execute(
-            f"INSERT INTO wallet_aggregates(address,{cols}) VALUES(?,{placeholders})\n"
-            f"ON CONFLICT(address) DO UPDATE SET " + ",".join([f"{k}=excluded.{k}" for k in fields]),
-            [address] + values
-        )
-        await db.commit()
+    await BACKEND.upsert_agg(address, kwargs)
+    _notify_write(address)
 
+@db_op
 async def get_agg(address: str):
-    async with aiosqlite.connect(SETTINGS.sqlite_path) as db:
-        cur = await db.execute("SELECT * FROM wallet_aggregates WHERE address=?", (address,))
-        row = await cur.fetchone()
-        if not row:
-            return None
-        # Convert to dict for convenience
-        cols = [d[0] for d in cur.description]
-        return dict(zip(cols, row))
+    return await BACKEND.get_agg(address)
 
+@db_op
 async def upsert_position(address: str, mint: str, qty: float, avg_cost_usd: float):
-    async with aiosqlite.connect(SETTINGS.sqlite_path) as db:
-        await db.execute(
-            "INSERT INTO wallet_positions(address,mint,qty,avg_cost_usd,updated_at) VALUES(?,?,?,?,?)\n"
-            "ON CONFLICT(address,mint) DO UPDATE SET qty=excluded.qty, avg_cost_usd=excluded.avg_cost_usd, updated_at=excluded.updated_at",
-            (address, mint, qty, avg_cost_usd, int(time.time()))
-        )
-        await db.commit()
+    await BACKEND.upsert_position(address, mint, qty, avg_cost_usd)
 
+@db_op
 async def get_position(address: str, mint: str):
-    async with aiosqlite.connect(SETTINGS.sqlite_path) as db:
-        cur = await db.execute("SELECT qty, avg_cost_usd FROM wallet_positions WHERE address=? AND mint=?", (address, mint))
-        row = await cur.fetchone()
-        if not row:
-            return None
-        return {"qty": row[0], "avg_cost_usd": row[1]}
+    return await BACKEND.get_position(address, mint)
 
+@db_op
 async def add_event(address: str, ts: int, sig: str, summary: str):
-    async with aiosqlite.connect(SETTINGS.sqlite_path) as db:
-        await db.execute("INSERT INTO recent_events(address,ts,sig,summary) VALUES(?,?,?,?)", (address, ts, sig, summary))
-        # prune 90 days
-        cutoff = int(time.time()) - 90*24*3600
-        await db.execute("DELETE FROM recent_events WHERE ts<?", (cutoff,))
-        await db.commit()
+    await BACKEND.add_event(address, ts, sig, summary)
+    _notify_write(address)
 
+@db_op
 async def get_recent_events(address: str, limit: int = 20):
-    async with aiosqlite.connect(SETTINGS.sqlite_path) as db:
-        cur = await db.execute("SELECT ts, sig, summary FROM recent_events WHERE address=? ORDER BY ts DESC LIMIT ?", (address, limit))
-        rows = await cur.fetchall()
-        return rows
+    return await BACKEND.get_recent_events(address, limit)
+
+@db_op
+async def best_plays_for_user(user_id: int, limit: int = 3) -> List[Tuple[float, str, str, str]]:
+    return await BACKEND.best_plays_for_user(user_id, limit)
+
+@db_op
+async def top_best_plays(limit: int = 3) -> List[Tuple[float, str, str, str]]:
+    return await BACKEND.top_best_plays(limit)
+
+@db_op
+async def load_wallet_state(address: str, mints: List[str]):
+    # (aggregate dict or None, {mint: position}) for the mints a batch touches
+    return await BACKEND.load_wallet_state(address, mints)
+
+@db_op
+async def save_wallet_state(address: str, agg: dict, positions: dict, events: List[Tuple[int, str, str]],
+                            mint_pnl: Optional[dict] = None):
+    # Positions, events, per-mint PnL deltas and the aggregate row land in a single transaction
+    await BACKEND.save_wallet_state(address, agg, positions, events, mint_pnl)
+    _notify_write(address)
+
+@db_op
+async def top_traders(mint: str, limit: int = 5) -> List[Tuple[float, str]]:
+    # [(pnl_usd, address)] by realized PnL on `mint`
+    return await BACKEND.top_traders(mint, limit)
+
+@db_op
+async def load_trending() -> List[Tuple[str, str]]:
+    return await BACKEND.load_trending()
+
+@db_op
+async def save_trending(rows: List[Tuple[str, str]], deleted: List[str]):
+    await BACKEND.save_trending(rows, deleted)
+
+@db_op
+async def run_maintenance(retention_days: int, per_wallet_cap: int) -> dict:
+    return await BACKEND.run_maintenance(retention_days, per_wallet_cap)
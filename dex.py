@@ -1,54 +1,150 @@
-import aiohttp
+import aiohttp, asyncio
+from cache import TTLCache
+from settings import SETTINGS
+from http_client import get_session
+from metrics import timed, EXTERNAL_SECONDS, EXTERNAL_ERRORS
 
-DEX_BASE = "https://api.dexscreener.com/latest/dex/tokens/"
+DEX_BASE = SETTINGS.dex_url
+
+def _liquidity_usd(pair):
+    try:
+        return float((pair.get("liquidity") or {}).get("usd") or 0)
+    except Exception:
+        return 0
+
+def _safe_float(x):
+    try:
+        return float(x or 0)
+    except Exception:
+        return 0.0
+
+def summarize_pairs(pairs: list) -> dict | None:
+    if not pairs:
+        return None
+    # Choose top pair by liquidity
+    top = max(pairs, key=_liquidity_usd)
+    try:
+        price = float(top.get("priceUsd") or 0)
+    except Exception:
+        price = 0.0
+    return {
+        "name": (top.get("baseToken") or {}).get("name") or "",
+        "symbol": (top.get("baseToken") or {}).get("symbol") or "",
+        "pair": top.get("pairAddress"),
+        "priceUsd": price,
+        "fdv": _safe_float(top.get("fdv") or 0),
+        "marketCap": _safe_float(top.get("marketCap") or 0),
+        "liquidityUsd": _safe_float((top.get("liquidity") or {}).get("usd") or 0),
+        "volume": {
+            "h1": _safe_float((top.get("volume") or {}).get("h1") or 0),
+            "h6": _safe_float((top.get("volume") or {}).get("h6") or 0),
+            "h24": _safe_float((top.get("volume") or {}).get("h24") or 0),
+        },
+        "buys": {
+            "h1": int(((top.get("txns") or {}).get("h1") or {}).get("buys",0))
+        },
+        "sells": {
+            "h1": int(((top.get("txns") or {}).get("h1") or {}).get("sells",0))
+        },
+        "iconUrl": (top.get("info") or {}).get("imageUrl"),
+        "chainId": top.get("chainId"),
+        "baseToken": (top.get("baseToken") or {}).get("address"),
+    }
+
+@timed(EXTERNAL_SECONDS, EXTERNAL_ERRORS, service="dexscreener", op="tokens")
+async def dexscreener_tokens(addresses: list[str]) -> dict:
+    # One request for up to DEX_MAX_BATCH addresses; returns {address: info|None}
+    url = DEX_BASE + ",".join(addresses)
+    # Failures raise: None means DexScreener answered and has no pairs for the
+    # token, and TOKEN_CACHE keeps it as "not found" (and over a stale entry)
+    async with get_session().get(url, timeout=aiohttp.ClientTimeout(total=15)) as r:
+        r.raise_for_status()
+        data = await r.json()
+    # A pair answers for every requested token it contains, as base or quote,
+    # same as the single-token endpoint would return it
+    wanted = set(addresses)
+    by_token = {a: [] for a in addresses}
+    for pair in data.get("pairs") or []:
+        for side in ("baseToken", "quoteToken"):
+            addr = (pair.get(side) or {}).get("address")
+            if addr in wanted:
+                by_token[addr].append(pair)
+    return {a: summarize_pairs(pairs) for a, pairs in by_token.items()}
+
+DEX_MAX_BATCH = 30
+
+class TokenBatcher:
+    # Collects lookups for a short window and resolves them with one
+    # multi-address request per DEX_MAX_BATCH tokens.
+    def __init__(self, window: float, max_batch: int = DEX_MAX_BATCH):
+        self.window = window
+        self.max_batch = max_batch
+        self._pending: dict = {}  # address -> [futures]
+        self._timer: asyncio.TimerHandle | None = None
+        self._tasks: set = set()
+        self.requests = 0
+        self.lookups = 0
+
+    async def get(self, address: str) -> dict | None:
+        fut = asyncio.get_running_loop().create_future()
+        self.lookups += 1
+        self._pending.setdefault(address, []).append(fut)
+        if len(self._pending) >= self.max_batch:
+            self._flush()
+        elif self._timer is None:
+            self._timer = asyncio.get_running_loop().call_later(self.window, self._flush)
+        return await fut
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        pending, self._pending = self._pending, {}
+        addrs = list(pending)
+        for i in range(0, len(addrs), self.max_batch):
+            chunk = {a: pending[a] for a in addrs[i:i+self.max_batch]}
+            task = asyncio.create_task(self._send(chunk))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _send(self, chunk: dict):
+        # A failed request fails every lookup in the chunk (nothing gets cached)
+        self.requests += 1
+        try:
+            results = await dexscreener_tokens(list(chunk))
+        except Exception as e:
+            for futs in chunk.values():
+                for fut in futs:
+                    if not fut.done():
+                        fut.set_exception(e)
+            return
+        # The combined answer has a cap on pairs, so a token can be crowded out
+        # by others' pairs: only a single-address answer counts as "not found"
+        missing = [a for a in chunk if results.get(a) is None] if len(chunk) > 1 else []
+        if missing:
+            self.requests += len(missing)
+            singles = await asyncio.gather(*(dexscreener_tokens([a]) for a in missing), return_exceptions=True)
+            for addr, single in zip(missing, singles):
+                results[addr] = single if isinstance(single, Exception) else single.get(addr)
+        for addr, futs in chunk.items():
+            res = results.get(addr)
+            for fut in futs:
+                if fut.done():
+                    continue
+                if isinstance(res, Exception):
+                    fut.set_exception(res)
+                else:
+                    fut.set_result(res)
+
+BATCHER = TokenBatcher(window=SETTINGS.dex_batch_window_ms / 1000)
+
+TOKEN_CACHE = TTLCache(
+    BATCHER.get,
+    ttl=SETTINGS.dex_cache_ttl,
+    stale_ttl=SETTINGS.dex_cache_stale,
+    max_entries=SETTINGS.dex_cache_size,
+)
 
 async def dexscreener_token(token_address: str) -> dict | None:
-    url = DEX_BASE + token_address
-    async with aiohttp.ClientSession() as s:
-        async with s.get(url, timeout=15) as r:
-            if r.status != 200:
-                return None
-            data = await r.json()
-            pairs = data.get("pairs") or []
-            if not pairs:
-                return None
-            # Choose top pair by liquidity
-            def liquidity_usd(pair):
-                try:
-                    return float((pair.get("liquidity") or {}).get("usd") or 0)
-                except Exception:
-                    return 0
-            pairs.sort(key=liquidity_usd, reverse=True)
-            top = pairs[0]
-            try:
-                price = float(top.get("priceUsd") or 0)
-            except Exception:
-                price = 0.0
-            def safe_float(x):
-                try:
-                    return float(x or 0)
-                except Exception:
-                    return 0.0
-            return {
-                "name": (top.get("baseToken") or {}).get("name") or "",
-                "symbol": (top.get("baseToken") or {}).get("symbol") or "",
-                "pair": top.get("pairAddress"),
-                "priceUsd": price,
-                "fdv": safe_float(top.get("fdv") or 0),
-                "marketCap": safe_float(top.get("marketCap") or 0),
-                "liquidityUsd": safe_float((top.get("liquidity") or {}).get("usd") or 0),
-                "volume": {
-                    "h1": safe_float((top.get("volume") or {}).get("h1") or 0),
-                    "h6": safe_float((top.get("volume") or {}).get("h6") or 0),
-                    "h24": safe_float((top.get("volume") or {}).get("h24") or 0),
-                },
-                "buys": {
-                    "h1": int(((top.get("txns") or {}).get("h1") or {}).get("buys",0))
-                },
-                "sells": {
-                    "h1": int(((top.get("txns") or {}).get("h1") or {}).get("sells",0))
-                },
-                "iconUrl": (top.get("info") or {}).get("imageUrl"),
-                "chainId": top.get("chainId"),
-                "baseToken": (top.get("baseToken") or {}).get("address"),
-            }
+    # Cached token info; price_for_mint and the on_text lookup both go through here
+    return await TOKEN_CACHE.get(token_address)
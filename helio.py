@@ -1,20 +1,166 @@
-import aiohttp, backoff, time
+import aiohttp, asyncio, backoff, multiprocessing, time, ujson
+from concurrent.futures import ProcessPoolExecutor
 from settings import SETTINGS
+from http_client import get_session
+from metrics import timed, EXTERNAL_SECONDS, EXTERNAL_ERRORS
 
 # Helius batch parse endpoint (v0 transactions) example
-HELIUS_PARSE_URL = "https://api.helius.xyz/v0/transactions?api-key="
+HELIUS_PARSE_URL = SETTINGS.helius_url
 
-@backoff.on_exception(backoff.expo, (aiohttp.ClientError, TimeoutError), max_time=60)
-async def helius_parse(signatures: list[str]) -> list[dict]:
+def _project_token(t: dict) -> dict:
+    return {"mint": t.get("mint"), "amount": t.get("amount")}
+
+def project_tx(tx: dict) -> dict:
+    # Keep only what summarize_helius_tx reads; the enriched tx's instructions /
+    # accountData / tokenTransfers are dropped right away. Recording keeps the
+    # full tx (see decode_parsed), so replay isn't limited to these fields.
+    swaps = []
+    for ev in ((tx.get("events") or {}).get("swap") or []):
+        if not isinstance(ev, dict):
+            continue
+        swaps.append({
+            "user": ev.get("user") or ev.get("owner") or "",
+            "tokenInputs": [_project_token(t) for t in ev.get("tokenInputs") or []],
+            "tokenOutputs": [_project_token(t) for t in ev.get("tokenOutputs") or []],
+        })
+    return {
+        "signature": tx.get("signature") or tx.get("txHash"),
+        "timestamp": tx.get("timestamp"),
+        "slot": tx.get("slot"),
+        "events": {"swap": swaps},
+    }
+
+def decode_parsed(body: bytes, keep_raw: bool = False) -> list[dict]:
+    # keep_raw: attach the full enriched tx as "raw" (for recording, so replay
+    # can rerun a changed summarizer on fields project_tx drops)
+    data = ujson.loads(body)
+    if not isinstance(data, list):
+        return []
+    if keep_raw:
+        return [dict(project_tx(tx), raw=tx) for tx in data if isinstance(tx, dict)]
+    return [project_tx(tx) for tx in data if isinstance(tx, dict)]
+
+# Large responses are decoded in worker processes: decoding holds the GIL, so a
+# thread would still stall the event loop. Forked at startup (before the DB and
+# executor threads exist); results come back already projected, so they're small.
+DECODER: ProcessPoolExecutor | None = None
+
+def start_decoder(workers: int):
+    global DECODER
+    if workers <= 0 or DECODER is not None:
+        return
+    DECODER = ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context("fork"))
+    DECODER.submit(decode_parsed, b"[]").result()
+
+def close_decoder():
+    global DECODER
+    if DECODER is not None:
+        DECODER.shutdown(cancel_futures=True)
+        DECODER = None
+
+def _permanent(e: Exception) -> bool:
+    # 4xx other than 429 won't get better by retrying
+    return isinstance(e, aiohttp.ClientResponseError) and e.status < 500 and e.status != 429
+
+@backoff.on_exception(backoff.expo, (aiohttp.ClientError, TimeoutError), max_time=60, giveup=_permanent)
+@timed(EXTERNAL_SECONDS, EXTERNAL_ERRORS, service="helius", op="parse")
+async def helius_parse(signatures: list[str], keep_raw: bool = False) -> list[dict]:
+    # Returns compact records (see project_tx), not full enriched txs, unless
+    # keep_raw. Non-200 answers raise (and are retried), never an empty result.
     if not signatures:
         return []
-    url = HELIUS_PARSE_URL + SETTINGS.helius_key
+    # Same commitment as the signature listings, or fresh signatures come back unparsed
+    url = HELIUS_PARSE_URL + SETTINGS.helius_key + "&commitment=" + SETTINGS.commitment
     # Helius expects a list of signatures as the request body for v0/transactions?api-key=KEY
-    async with aiohttp.ClientSession() as s:
-        async with s.post(url, json=signatures, timeout=30) as r:
-            if r.status != 200:
-                return []
-            return await r.json()
+    async with get_session().post(url, json=signatures, timeout=aiohttp.ClientTimeout(total=30)) as r:
+        r.raise_for_status()
+        body = await r.read()
+    # Big batches decode off the event loop so handlers stay responsive
+    if DECODER is not None and len(body) >= SETTINGS.helius_offload_bytes:
+        return await asyncio.get_running_loop().run_in_executor(DECODER, decode_parsed, body, keep_raw)
+    return decode_parsed(body, keep_raw)
+
+HELIUS_MAX_BATCH = 100
+
+class ParseQueue:
+    # Shared Helius parse queue: any ingestion source submits (address, signature)
+    # pairs; a dispatcher flushes up to HELIUS_MAX_BATCH unique signatures per
+    # request when the batch fills or `window` seconds pass, and hands each
+    # parsed tx back to every submitter that asked for it.
+    def __init__(self, window: float, max_batch: int = HELIUS_MAX_BATCH, concurrency: int = 4):
+        self.window = window
+        self.max_batch = max_batch
+        self.sem = asyncio.Semaphore(concurrency)
+        self._pending: dict = {}  # signature -> [(address, future)]
+        self._timer: asyncio.TimerHandle | None = None
+        self._tasks: set = set()
+        self.requests = 0
+        self.submitted = 0
+        # Optional fn(tx, addresses) called with every full parsed tx (replay recording)
+        self.on_parsed = None
+
+    def submit(self, address: str, signature: str) -> asyncio.Future:
+        fut = asyncio.get_running_loop().create_future()
+        self.submitted += 1
+        self._pending.setdefault(signature, []).append((address, fut))
+        if len(self._pending) >= self.max_batch:
+            self._flush()
+        elif self._timer is None:
+            self._timer = asyncio.get_running_loop().call_later(self.window, self._flush)
+        return fut
+
+    async def parse(self, address: str, signatures: list[str]) -> list[dict]:
+        # Drop-in for helius_parse(signatures), results in request order.
+        # Signatures Helius didn't return are left out; failed requests raise.
+        if not signatures:
+            return []
+        txs = await asyncio.gather(*[self.submit(address, sig) for sig in signatures])
+        return [tx for tx in txs if tx]
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        pending, self._pending = self._pending, {}
+        sigs = list(pending)
+        for i in range(0, len(sigs), self.max_batch):
+            chunk = {sig: pending[sig] for sig in sigs[i:i+self.max_batch]}
+            task = asyncio.create_task(self._send(chunk))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _send(self, chunk: dict):
+        async with self.sem:
+            self.requests += 1
+            try:
+                parsed = await helius_parse(list(chunk), keep_raw=self.on_parsed is not None)
+            except Exception as e:
+                for waiters in chunk.values():
+                    for _, fut in waiters:
+                        if not fut.done():
+                            fut.set_exception(e)
+                return
+        by_sig = {}
+        for tx in parsed or []:
+            sig = tx.get("signature") or tx.get("txHash")
+            if sig:
+                by_sig[sig] = tx
+        for sig, waiters in chunk.items():
+            # The full tx goes to the recorder only; submitters get the compact record
+            raw = by_sig[sig].pop("raw", None) if sig in by_sig else None
+            if self.on_parsed is not None and sig in by_sig:
+                try:
+                    self.on_parsed(raw or by_sig[sig], sorted({a for a, _ in waiters}))
+                except Exception:
+                    pass
+            for _, fut in waiters:
+                if not fut.done():
+                    fut.set_result(by_sig.get(sig))
+
+    def depth(self) -> int:
+        return len(self._pending)
+
+PARSER = ParseQueue(window=SETTINGS.helius_batch_window_ms / 1000, concurrency=SETTINGS.helius_concurrency)
 
 # Extract compact swap summary from Helius enriched tx
 # Returns list of {address, ts, sig, in: {mint, qty}, out: {mint, qty}, usd_value}
@@ -0,0 +1,28 @@
+import aiohttp
+from settings import SETTINGS
+
+# Process-wide aiohttp session shared by the Helius and DexScreener clients.
+# Keeps per-host keep-alive pools and a DNS cache instead of a fresh
+# TCP+TLS handshake for every request.
+
+_SESSION: aiohttp.ClientSession | None = None
+
+def get_session() -> aiohttp.ClientSession:
+    # Must be called from inside the running event loop
+    global _SESSION
+    if _SESSION is None or _SESSION.closed:
+        connector = aiohttp.TCPConnector(
+            limit=SETTINGS.http_limit,
+            limit_per_host=SETTINGS.http_limit_per_host,
+            ttl_dns_cache=SETTINGS.http_dns_ttl,
+            keepalive_timeout=SETTINGS.http_keepalive,
+        )
+        timeout = aiohttp.ClientTimeout(total=SETTINGS.http_timeout, connect=SETTINGS.http_connect_timeout)
+        _SESSION = aiohttp.ClientSession(connector=connector, timeout=timeout)
+    return _SESSION
+
+async def close_http():
+    global _SESSION
+    if _SESSION is not None and not _SESSION.closed:
+        await _SESSION.close()
+    _SESSION = None
@@ -2,11 +2,17 @@ import asyncio, re, time
 from pyrogram import Client, filters
 from pyrogram.types import Message
 from settings import SETTINGS
-from db import init_db, add_user, add_track, rm_track, list_tracks, get_agg, get_recent_events
-from solana_client import SolClient
-from dex import dexscreener_token
-from helio import helius_parse, summarize_helius_tx
-from aggregates import apply_swap_event
+from metrics import handler, REGISTRY, BACKGROUND_ERRORS, LoopProfiler, start_server as start_metrics_server
+from db import db_stats, init_db, close_db, run_maintenance, add_user, add_track, rm_track, list_tracks, all_tracks, get_agg, get_recent_events, best_plays_for_user, top_best_plays, top_traders, load_trending, save_trending, add_write_listener, TRACKED
+from http_client import close_http
+from cache import TTLCache
+from dex import TOKEN_CACHE, dexscreener_token
+from helio import start_decoder, close_decoder
+from aggregates import add_swap_listener, notify_swap_listeners
+from alerts import SendQueue, AlertDispatcher
+from tracker import SOL, tracking_manager, start_recording, collect_gauges as collect_tracker_gauges
+from workers import TrackerPool
+from trending import TrendingEngine, WINDOWS
 
 ADDRESS_RE = re.compile(r"^[1-9A-HJ-NP-Za-km-z]{32,44}$")
 
@@ -17,11 +23,41 @@ app = Client(
     bot_token=SETTINGS.bot_token
 )
 
-SOL = SolClient()
+ALERT_QUEUE = SendQueue(
+    lambda chat_id, text: app.send_message(chat_id, text),
+    global_rate=SETTINGS.alert_global_rate,
+    per_chat_interval=SETTINGS.alert_chat_interval,
+    max_inflight=SETTINGS.alert_max_inflight,
+)
+ALERTS = AlertDispatcher(ALERT_QUEUE, TRACKED, max_age=SETTINGS.alert_max_age)
+add_swap_listener(ALERTS.on_swaps)
+TRENDING = TrendingEngine(SETTINGS.trending_bucket_seconds, SETTINGS.trending_top_k)
+add_swap_listener(TRENDING.on_swaps)
+
+# Top 5 traders per mint; any committed swap on a mint may change its ranking
+TOP_TRADERS = TTLCache(
+    lambda mint: top_traders(mint, 5),
+    ttl=SETTINGS.toptraders_cache_ttl,
+    stale_ttl=0,
+    max_entries=SETTINGS.toptraders_cache_size,
+)
+
+def invalidate_top_traders(address: str, results: list):
+    for r in results:
+        TOP_TRADERS.invalidate(r["in"].get("mint"))
+        TOP_TRADERS.invalidate(r["out"].get("mint"))
+
+add_swap_listener(invalidate_top_traders)
+
+# TRACKER_WORKERS > 0: ingestion runs in worker processes (workers.py)
+TRACKERS = TrackerPool(SETTINGS.tracker_workers, notify_swap_listeners) if SETTINGS.tracker_workers > 0 else None
+if TRACKERS:
+    TRACKED.add_listener(TRACKERS.notify)
 
 # ---------------- Handlers ----------------
 
 @app.on_message(filters.command(["start"]))
+@handler
 async def cmd_start(_, m: Message):
     if not m.from_user:
         return
@@ -34,24 +70,27 @@ async def cmd_start(_, m: Message):
         "• /addwalletrack <address> <name> — start tracking and receive alerts.\n"
         "• /walletlist — see your tracked wallets.\n"
         "• /rmwallet <address> — stop tracking.\n"
-        "• /bestplay — top 3 plays across your tracked wallets.\n"
-        "• /toptraders <token> — top 5 by PnL for a coin (when available).\n"
-        "• /trendingcoin — trending coins (lightweight view).\n\n"
+        "• /bestplay — top 3 plays across your tracked wallets (/bestplay all for everyone).\n"
+        "• /toptraders <token> — top 5 tracked wallets by realized PnL on a coin.\n"
+        "• /trendingcoin [1h|6h|24h] — most traded coins among tracked wallets.\n\n"
         "Data is fetched live from Solana/DexScreener/Helius. Minimal storage only."
     )
     await m.reply_text(txt)
 
 @app.on_message(filters.command(["walletlist"]))
+@handler
 async def cmd_walletlist(_, m: Message):
     if not m.from_user:
         return
     rows = await list_tracks(m.from_user.id)
     if not rows:
         return await m.reply_text("You aren't tracking any wallets yet. Use /addwalletrack <address> <name>.")
-    lines = [f"• {addr} — {name}" for addr, name in rows]
+    bals = await SOL.get_balances_sol([addr for addr, _ in rows])
+    lines = [f"• {addr} — {name} ({bals.get(addr, 0):.4f} SOL)" for addr, name in rows]
     await m.reply_text("**Tracked wallets:**\n"+ "\n".join(lines))
 
 @app.on_message(filters.command(["addwalletrack"]))
+@handler
 async def cmd_addwalletrack(_, m: Message):
     if not m.from_user:
         return
@@ -66,6 +105,7 @@ async def cmd_addwalletrack(_, m: Message):
     await m.reply_text(f"✅ Tracking started for {address} {f'({name})' if name else ''}.")
 
 @app.on_message(filters.command(["rmwallet"]))
+@handler
 async def cmd_rmwallet(_, m: Message):
     if not m.from_user:
         return
@@ -78,36 +118,29 @@ async def cmd_rmwallet(_, m: Message):
         return await m.reply_text("🗑️ Removed from tracking.")
     await m.reply_text("Nothing to remove.")
 
-@app.on_message(filters.command(["anywallet"]))
-async def cmd_anywallet(_, m: Message):
-    if not m.from_user:
-        return
-    parts = m.text.split()
-    if len(parts) != 2:
-        return await m.reply_text("Usage: /anywallet <WalletAddress>")
-    address = parts[1].strip()
-    if not ADDRESS_RE.match(address):
-        return await m.reply_text("Invalid Solana address.")
-
-    bal_sol = await SOL.get_balance_sol(address)
-    agg = await get_agg(address) or {}
+async def render_wallet(address: str) -> str:
+    bal_sol, agg, events = await asyncio.gather(
+        SOL.get_balance_sol(address),
+        get_agg(address),
+        get_recent_events(address, limit=5),
+    )
+    agg = agg or {}
 
-    total = int((agg or {}).get("total_trades",0) or 0)
-    wins = int((agg or {}).get("wins",0) or 0)
-    losses = int((agg or {}).get("losses",0) or 0)
+    total = int(agg.get("total_trades",0) or 0)
+    wins = int(agg.get("wins",0) or 0)
+    losses = int(agg.get("losses",0) or 0)
     winrate = (wins/total*100) if total else 0
 
-    realized_sol = float((agg or {}).get("realized_pnl_sol",0) or 0)
-    realized_usd = float((agg or {}).get("realized_pnl_usd",0) or 0)
+    realized_sol = float(agg.get("realized_pnl_sol",0) or 0)
+    realized_usd = float(agg.get("realized_pnl_usd",0) or 0)
 
-    best_sig = (agg or {}).get("best_play_sig") or "-"
-    best_usd = float((agg or {}).get("best_play_pnl_usd",0) or 0)
-    best_summary = (agg or {}).get("best_play_summary") or "—"
+    best_sig = agg.get("best_play_sig") or "-"
+    best_usd = float(agg.get("best_play_pnl_usd",0) or 0)
+    best_summary = agg.get("best_play_summary") or "—"
 
-    events = await get_recent_events(address, limit=5)
     ev_txt = "\n".join([f"• {time.strftime('%Y-%m-%d %H:%M:%S', time.gmtime(r[0]))} — {r[2]}\n`{r[1]}`" for r in events]) if events else "—"
 
-    txt = (
+    return (
         f"📊 **Wallet**: `{address}`\n\n"
         f"**Holdings (on-chain)**: {bal_sol:.4f} SOL\n"
         f"**PnL (realized)**: {realized_sol:.4f} SOL / ${realized_usd:.2f}\n"
@@ -116,56 +149,107 @@ async def cmd_anywallet(_, m: Message):
         f"Signature: `{best_sig}`\n\n"
         f"**Recent events (compact)**:\n{ev_txt}"
     )
-    await m.reply_text(txt)
+
+# Rendered /anywallet replies. The TTL bounds the SOL balance's age; new swaps
+# for the wallet drop the entry right away (local writes and worker batches).
+WALLET_REPLIES = TTLCache(
+    render_wallet,
+    ttl=SETTINGS.wallet_reply_ttl,
+    stale_ttl=0,
+    max_entries=SETTINGS.reply_cache_size,
+)
+add_write_listener(WALLET_REPLIES.invalidate)
+add_swap_listener(lambda address, results: WALLET_REPLIES.invalidate(address))
+
+@app.on_message(filters.command(["anywallet"]))
+@handler
+async def cmd_anywallet(_, m: Message):
+    if not m.from_user:
+        return
+    parts = m.text.split()
+    if len(parts) != 2:
+        return await m.reply_text("Usage: /anywallet <WalletAddress>")
+    address = parts[1].strip()
+    if not ADDRESS_RE.match(address):
+        return await m.reply_text("Invalid Solana address.")
+    await m.reply_text(await WALLET_REPLIES.get(address))
 
 @app.on_message(filters.command(["bestplay"]))
+@handler
 async def cmd_bestplay(_, m: Message):
     if not m.from_user:
         return
-    rows = await list_tracks(m.from_user.id)
-    if not rows:
-        return await m.reply_text("No tracked wallets.")
-    best = []
-    for addr, _ in rows:
-        agg = await get_agg(addr) or {}
-        pnl = float(agg.get("best_play_pnl_usd",0) or 0)
-        summary = agg.get("best_play_summary") or ""
-        sig = agg.get("best_play_sig") or ""
-        best.append((pnl, addr, summary, sig))
-    best.sort(key=lambda x: x[0], reverse=True)
-    best = best[:3]
-    if not best:
-        return await m.reply_text("No best plays yet.")
+    parts = m.text.split()
+    if len(parts) > 1 and parts[1].lower() == "all":
+        # /bestplay all — top plays across every tracked wallet of every user
+        best = await top_best_plays(limit=3)
+        if not best:
+            return await m.reply_text("No best plays yet.")
+        title = "**Top 3 Best Plays (all users)**\n"
+    else:
+        best = await best_plays_for_user(m.from_user.id, limit=3)
+        if not best:
+            return await m.reply_text("No tracked wallets.")
+        title = "**Top 3 Best Plays**\n"
     lines = [f"#{i+1} ${pnl:.2f} — {addr}\n{summary}\n`{sig}`" for i,(pnl,addr,summary,sig) in enumerate(best)]
-    await m.reply_text("**Top 3 Best Plays**\n"+ "\n\n".join(lines))
+    await m.reply_text(title + "\n\n".join(lines))
 
 @app.on_message(filters.command(["toptraders"]))
+@handler
 async def cmd_toptraders(_, m: Message):
     parts = m.text.split()
     if len(parts) != 2:
         return await m.reply_text("Usage: /toptraders <TokenAddress>")
     token = parts[1].strip()
-    await m.reply_text("Coming soon: top traders per coin via HelloMoon/Helius analytics.")
+    if not ADDRESS_RE.match(token):
+        return await m.reply_text("Invalid token address.")
+    top = await TOP_TRADERS.get(token)
+    if not top:
+        return await m.reply_text("No realized PnL on this token from tracked wallets yet.")
+    lines = [f"#{i+1} ${pnl:,.2f} — `{addr}`" for i, (pnl, addr) in enumerate(top)]
+    await m.reply_text(f"**Top traders** `{token}`\n\n" + "\n".join(lines))
 
 @app.on_message(filters.command(["trendingcoin"]))
+@handler
 async def cmd_trending(_, m: Message):
-    await m.reply_text(
-        "Send any **token address** to get live price, market cap, 1h/6h/24h volume.\n"
-        "Advanced trending (1h/6h/24h lists) will be added via HelloMoon/Helius analytics."
-    )
+    parts = m.text.split()
+    window = parts[1].lower() if len(parts) > 1 else "1h"
+    if window not in WINDOWS:
+        return await m.reply_text("Usage: /trendingcoin [1h|6h|24h]")
+    top = TRENDING.ranked(window)[:10]
+    if not top:
+        return await m.reply_text(f"No swaps from tracked wallets in the last {window}.")
+    # Labels only from what the token cache already holds; misses are looked up
+    # in the background so the reply never waits on DexScreener
+    TOKEN_CACHE.warm(mint for mint, *_ in top)
+    lines = []
+    for i, (mint, swaps, wallets, usd) in enumerate(top):
+        info = TOKEN_CACHE.peek(mint)
+        label = f"{info.get('symbol')} " if info and info.get("symbol") else ""
+        lines.append(f"#{i+1} {label}`{mint}`\n{wallets} wallets · {swaps} swaps · ${usd:,.0f}")
+    await m.reply_text(f"**Trending ({window})**\n\n" + "\n\n".join(lines))
 
-@app.on_message(filters.text & ~filters.command([]))
-async def on_text(_, m: Message):
-    text = m.text.strip()
-    if not ADDRESS_RE.match(text):
+@app.on_message(filters.command(["workers"]))
+@handler
+async def cmd_workers(_, m: Message):
+    # Owner only: show or change the number of tracker worker processes
+    if not m.from_user or not SETTINGS.owner_user_id or m.from_user.id != SETTINGS.owner_user_id:
         return
-    addr = text
+    if not TRACKERS:
+        return await m.reply_text("Single-process mode (TRACKER_WORKERS=0).")
+    parts = m.text.split()
+    if len(parts) == 2 and parts[1].isdigit() and int(parts[1]) > 0:
+        await TRACKERS.resize(int(parts[1]))
+        return await m.reply_text(f"Restarted with {TRACKERS.count} tracker workers.")
+    await m.reply_text(f"Tracker workers: {TRACKERS.alive()}/{TRACKERS.count} alive, {TRACKERS.restarts} restarts. Usage: /workers <N>")
+
+async def render_token(addr: str) -> str:
     info = await dexscreener_token(addr)
     if not info:
-        return await m.reply_text("Token not found on DexScreener.")
+        return "Token not found on DexScreener."
     buys = info.get("buys", {}).get("h1", 0)
     sells = info.get("sells", {}).get("h1", 0)
-    txt = (
+    return (
         f"🪙 **{info.get('name')} ({info.get('symbol')})**\n"
         f"Contract: `{addr}`\n"
         f"Price: ${info.get('priceUsd'):.8f}\n"
@@ -174,77 +258,109 @@ async def on_text(_, m: Message):
         f"Volume: 1h ${info.get('volume',{}).get('h1',0):.0f} | 6h ${info.get('volume',{}).get('h6',0):.0f} | 24h ${info.get('volume',{}).get('h24',0):.0f}\n"
         f"1h Buys vs Sells: {buys} / {sells}"
     )
-    await m.reply_text(txt)
 
-# ---------------- Background polling / tracking ----------------
+# Rendered token replies for pasted contract addresses
+TOKEN_REPLIES = TTLCache(
+    render_token,
+    ttl=SETTINGS.token_reply_ttl,
+    stale_ttl=0,
+    max_entries=SETTINGS.reply_cache_size,
+)
+
+@app.on_message(filters.text & ~filters.command([]))
+@handler
+async def on_text(_, m: Message):
+    text = m.text.strip()
+    if not ADDRESS_RE.match(text):
+        return
+    await m.reply_text(await TOKEN_REPLIES.get(text))
+
+# ---------------- Background jobs ----------------
 
-async def poll_wallet(address: str):
-    # Poll latest signatures and parse with Helius, update aggregates
-    from db import get_agg, upsert_agg
-    before = None
+async def balance_refresh_job():
+    # Keep SOL balances of all tracked wallets warm with bulk getMultipleAccounts
     while True:
         try:
-            agg = await get_agg(address) or {}
-            last_known = agg.get("last_sig")
-            sigs = await SOL.get_signatures(address, limit=25)
-            if not sigs:
-                await asyncio.sleep(15)
-                continue
-            sig_list = [s.get("signature") or s.get("signature") for s in sigs]
-            # New signatures are at front
-            if last_known and last_known in sig_list:
-                idx = sig_list.index(last_known)
-                new_sigs = sig_list[:idx]
-            else:
-                new_sigs = sig_list
-
-            if new_sigs:
-                # Limit batch size to 20
-                batch = new_sigs[:20]
-                parsed = await helius_parse(batch)
-                for tx in parsed:
-                    for ev in summarize_helius_tx(tx, address):
-                        await apply_swap_event(ev)
-                # Update last_sig to newest
-                await upsert_agg(address, last_sig=new_sigs[0], total_trades=agg.get("total_trades",0), wins=agg.get("wins",0), losses=agg.get("losses",0), realized_pnl_sol=agg.get("realized_pnl_sol",0), realized_pnl_usd=agg.get("realized_pnl_usd",0), best_play_sig=agg.get("best_play_sig"), best_play_pnl_usd=agg.get("best_play_pnl_usd",0), best_play_summary=agg.get("best_play_summary"), updated_at=int(time.time()))
-
-            await asyncio.sleep(15)
-        except asyncio.CancelledError:
-            break
+            SOL.prune_balances()
+            await SOL.get_balances_sol(list(TRACKED.addresses()))
         except Exception:
-            await asyncio.sleep(20)
+            BACKGROUND_ERRORS.inc(loop="balance_refresh")
+        await asyncio.sleep(SETTINGS.balance_refresh_interval)
 
-async def tracking_manager():
-    # Launch one poller per unique tracked wallet (lightweight)
-    import aiosqlite
-    tasks = {}
+async def maintenance_job():
+    # recent_events retention, per-wallet cap, incremental vacuum and WAL checkpoint
     while True:
+        await asyncio.sleep(SETTINGS.maintenance_interval)
         try:
-            async with aiosqlite.connect(SETTINGS.sqlite_path) as db:
-                cur = await db.execute("SELECT DISTINCT address FROM tracked_wallets")
-                rows = await cur.fetchall()
-                addrs = [r[0] for r in rows]
-            # Start tasks for new addresses
-            for addr in addrs:
-                if addr not in tasks or tasks[addr].done():
-                    tasks[addr] = asyncio.create_task(poll_wallet(addr))
-            # Cancel tasks for untracked
-            for addr in list(tasks.keys()):
-                if addr not in addrs:
-                    tasks[addr].cancel()
-                    tasks.pop(addr, None)
-            await asyncio.sleep(30)
+            await run_maintenance(SETTINGS.events_retention_days, SETTINGS.events_per_wallet_cap)
         except Exception:
-            await asyncio.sleep(30)
+            BACKGROUND_ERRORS.inc(loop="maintenance")
+
+def collect_gauges():
+    # Refreshed on every /metrics scrape
+    g = REGISTRY.gauge
+    g("queue_depth", "Items waiting in internal queues").set(ALERT_QUEUE.depth(), queue="alerts")
+    g("queue_depth").set(db_stats()["depth"], queue="db_writer")
+    g("trending_mints", "Mints tracked by the trending engine").set(len(TRENDING.mints))
+    for name, cache in (("wallet", WALLET_REPLIES), ("token", TOKEN_REPLIES), ("toptraders", TOP_TRADERS)):
+        for k, v in cache.stats().items():
+            g("reply_cache", "Rendered reply cache counters").set(v, cache=name, stat=k)
+    if TRACKERS:
+        g("tracker_workers_alive", "Tracker worker processes running").set(TRACKERS.alive())
+        g("tracker_worker_restarts", "Tracker worker processes restarted after dying").set(TRACKERS.restarts)
 
 async def main():
+    if not TRACKERS:
+        # Fork the decode workers before any threads are started
+        start_decoder(SETTINGS.helius_decode_workers)
     await init_db()
+    TRACKED.load(await all_tracks())
+    TRENDING.load(await load_trending())
     await app.start()
     print("Bot started")
+    sender = asyncio.create_task(ALERT_QUEUE.run())
+    profiler = LoopProfiler(interval=SETTINGS.profile_interval, duration=SETTINGS.profile_duration) if SETTINGS.profile_interval > 0 else None
+    profiling = asyncio.create_task(profiler.run()) if profiler else None
+    metrics_runner = None
+    if SETTINGS.metrics_port:
+        REGISTRY.add_collector(collect_gauges)
+        if not TRACKERS:
+            REGISTRY.add_collector(collect_tracker_gauges)
+        metrics_runner = await start_metrics_server(SETTINGS.metrics_host, SETTINGS.metrics_port, profiler)
+    balances = asyncio.create_task(balance_refresh_job())
+    maintenance = asyncio.create_task(maintenance_job())
+    trending = asyncio.create_task(TRENDING.run(save_trending, SETTINGS.trending_snapshot_interval))
+    recorder = None if TRACKERS else start_recording()
+    recording = asyncio.create_task(recorder.run()) if recorder else None
     try:
-        await tracking_manager()
+        if TRACKERS:
+            TRACKERS.start()
+            await TRACKERS.run()
+        else:
+            await tracking_manager()
     finally:
+        balances.cancel()
+        maintenance.cancel()
+        trending.cancel()
+        sender.cancel()
+        if profiling:
+            profiling.cancel()
+        if recording:
+            recording.cancel()
+            await asyncio.gather(recording, return_exceptions=True)
+        if metrics_runner:
+            await metrics_runner.cleanup()
+        if TRACKERS:
+            await TRACKERS.stop()
+        try:
+            await save_trending(*TRENDING.dump())
+        except Exception:
+            BACKGROUND_ERRORS.inc(loop="trending_snapshot")
         await app.stop()
+        await close_http()
+        await SOL.close()
+        await close_db()
+        close_decoder()
 
 if __name__ == "__main__":
     asyncio.run(main())
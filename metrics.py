@@ -0,0 +1,189 @@
+import asyncio, cProfile, functools, io, pstats, random, time
+from typing import Callable, Optional
+from aiohttp import web
+
+# Minimal in-process metrics: counters, gauges and fixed-bucket histograms with
+# labels, rendered in Prometheus text format on a local HTTP endpoint.
+# Gauges that mirror other components' state are registered as collectors
+# and read at scrape time.
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+def _labels(labels: dict) -> str:
+    if not labels:
+        return ""
+    inner = ",".join(f'{k}="{str(v)}"' for k, v in sorted(labels.items()))
+    return "{" + inner + "}"
+
+class Counter:
+    def __init__(self, name: str, doc: str):
+        self.name, self.doc, self.kind = name, doc, "counter"
+        self.values: dict = {}
+
+    def inc(self, n: float = 1, **labels):
+        key = tuple(sorted(labels.items()))
+        self.values[key] = self.values.get(key, 0) + n
+
+    def render(self) -> list[str]:
+        return [f"{self.name}{_labels(dict(k))} {v}" for k, v in self.values.items()]
+
+class Gauge(Counter):
+    def __init__(self, name: str, doc: str):
+        super().__init__(name, doc)
+        self.kind = "gauge"
+
+    def set(self, v: float, **labels):
+        self.values[tuple(sorted(labels.items()))] = v
+
+class Histogram:
+    def __init__(self, name: str, doc: str, buckets=LATENCY_BUCKETS):
+        self.name, self.doc, self.kind = name, doc, "histogram"
+        self.buckets = tuple(buckets)
+        self.series: dict = {}  # labels -> [bucket counts..., sum, count]
+
+    def observe(self, v: float, **labels):
+        key = tuple(sorted(labels.items()))
+        s = self.series.get(key)
+        if s is None:
+            s = self.series[key] = [0] * (len(self.buckets) + 2)
+        for i, b in enumerate(self.buckets):
+            if v <= b:
+                s[i] += 1
+                break
+        s[-2] += v
+        s[-1] += 1
+
+    def render(self) -> list[str]:
+        out = []
+        for key, s in self.series.items():
+            labels = dict(key)
+            acc = 0
+            for i, b in enumerate(self.buckets):
+                acc += s[i]
+                out.append(f"{self.name}_bucket{_labels({**labels, 'le': b})} {acc}")
+            out.append(f"{self.name}_bucket{_labels({**labels, 'le': '+Inf'})} {s[-1]}")
+            out.append(f"{self.name}_sum{_labels(labels)} {s[-2]}")
+            out.append(f"{self.name}_count{_labels(labels)} {s[-1]}")
+        return out
+
+class Registry:
+    def __init__(self):
+        self.metrics: dict = {}
+        self.collectors: list[Callable[[], None]] = []
+
+    def _get(self, cls, name: str, doc: str):
+        m = self.metrics.get(name)
+        if m is None:
+            m = self.metrics[name] = cls(name, doc)
+        return m
+
+    def counter(self, name: str, doc: str = "") -> Counter:
+        return self._get(Counter, name, doc)
+
+    def gauge(self, name: str, doc: str = "") -> Gauge:
+        return self._get(Gauge, name, doc)
+
+    def histogram(self, name: str, doc: str = "", buckets=LATENCY_BUCKETS) -> Histogram:
+        m = self.metrics.get(name)
+        if m is None:
+            m = self.metrics[name] = Histogram(name, doc, buckets)
+        return m
+
+    def add_collector(self, fn: Callable[[], None]):
+        # fn() refreshes gauges right before a scrape
+        self.collectors.append(fn)
+
+    def render(self) -> str:
+        for fn in self.collectors:
+            try:
+                fn()
+            except Exception:
+                pass
+        lines = []
+        for m in self.metrics.values():
+            lines.append(f"# HELP {m.name} {m.doc}")
+            lines.append(f"# TYPE {m.name} {m.kind}")
+            lines.extend(m.render())
+        return "\n".join(lines) + "\n"
+
+REGISTRY = Registry()
+
+EXTERNAL_SECONDS = REGISTRY.histogram("external_call_seconds", "Latency of outbound calls by service and operation")
+EXTERNAL_ERRORS = REGISTRY.counter("external_call_errors_total", "Failed outbound calls by service and operation")
+DB_SECONDS = REGISTRY.histogram("db_op_seconds", "Latency of db.py operations")
+DB_ERRORS = REGISTRY.counter("db_op_errors_total", "Failed db.py operations")
+HANDLER_SECONDS = REGISTRY.histogram("handler_seconds", "Latency of Telegram command handlers")
+HANDLER_ERRORS = REGISTRY.counter("handler_errors_total", "Telegram command handlers that raised")
+POLL_LAG = REGISTRY.histogram("poll_lag_seconds", "How late each wallet poll started relative to its due time")
+BACKGROUND_ERRORS = REGISTRY.counter("background_errors_total", "Exceptions swallowed by background loops")
+SKIPPED_SIGNATURES = REGISTRY.counter("skipped_signatures_total", "Signatures Helius never parsed, skipped after BACKFILL_PARSE_ATTEMPTS polls")
+PUSH_RETRIES = REGISTRY.counter("push_retries_total", "Pushed signatures the RPC didn't list yet, caught up again later")
+
+def timed(hist: Histogram, errors: Counter, **labels):
+    # Decorator for coroutines: observe latency, count exceptions, re-raise
+    def deco(fn):
+        @functools.wraps(fn)
+        async def wrapper(*args, **kwargs):
+            t0 = time.perf_counter()
+            try:
+                return await fn(*args, **kwargs)
+            except Exception:
+                errors.inc(**labels)
+                raise
+            finally:
+                hist.observe(time.perf_counter() - t0, **labels)
+        return wrapper
+    return deco
+
+def db_op(fn):
+    return timed(DB_SECONDS, DB_ERRORS, op=fn.__name__)(fn)
+
+def handler(fn):
+    return timed(HANDLER_SECONDS, HANDLER_ERRORS, handler=fn.__name__)(fn)
+
+# ---------------- Sampled profiling ----------------
+# Every `interval` seconds, with probability `sample_rate`, profile the event
+# loop thread for `duration` seconds and keep the last report for /profile.
+
+class LoopProfiler:
+    def __init__(self, interval: float = 300, duration: float = 5, sample_rate: float = 1.0, top: int = 40):
+        self.interval = interval
+        self.duration = duration
+        self.sample_rate = sample_rate
+        self.top = top
+        self.last_report: Optional[str] = None
+        self.last_at: Optional[float] = None
+
+    async def run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            if random.random() >= self.sample_rate:
+                continue
+            prof = cProfile.Profile()
+            prof.enable()
+            try:
+                await asyncio.sleep(self.duration)
+            finally:
+                prof.disable()
+            buf = io.StringIO()
+            pstats.Stats(prof, stream=buf).sort_stats("cumulative").print_stats(self.top)
+            self.last_report = buf.getvalue()
+            self.last_at = time.time()
+
+async def start_server(host: str, port: int, profiler: Optional[LoopProfiler] = None) -> web.AppRunner:
+    async def metrics_view(_):
+        return web.Response(text=REGISTRY.render(), content_type="text/plain", charset="utf-8")
+
+    async def profile_view(_):
+        if profiler is None or profiler.last_report is None:
+            return web.Response(status=404, text="no profile yet")
+        stamp = time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime(profiler.last_at))
+        return web.Response(text=f"# sampled {stamp} UTC for {profiler.duration}s\n" + profiler.last_report)
+
+    app = web.Application()
+    app.router.add_get("/metrics", metrics_view)
+    app.router.add_get("/profile", profile_view)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    return runner
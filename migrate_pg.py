@@ -0,0 +1,89 @@
+import argparse, asyncio, sqlite3, sys, time
+from typing import Optional
+from storage import AGG_FIELDS
+from pg_store import PostgresStorage
+
+# Copy an existing SQLite bot.db into Postgres (STORAGE_BACKEND=postgres).
+#
+#   python -m migrate_pg --sqlite ./bot.db --dsn postgresql://user@localhost/solbot
+#
+# Tables are streamed in chunks and COPYed; users/tracked wallets are inserted
+# with ON CONFLICT DO NOTHING and aggregates/positions/mint PnL upserted, so a rerun
+# refreshes them. recent_events has no natural key, so it is only copied while
+# the Postgres table is still empty (or with --events always).
+
+TABLES = [
+    # (table, columns, method)
+    ("users", ["user_id", "created_at"], "users"),
+    ("tracked_wallets", ["user_id", "address", "name", "created_at"], "tracks"),
+    ("wallet_aggregates", ["address"] + AGG_FIELDS, "aggs"),
+    ("wallet_positions", ["address", "mint", "qty", "avg_cost_usd", "updated_at"], "positions"),
+    ("mint_pnl", ["mint", "address", "pnl_usd", "updated_at"], "mint_pnl"),
+    ("recent_events", ["address", "ts", "sig", "summary"], "events"),
+]
+
+def _chunks(conn: sqlite3.Connection, table: str, columns: list, size: int):
+    cur = conn.execute(f"SELECT {','.join(columns)} FROM {table}")
+    while True:
+        rows = cur.fetchmany(size)
+        if not rows:
+            return
+        yield rows
+
+def _typed(table: str, rows: list) -> list:
+    # asyncpg is strict about Python types: SQLite may hand back ints for REAL columns
+    if table == "wallet_aggregates":
+        return [(r[0], r[1], int(r[2] or 0), int(r[3] or 0), int(r[4] or 0), float(r[5] or 0), float(r[6] or 0),
+                 r[7], float(r[8] or 0), r[9], int(r[10]) if r[10] is not None else None) for r in rows]
+    if table == "wallet_positions":
+        return [(r[0], r[1], float(r[2]), float(r[3]), int(r[4])) for r in rows]
+    if table == "mint_pnl":
+        return [(r[0], r[1], float(r[2]), int(r[3])) for r in rows]
+    return rows
+
+async def migrate(sqlite_path: str, pg: PostgresStorage, chunk: int = 5000, events: str = "if-empty"):
+    src = sqlite3.connect(sqlite_path)
+    try:
+        await pg.start()
+        copy_events = events == "always" or (await pg.pool.fetchval("SELECT count(*) FROM (SELECT 1 FROM recent_events LIMIT 1) x")) == 0
+        if copy_events:
+            # Partitions for the migrated history (within retention) before COPYing into them
+            oldest = src.execute("SELECT MIN(ts) FROM recent_events").fetchone()[0]
+            if oldest is not None:
+                await pg.ensure_partitions(since=int(oldest))
+        for table, columns, kind in TABLES:
+            if kind == "events" and not copy_events:
+                print("recent_events: target not empty, skipped (use --events always)", file=sys.stderr)
+                continue
+            t0 = time.time()
+            n = 0
+            for rows in _chunks(src, table, columns, chunk):
+                rows = _typed(table, rows)
+                if kind in ("users", "tracks"):
+                    n += await pg.copy_rows(table, columns, rows, "ON CONFLICT DO NOTHING")
+                elif kind == "aggs":
+                    n += await pg.upsert_aggs(rows)
+                elif kind == "positions":
+                    n += await pg.upsert_positions(rows)
+                elif kind == "mint_pnl":
+                    n += await pg.upsert_mint_pnl(rows)
+                else:
+                    n += await pg.insert_events(rows)
+            print(f"{table}: {n} rows in {time.time()-t0:.1f}s", file=sys.stderr)
+    finally:
+        src.close()
+        await pg.close()
+
+def main(argv: Optional[list] = None):
+    from settings import SETTINGS
+    ap = argparse.ArgumentParser(description="Copy a SQLite bot.db into Postgres")
+    ap.add_argument("--sqlite", default=SETTINGS.sqlite_path)
+    ap.add_argument("--dsn", default=SETTINGS.pg_dsn)
+    ap.add_argument("--chunk", type=int, default=5000)
+    ap.add_argument("--events", choices=["if-empty", "always"], default="if-empty")
+    args = ap.parse_args(argv)
+    pg = PostgresStorage(args.dsn, partition_days=SETTINGS.pg_partition_days, retention_days=SETTINGS.events_retention_days)
+    asyncio.run(migrate(args.sqlite, pg, chunk=args.chunk, events=args.events))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,338 @@
+import asyncpg, time
+from typing import Optional, List, Tuple
+from storage import Storage, AGG_FIELDS
+
+# Postgres backend on an asyncpg pool. asyncpg prepares and caches statements
+# per connection. Multi-row writes go through executemany, and big ones through
+# COPY (into a temp staging table first when they need ON CONFLICT).
+# recent_events is range-partitioned on ts: expiring history is a DROP TABLE
+# of whole partitions rather than a large DELETE.
+
+UPSERT_AGG_SQL = (
+    f"INSERT INTO wallet_aggregates(address,{','.join(AGG_FIELDS)}) VALUES({','.join(f'${i+1}' for i in range(len(AGG_FIELDS)+1))})\n"
+    f"ON CONFLICT(address) DO UPDATE SET " + ",".join([f"{k}=excluded.{k}" for k in AGG_FIELDS])
+)
+UPSERT_POSITION_SQL = (
+    "INSERT INTO wallet_positions(address,mint,qty,avg_cost_usd,updated_at) VALUES($1,$2,$3,$4,$5)\n"
+    "ON CONFLICT(address,mint) DO UPDATE SET qty=excluded.qty, avg_cost_usd=excluded.avg_cost_usd, updated_at=excluded.updated_at"
+)
+ADD_MINT_PNL_SQL = (
+    "INSERT INTO mint_pnl(mint,address,pnl_usd,updated_at) VALUES($1,$2,$3,$4)\n"
+    "ON CONFLICT(mint,address) DO UPDATE SET pnl_usd=mint_pnl.pnl_usd+excluded.pnl_usd, updated_at=excluded.updated_at"
+)
+INSERT_EVENT_SQL = "INSERT INTO recent_events(address,ts,sig,summary) VALUES($1,$2,$3,$4)"
+EVENT_COLUMNS = ["address", "ts", "sig", "summary"]
+
+# Event batches at least this big are COPYed instead of executemany'd
+COPY_MIN_ROWS = 50
+
+class PostgresStorage(Storage):
+    name = "postgres"
+
+    def __init__(self, dsn: str, min_size: int = 2, max_size: int = 10, partition_days: int = 7,
+                 partitions_ahead: int = 2, retention_days: int = 90, schema: str = "schema_pg.sql"):
+        self.dsn = dsn
+        self.min_size = min_size
+        self.max_size = max_size
+        self.period = max(1, partition_days) * 24 * 3600
+        self.partitions_ahead = partitions_ahead
+        self.retention_days = retention_days
+        self.schema = schema
+        self.pool: Optional[asyncpg.Pool] = None
+        self.writes = 0
+        self.commits = 0
+
+    async def start(self):
+        if self.pool is not None:
+            return
+        self.pool = await asyncpg.create_pool(self.dsn, min_size=self.min_size, max_size=self.max_size)
+        with open(self.schema, "r", encoding="utf-8") as f:
+            schema = f.read()
+        async with self.pool.acquire() as conn:
+            await conn.execute(schema)
+        await self.ensure_partitions()
+
+    async def close(self):
+        if self.pool is not None:
+            await self.pool.close()
+            self.pool = None
+
+    def stats(self) -> dict:
+        return {"depth": 0, "writes": self.writes, "commits": self.commits}
+
+    async def _execute(self, sql: str, *args) -> str:
+        self.writes += 1
+        self.commits += 1
+        return await self.pool.execute(sql, *args)
+
+    async def _fetch(self, sql: str, *args) -> list:
+        return [tuple(r) for r in await self.pool.fetch(sql, *args)]
+
+    # ---------------- Partitions ----------------
+
+    def _partition_name(self, start: int) -> str:
+        return f"recent_events_p{start}"
+
+    async def _partitions(self, conn) -> dict:
+        # start ts -> partition name, for the range partitions we manage
+        rows = await conn.fetch(
+            "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid=i.inhrelid "
+            "WHERE i.inhparent='recent_events'::regclass AND c.relname LIKE 'recent_events_p%'"
+        )
+        return {int(r[0][len("recent_events_p"):]): r[0] for r in rows}
+
+    async def ensure_partitions(self, since: Optional[int] = None):
+        # Partitions from `since` (default: now) through `partitions_ahead` periods
+        # ahead, never further back than the retention window
+        now = int(time.time())
+        floor = now - self.retention_days * 24 * 3600
+        first = max(since if since is not None else now, floor) // self.period * self.period
+        last = now // self.period * self.period + self.partitions_ahead * self.period
+        async with self.pool.acquire() as conn:
+            existing = await self._partitions(conn)
+            for start in range(first, last + 1, self.period):
+                if start in existing:
+                    continue
+                try:
+                    await conn.execute(
+                        f"CREATE TABLE IF NOT EXISTS {self._partition_name(start)} PARTITION OF recent_events "
+                        f"FOR VALUES FROM ({start}) TO ({start + self.period})"
+                    )
+                except asyncpg.PostgresError:
+                    # Default partition already holds rows in this range: they stay there
+                    pass
+
+    async def drop_expired_partitions(self, cutoff: int) -> int:
+        dropped = 0
+        async with self.pool.acquire() as conn:
+            for start, name in sorted((await self._partitions(conn)).items()):
+                if start + self.period <= cutoff:
+                    await conn.execute(f"DROP TABLE IF EXISTS {name}")
+                    dropped += 1
+        return dropped
+
+    # ---------------- Bulk ----------------
+
+    async def copy_rows(self, table: str, columns: List[str], records: list, conflict: Optional[str] = None) -> int:
+        # COPY `records` into `table`. With `conflict` (an ON CONFLICT clause) the
+        # rows are COPYed into a temp staging table and merged with one INSERT.
+        if not records:
+            return 0
+        cols = ",".join(columns)
+        async with self.pool.acquire() as conn:
+            async with conn.transaction():
+                if conflict is None:
+                    await conn.copy_records_to_table(table, records=records, columns=columns)
+                else:
+                    stage = f"_stage_{table}"
+                    await conn.execute(f"CREATE TEMP TABLE {stage} (LIKE {table} INCLUDING DEFAULTS) ON COMMIT DROP")
+                    await conn.copy_records_to_table(stage, records=records, columns=columns)
+                    await conn.execute(f"INSERT INTO {table}({cols}) SELECT {cols} FROM {stage} {conflict}")
+        self.writes += 1
+        self.commits += 1
+        return len(records)
+
+    async def upsert_aggs(self, rows: list) -> int:
+        # rows: (address, *AGG_FIELDS)
+        return await self.copy_rows(
+            "wallet_aggregates", ["address"] + AGG_FIELDS, rows,
+            "ON CONFLICT(address) DO UPDATE SET " + ",".join(f"{k}=excluded.{k}" for k in AGG_FIELDS),
+        )
+
+    async def upsert_positions(self, rows: list) -> int:
+        # rows: (address, mint, qty, avg_cost_usd, updated_at)
+        return await self.copy_rows(
+            "wallet_positions", ["address", "mint", "qty", "avg_cost_usd", "updated_at"], rows,
+            "ON CONFLICT(address,mint) DO UPDATE SET qty=excluded.qty, avg_cost_usd=excluded.avg_cost_usd, updated_at=excluded.updated_at",
+        )
+
+    async def upsert_mint_pnl(self, rows: list) -> int:
+        # rows: (mint, address, pnl_usd, updated_at); replaces the totals
+        return await self.copy_rows(
+            "mint_pnl", ["mint", "address", "pnl_usd", "updated_at"], rows,
+            "ON CONFLICT(mint,address) DO UPDATE SET pnl_usd=excluded.pnl_usd, updated_at=excluded.updated_at",
+        )
+
+    async def insert_events(self, rows: list) -> int:
+        # rows: (address, ts, sig, summary)
+        return await self.copy_rows("recent_events", EVENT_COLUMNS, rows)
+
+    # ---------------- Queries ----------------
+
+    async def add_user(self, user_id: int):
+        await self._execute("INSERT INTO users(user_id, created_at) VALUES($1,$2) ON CONFLICT DO NOTHING", user_id, int(time.time()))
+
+    async def add_track(self, user_id: int, address: str, name: Optional[str]):
+        await self._execute(
+            "INSERT INTO tracked_wallets(user_id,address,name,created_at) VALUES($1,$2,$3,$4) ON CONFLICT DO NOTHING",
+            user_id, address, name, int(time.time())
+        )
+
+    async def rm_track(self, user_id: int, address: str) -> int:
+        status = await self._execute("DELETE FROM tracked_wallets WHERE user_id=$1 AND address=$2", user_id, address)
+        # "DELETE <n>"
+        return int(status.split()[-1])
+
+    async def list_tracks(self, user_id: int) -> List[Tuple[str, str]]:
+        return await self._fetch("SELECT address, COALESCE(name,'') FROM tracked_wallets WHERE user_id=$1 ORDER BY created_at DESC", user_id)
+
+    async def all_tracks(self) -> List[Tuple[int, str, Optional[str]]]:
+        return await self._fetch("SELECT user_id, address, name FROM tracked_wallets")
+
+    async def tracked_addresses(self) -> set:
+        return {r[0] for r in await self._fetch("SELECT DISTINCT address FROM tracked_wallets")}
+
+    async def upsert_agg(self, address: str, agg: dict):
+        await self._execute(UPSERT_AGG_SQL, address, *[agg.get(k) for k in AGG_FIELDS])
+
+    async def get_agg(self, address: str) -> Optional[dict]:
+        row = await self.pool.fetchrow("SELECT * FROM wallet_aggregates WHERE address=$1", address)
+        return dict(row) if row else None
+
+    async def upsert_position(self, address: str, mint: str, qty: float, avg_cost_usd: float):
+        await self._execute(UPSERT_POSITION_SQL, address, mint, float(qty), float(avg_cost_usd), int(time.time()))
+
+    async def get_position(self, address: str, mint: str) -> Optional[dict]:
+        row = await self.pool.fetchrow("SELECT qty, avg_cost_usd FROM wallet_positions WHERE address=$1 AND mint=$2", address, mint)
+        if not row:
+            return None
+        return {"qty": row[0], "avg_cost_usd": row[1]}
+
+    async def add_event(self, address: str, ts: int, sig: str, summary: str):
+        await self._execute(INSERT_EVENT_SQL, address, int(ts), sig, summary)
+
+    async def get_recent_events(self, address: str, limit: int = 20) -> List[Tuple[int, str, str]]:
+        return await self._fetch("SELECT ts, sig, summary FROM recent_events WHERE address=$1 ORDER BY ts DESC LIMIT $2", address, limit)
+
+    async def best_plays_for_user(self, user_id: int, limit: int = 3) -> List[Tuple[float, str, str, str]]:
+        return await self._fetch(
+            "SELECT COALESCE(a.best_play_pnl_usd,0), t.address, COALESCE(a.best_play_summary,''), COALESCE(a.best_play_sig,'')\n"
+            "FROM tracked_wallets t LEFT JOIN wallet_aggregates a ON a.address=t.address\n"
+            "WHERE t.user_id=$1 ORDER BY COALESCE(a.best_play_pnl_usd,0) DESC, t.created_at DESC LIMIT $2",
+            user_id, limit
+        )
+
+    async def top_best_plays(self, limit: int = 3) -> List[Tuple[float, str, str, str]]:
+        return await self._fetch(
+            "SELECT best_play_pnl_usd, address, COALESCE(best_play_summary,''), COALESCE(best_play_sig,'')\n"
+            "FROM wallet_aggregates a\n"
+            "WHERE best_play_sig IS NOT NULL AND EXISTS (SELECT 1 FROM tracked_wallets t WHERE t.address=a.address)\n"
+            "ORDER BY best_play_pnl_usd DESC LIMIT $1",
+            limit
+        )
+
+    async def load_wallet_state(self, address: str, mints: List[str]):
+        async with self.pool.acquire() as conn:
+            row = await conn.fetchrow("SELECT * FROM wallet_aggregates WHERE address=$1", address)
+            positions = {}
+            if mints:
+                for mint, qty, avg in await conn.fetch(
+                    "SELECT mint, qty, avg_cost_usd FROM wallet_positions WHERE address=$1 AND mint = ANY($2::text[])",
+                    address, list(mints)
+                ):
+                    positions[mint] = {"qty": qty, "avg_cost_usd": avg}
+        return (dict(row) if row else None), positions
+
+    async def save_wallet_state(self, address: str, agg: dict, positions: dict, events: List[Tuple[int, str, str]],
+                                mint_pnl: Optional[dict] = None):
+        now = int(time.time())
+        async with self.pool.acquire() as conn:
+            async with conn.transaction():
+                if positions:
+                    await conn.executemany(
+                        UPSERT_POSITION_SQL,
+                        [(address, mint, float(p["qty"]), float(p["avg_cost_usd"]), now) for mint, p in positions.items()]
+                    )
+                if events:
+                    rows = [(address, int(ts), sig, summary) for ts, sig, summary in events]
+                    if len(rows) >= COPY_MIN_ROWS:
+                        await conn.copy_records_to_table("recent_events", records=rows, columns=EVENT_COLUMNS)
+                    else:
+                        await conn.executemany(INSERT_EVENT_SQL, rows)
+                if mint_pnl:
+                    await conn.executemany(ADD_MINT_PNL_SQL, [(mint, address, float(pnl), now) for mint, pnl in mint_pnl.items()])
+                await conn.execute(UPSERT_AGG_SQL, address, *[agg.get(k) for k in AGG_FIELDS])
+        self.writes += 1
+        self.commits += 1
+
+    async def top_traders(self, mint: str, limit: int = 5) -> List[Tuple[float, str]]:
+        return await self._fetch(
+            "SELECT pnl_usd, address FROM mint_pnl WHERE mint=$1 ORDER BY pnl_usd DESC LIMIT $2",
+            mint, limit
+        )
+
+    async def load_trending(self) -> List[Tuple[str, str]]:
+        return await self._fetch("SELECT mint, data FROM trending_mints")
+
+    async def save_trending(self, rows: List[Tuple[str, str]], deleted: List[str]):
+        now = int(time.time())
+        async with self.pool.acquire() as conn:
+            async with conn.transaction():
+                if rows:
+                    await conn.executemany(
+                        "INSERT INTO trending_mints(mint,data,updated_at) VALUES($1,$2,$3)\n"
+                        "ON CONFLICT(mint) DO UPDATE SET data=excluded.data, updated_at=excluded.updated_at",
+                        [(mint, data, now) for mint, data in rows]
+                    )
+                if deleted:
+                    await conn.execute("DELETE FROM trending_mints WHERE mint = ANY($1::text[])", list(deleted))
+        self.writes += 1
+        self.commits += 1
+
+    async def replace_wallets(self, wallets: List[dict], retention_days: int) -> int:
+        now = int(time.time())
+        cutoff = now - retention_days*24*3600
+        addrs = [rec["a"] for rec in wallets]
+        aggs, positions, events, pnl = [], [], [], []
+        for rec in wallets:
+            address, agg = rec["a"], rec["agg"]
+            aggs.append((address, agg.get("last_sig"), int(agg.get("total_trades") or 0), int(agg.get("wins") or 0),
+                         int(agg.get("losses") or 0), float(agg.get("realized_pnl_sol") or 0), float(agg.get("realized_pnl_usd") or 0),
+                         agg.get("best_play_sig"), float(agg.get("best_play_pnl_usd") or 0), agg.get("best_play_summary"), now))
+            positions += [(address, m, float(p["qty"]), float(p["avg_cost_usd"]), now) for m, p in rec["pos"].items()]
+            events += [(address, int(ts), sig, summary) for ts, sig, summary in rec["ev"] if ts >= cutoff]
+            pnl += [(m, address, float(v), now) for m, v in rec["pnl"].items()]
+        if events:
+            await self.ensure_partitions(since=min(ts for _, ts, _, _ in events))
+        # Keep the live ingestion cursor: replayed data may end before it
+        upsert_agg = UPSERT_AGG_SQL.replace("last_sig=excluded.last_sig", "last_sig=COALESCE(wallet_aggregates.last_sig, excluded.last_sig)")
+        async with self.pool.acquire() as conn:
+            async with conn.transaction():
+                for table in ("wallet_positions", "recent_events", "mint_pnl"):
+                    await conn.execute(f"DELETE FROM {table} WHERE address = ANY($1::text[])", addrs)
+                await conn.executemany(upsert_agg, aggs)
+                if positions:
+                    await conn.copy_records_to_table("wallet_positions", records=positions, columns=["address", "mint", "qty", "avg_cost_usd", "updated_at"])
+                if events:
+                    await conn.copy_records_to_table("recent_events", records=events, columns=EVENT_COLUMNS)
+                if pnl:
+                    await conn.copy_records_to_table("mint_pnl", records=pnl, columns=["mint", "address", "pnl_usd", "updated_at"])
+        self.writes += 1
+        self.commits += 1
+        return len(wallets)
+
+    # ---------------- Maintenance ----------------
+
+    async def run_maintenance(self, retention_days: int, per_wallet_cap: int, chunk: int = 500) -> dict:
+        self.retention_days = retention_days
+        await self.ensure_partitions()
+        cutoff = int(time.time()) - retention_days*24*3600
+        dropped = await self.drop_expired_partitions(cutoff)
+        # Whatever is left below the cutoff sits in the default or the boundary partition
+        status = await self._execute("DELETE FROM recent_events WHERE ts<$1", cutoff)
+        pruned = int(status.split()[-1])
+        capped = 0
+        if per_wallet_cap > 0:
+            over = [r[0] for r in await self._fetch(
+                "SELECT address FROM recent_events GROUP BY address HAVING COUNT(*)>$1", per_wallet_cap
+            )]
+            for i in range(0, len(over), chunk):
+                status = await self._execute(
+                    "DELETE FROM recent_events e USING ("
+                    " SELECT id, ts FROM (SELECT id, ts, row_number() OVER (PARTITION BY address ORDER BY ts DESC) AS rn"
+                    " FROM recent_events WHERE address = ANY($1::text[])) x WHERE rn>$2"
+                    ") d WHERE e.id=d.id AND e.ts=d.ts",
+                    over[i:i+chunk], per_wallet_cap
+                )
+                capped += int(status.split()[-1])
+        return {"pruned": pruned, "capped": capped, "dropped_partitions": dropped}
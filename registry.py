@@ -0,0 +1,69 @@
+from typing import Callable, Optional
+
+# In-memory map of tracked addresses to the users tracking them (and the name
+# each gave it), loaded once at startup and kept current by db.add_track /
+# db.rm_track. It is the one source for ingestion, alerts and balance refresh. Listeners get fn("add", address) when an address gains its first
+# tracker and fn("remove", address) when it loses its last one, so ingestion
+# starts or stops right away instead of waiting for a table rescan.
+
+class TrackedRegistry:
+    def __init__(self):
+        self._users: dict[str, dict] = {}  # address -> {user_id: name}
+        self._listeners: list = []
+
+    def __contains__(self, address: str) -> bool:
+        return address in self._users
+
+    def __len__(self) -> int:
+        return len(self._users)
+
+    def addresses(self) -> set:
+        return set(self._users)
+
+    def refcount(self, address: str) -> int:
+        return len(self._users.get(address) or ())
+
+    def subscribers(self, address: str) -> dict:
+        return self._users.get(address) or {}
+
+    def add_listener(self, fn: Callable[[str, str], None]):
+        self._listeners.append(fn)
+
+    def _notify(self, op: str, address: str):
+        for fn in self._listeners:
+            try:
+                fn(op, address)
+            except Exception:
+                pass
+
+    def add(self, user_id: int, address: str, name: Optional[str] = None):
+        # Re-adding keeps the first name, same as the INSERT OR IGNORE / DO NOTHING
+        users = self._users.get(address)
+        if users is None:
+            self._users[address] = {user_id: name or ""}
+            self._notify("add", address)
+        else:
+            users.setdefault(user_id, name or "")
+
+    def remove(self, user_id: int, address: str):
+        users = self._users.get(address)
+        if users is None:
+            return
+        users.pop(user_id, None)
+        if not users:
+            del self._users[address]
+            self._notify("remove", address)
+
+    def load(self, rows: list):
+        # rows: (user_id, address, name). Replaces the contents and notifies
+        # only the differences, so it doubles as the consistency check.
+        users: dict[str, dict] = {}
+        for user_id, address, name in rows:
+            users.setdefault(address, {})[user_id] = name or ""
+        added = users.keys() - self._users.keys()
+        removed = self._users.keys() - users.keys()
+        self._users = users
+        for address in removed:
+            self._notify("remove", address)
+        for address in added:
+            self._notify("add", address)
@@ -0,0 +1,231 @@
+import argparse, asyncio, glob, gzip, os, sys, tempfile, time, ujson
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
+from workers import shard_of
+
+# Record parsed Helius transactions and rebuild wallet aggregates from them.
+#
+# Recording (RECORD_DIR set): the Helius parse queue appends every parsed tx
+# with the wallets that asked for it, and a swap listener appends the USD
+# prices each applied event used, to RECORD_DIR/helius-YYYYMMDD.jsonl.gz.
+#
+# Replay:  python -m replay --input ./recordings --db ./bot.db --workers 8
+# 1. one pass over the recordings partitions (address, tx) by address hash
+#    into per-shard temp files;
+# 2. a process pool re-runs summarize_helius_tx + the avg-cost math per
+#    shard, in memory, ordered by (timestamp, slot, record order), with the
+#    recorded prices, so results are deterministic;
+# 3. each shard's results are loaded through the configured storage backend
+#    (STORAGE_BACKEND: SQLite --db or Postgres --dsn), replacing the wallets'
+#    aggregates, positions, recent events and mint PnL (the live last_sig
+#    cursor is kept).
+
+class TxRecorder:
+    def __init__(self, directory: str, name: str = "helius", flush_interval: float = 1.0):
+        # One file per writer process: concurrent gzip appends would interleave
+        self.directory = directory
+        self.name = name
+        self.flush_interval = flush_interval
+        self._buf: list[str] = []
+        self.records = 0
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self) -> str:
+        return os.path.join(self.directory, time.strftime(f"{self.name}-%Y%m%d.jsonl.gz", time.gmtime()))
+
+    def record_tx(self, tx: dict, addresses: list[str]):
+        self._buf.append(ujson.dumps({"k": "tx", "a": addresses, "tx": tx}))
+
+    def record_prices(self, address: str, results: list):
+        # Swap listener: prices actually used, so replay doesn't need DexScreener
+        for r in results:
+            prices = {}
+            if r["in"].get("mint"):
+                prices[r["in"]["mint"]] = r["in_price"]
+            if r["out"].get("mint"):
+                prices[r["out"]["mint"]] = r["out_price"]
+            self._buf.append(ujson.dumps({"k": "px", "sig": r["sig"], "p": prices}))
+
+    def _write(self, lines: list[str]):
+        # Appending makes a multi-member gzip file, which gzip.open reads fine
+        with gzip.open(self._path(), "at", encoding="utf-8") as f:
+            f.write("\n".join(lines) + "\n")
+
+    async def flush(self):
+        if not self._buf:
+            return
+        lines, self._buf = self._buf, []
+        await asyncio.to_thread(self._write, lines)
+        self.records += len(lines)
+
+    async def run(self):
+        try:
+            while True:
+                await asyncio.sleep(self.flush_interval)
+                await self.flush()
+        finally:
+            await self.flush()
+
+# ---------------- Replay ----------------
+
+def _input_files(inputs: list[str]) -> list[str]:
+    files = []
+    for p in inputs:
+        if os.path.isdir(p):
+            files.extend(sorted(glob.glob(os.path.join(p, "*.jsonl.gz")) + glob.glob(os.path.join(p, "*.jsonl"))))
+        else:
+            files.append(p)
+    return files
+
+def _open(path: str):
+    return gzip.open(path, "rt", encoding="utf-8") if path.endswith(".gz") else open(path, "r", encoding="utf-8")
+
+def partition(files: list[str], shards: int, workdir: str) -> list[str]:
+    # Route each (address, tx) line to its shard; price records go to every shard
+    # that saw the signature, which we only know afterwards, so they're kept in one
+    # side file that each worker loads.
+    paths = [os.path.join(workdir, f"shard-{i}.jsonl") for i in range(shards)]
+    outs = [open(p, "w", encoding="utf-8") for p in paths]
+    prices = open(os.path.join(workdir, "prices.jsonl"), "w", encoding="utf-8")
+    seq = 0
+    try:
+        for path in files:
+            with _open(path) as f:
+                for line in f:
+                    if not line.strip():
+                        continue
+                    rec = ujson.loads(line)
+                    if rec.get("k") == "px":
+                        prices.write(line if line.endswith("\n") else line + "\n")
+                        continue
+                    tx = rec.get("tx") or {}
+                    seq += 1
+                    for address in rec.get("a") or []:
+                        outs[shard_of(address, shards)].write(ujson.dumps({"a": address, "n": seq, "tx": tx}) + "\n")
+    finally:
+        for o in outs:
+            o.close()
+        prices.close()
+    return paths
+
+def replay_shard(shard_path: str, prices_path: str, out_path: str) -> tuple[str, int, int]:
+    # Runs in a worker process
+    from helio import summarize_helius_tx
+    from aggregates import _apply_one
+
+    by_wallet: dict[str, list] = {}
+    with open(shard_path, "r", encoding="utf-8") as f:
+        for line in f:
+            rec = ujson.loads(line)
+            tx = rec["tx"]
+            key = (int(tx.get("timestamp") or 0), int(tx.get("slot") or 0), rec["n"])
+            by_wallet.setdefault(rec["a"], []).append((key, tx))
+
+    wanted = {(tx.get("signature") or tx.get("txHash")) for txs in by_wallet.values() for _, tx in txs}
+    prices: dict[str, dict] = {}
+    with open(prices_path, "r", encoding="utf-8") as f:
+        for line in f:
+            rec = ujson.loads(line)
+            if rec.get("sig") in wanted:
+                prices.setdefault(rec["sig"], {}).update(rec.get("p") or {})
+
+    n_events = 0
+    with open(out_path, "w", encoding="utf-8") as out:
+        for address in sorted(by_wallet):
+            txs = sorted(by_wallet[address], key=lambda x: x[0])
+            state = {
+                "last_sig": None, "total_trades": 0, "wins": 0, "losses": 0,
+                "realized_pnl_sol": 0.0, "realized_pnl_usd": 0.0,
+                "best_play_sig": None, "best_play_pnl_usd": 0.0, "best_play_summary": "",
+            }
+            positions: dict = {}
+            dirty: set = set()
+            mint_pnl: dict = {}
+            events = []
+            seen = set()
+            for _, tx in txs:
+                sig = tx.get("signature") or tx.get("txHash")
+                if sig in seen:
+                    continue
+                seen.add(sig)
+                for ev in summarize_helius_tx(tx, address):
+                    summary, _ = _apply_one(state, positions, dirty, ev, prices.get(ev.get("sig"), {}), mint_pnl)
+                    events.append((int(ev["ts"] or 0), ev.get("sig") or "", summary))
+            n_events += len(events)
+            out.write(ujson.dumps({"a": address, "agg": state, "pos": positions, "ev": events, "pnl": mint_pnl}) + "\n")
+    return out_path, len(by_wallet), n_events
+
+def _read_results(result_path: str, batch: int):
+    with open(result_path, "r", encoding="utf-8") as f:
+        wallets = []
+        for line in f:
+            wallets.append(ujson.loads(line))
+            if len(wallets) >= batch:
+                yield wallets
+                wallets = []
+        if wallets:
+            yield wallets
+
+def _backend(args):
+    # Same backend the bot uses (STORAGE_BACKEND), pointed at --db / --dsn
+    from settings import SETTINGS
+    if SETTINGS.storage_backend == "postgres":
+        from pg_store import PostgresStorage
+        return PostgresStorage(args.dsn, partition_days=SETTINGS.pg_partition_days, retention_days=SETTINGS.events_retention_days)
+    from sqlite_store import SQLiteStorage
+    return SQLiteStorage(args.db)
+
+async def load_shard(backend, result_path: str, retention_days: int, batch: int = 500) -> int:
+    # One transaction per batch of wallets; each wallet is replaced atomically
+    loaded = 0
+    for wallets in _read_results(result_path, batch):
+        loaded += await backend.replace_wallets(wallets, retention_days)
+    return loaded
+
+async def _run(args, files: list):
+    from settings import SETTINGS
+    shards = args.shards or args.workers * 4
+    t0 = time.time()
+    backend = None if args.dry_run else _backend(args)
+    if backend is not None:
+        await backend.start()
+    try:
+        with tempfile.TemporaryDirectory(prefix="replay-") as workdir:
+            shard_paths = partition(files, shards, workdir)
+            prices_path = os.path.join(workdir, "prices.jsonl")
+            print(f"partitioned {len(files)} file(s) into {shards} shards in {time.time()-t0:.1f}s", file=sys.stderr)
+
+            wallets = events = loaded = 0
+            loop = asyncio.get_running_loop()
+            with ProcessPoolExecutor(max_workers=args.workers) as pool:
+                futs = [loop.run_in_executor(pool, replay_shard, p, prices_path, p + ".out") for p in shard_paths]
+                for fut in futs:
+                    out_path, n_wallets, n_events = await fut
+                    wallets += n_wallets
+                    events += n_events
+                    # Load shards here as workers finish
+                    if backend is not None:
+                        loaded += await load_shard(backend, out_path, SETTINGS.events_retention_days)
+            print(f"replayed {wallets} wallets / {events} events, loaded {loaded} in {time.time()-t0:.1f}s", file=sys.stderr)
+    finally:
+        if backend is not None:
+            await backend.close()
+
+def main(argv: Optional[list] = None):
+    from settings import SETTINGS
+    ap = argparse.ArgumentParser(description="Rebuild wallet aggregates from recorded Helius transactions")
+    ap.add_argument("--input", nargs="+", default=[SETTINGS.record_dir or "./recordings"], help="recording files or directories")
+    ap.add_argument("--db", default=SETTINGS.sqlite_path, help="SQLite database (STORAGE_BACKEND=sqlite)")
+    ap.add_argument("--dsn", default=SETTINGS.pg_dsn, help="Postgres DSN (STORAGE_BACKEND=postgres)")
+    ap.add_argument("--workers", type=int, default=os.cpu_count() or 2)
+    ap.add_argument("--shards", type=int, default=0, help="default: 4x workers")
+    ap.add_argument("--dry-run", action="store_true", help="recompute only, don't touch the database")
+    args = ap.parse_args(argv)
+
+    files = _input_files(args.input)
+    if not files:
+        sys.exit("no recordings found")
+    asyncio.run(_run(args, files))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+import asyncio, heapq, random, time
+from typing import Awaitable, Callable
+from ratelimit import TokenBucket
+from metrics import POLL_LAG, BACKGROUND_ERRORS
+
+# Central poll scheduler: one min-heap of (next_due, address) instead of one
+# sleeping task per wallet. Intervals adapt to activity (hot wallets shrink to
+# min_interval, idle ones back off to max_interval) and dispatch is bounded by
+# a concurrency limit and a token-bucket rate budget.
+
+class _Wallet:
+    __slots__ = ("interval", "gen", "due", "polls", "hits", "errors", "poked")
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self.gen = 0
+        self.due = 0.0
+        self.polls = 0
+        self.hits = 0
+        self.errors = 0
+        self.poked = False
+
+class PollScheduler:
+    def __init__(
+        self,
+        poll: Callable[[str], Awaitable[int]],
+        base_interval: float = 15,
+        min_interval: float = 5,
+        max_interval: float = 300,
+        backoff: float = 1.5,
+        jitter: float = 0.2,
+        concurrency: int = 32,
+        rate: float = 20,
+    ):
+        # poll(address) returns how many new signatures it found
+        self.poll = poll
+        self.base_interval = base_interval
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.backoff = backoff
+        self.jitter = jitter
+        self.sem = asyncio.Semaphore(concurrency)
+        self.bucket = TokenBucket(rate)
+        self._heap: list = []  # (due, gen, address)
+        self._wallets: dict[str, _Wallet] = {}
+        self._wake = asyncio.Event()
+        self._inflight: set = set()
+        self._tasks: set = set()
+        self.last_lag = 0.0
+        self.max_lag = 0.0
+
+    def __contains__(self, address: str) -> bool:
+        return address in self._wallets
+
+    def addresses(self) -> set:
+        return set(self._wallets)
+
+    def _jittered(self, interval: float) -> float:
+        return interval * random.uniform(1 - self.jitter, 1 + self.jitter)
+
+    def _push(self, address: str, w: _Wallet, delay: float):
+        w.gen += 1
+        w.due = time.monotonic() + delay
+        heapq.heappush(self._heap, (w.due, w.gen, address))
+        self._wake.set()
+
+    def add(self, address: str, immediate: bool = False):
+        if address in self._wallets:
+            return
+        w = _Wallet(self.base_interval)
+        self._wallets[address] = w
+        # Spread initial polls over one base interval so startup doesn't bunch up
+        self._push(address, w, 0 if immediate else random.uniform(0, self.base_interval))
+
+    def remove(self, address: str):
+        # Heap entry is dropped lazily when it surfaces
+        self._wallets.pop(address, None)
+
+    def poke(self, address: str):
+        # Poll as soon as possible (e.g. a push notification saw activity)
+        w = self._wallets.get(address)
+        if w is None:
+            return
+        if address in self._inflight:
+            w.poked = True
+        else:
+            self._push(address, w, 0)
+
+    async def run(self):
+        while True:
+            if not self._heap:
+                self._wake.clear()
+                await self._wake.wait()
+                continue
+            due, gen, address = self._heap[0]
+            w = self._wallets.get(address)
+            if w is None or w.gen != gen:
+                heapq.heappop(self._heap)
+                continue
+            delay = due - time.monotonic()
+            if delay > 0:
+                self._wake.clear()
+                try:
+                    await asyncio.wait_for(self._wake.wait(), timeout=delay)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            heapq.heappop(self._heap)
+            await self.sem.acquire()
+            await self.bucket.acquire()
+            lag = time.monotonic() - due
+            self.last_lag = lag
+            self.max_lag = max(self.max_lag, lag)
+            POLL_LAG.observe(lag)
+            self._inflight.add(address)
+            task = asyncio.create_task(self._run_one(address, w))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _run_one(self, address: str, w: _Wallet):
+        try:
+            found = 0
+            try:
+                found = await self.poll(address)
+                w.polls += 1
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                w.errors += 1
+                BACKGROUND_ERRORS.inc(loop="poll_wallet")
+            if found:
+                w.hits += 1
+                w.interval = self.min_interval
+            else:
+                w.interval = min(self.max_interval, w.interval * self.backoff)
+        finally:
+            self._inflight.discard(address)
+            self.sem.release()
+        if self._wallets.get(address) is w:
+            delay = 0 if w.poked else self._jittered(w.interval)
+            w.poked = False
+            self._push(address, w, delay)
+
+    def stats(self) -> dict:
+        now = time.monotonic()
+        overdue = [now - w.due for a, w in self._wallets.items() if w.due < now and a not in self._inflight]
+        return {
+            "wallets": len(self._wallets),
+            "inflight": len(self._inflight),
+            "queue": len(self._heap),
+            "overdue": len(overdue),
+            "lag_last": self.last_lag,
+            "lag_max": self.max_lag,
+            "lag_oldest": max(overdue) if overdue else 0.0,
+        }
@@ -1,3 +1,5 @@
+-- auto_vacuum only takes effect on a new database (or after a full VACUUM)
+PRAGMA auto_vacuum=INCREMENTAL;
 PRAGMA journal_mode=WAL;
 PRAGMA synchronous=NORMAL;
 
@@ -42,7 +44,7 @@ CREATE TABLE IF NOT EXISTS wallet_positions (
   PRIMARY KEY(address, mint)
 );
 
--- Recent compact events (auto-pruned ≤ 90 days)
+-- Recent compact events (pruned to ≤ 90 days by the maintenance job)
 CREATE TABLE IF NOT EXISTS recent_events (
   id INTEGER PRIMARY KEY AUTOINCREMENT,
   address TEXT NOT NULL,
@@ -51,4 +53,25 @@ CREATE TABLE IF NOT EXISTS recent_events (
   summary TEXT NOT NULL
 );
 
+-- Realized PnL per (mint, wallet), summed over every swap out of the mint;
+-- /toptraders reads the top of idx_mint_pnl for one mint
+CREATE TABLE IF NOT EXISTS mint_pnl (
+  mint TEXT NOT NULL,
+  address TEXT NOT NULL,
+  pnl_usd REAL NOT NULL,
+  updated_at INTEGER NOT NULL,
+  PRIMARY KEY(mint, address)
+);
+
+-- Trending engine snapshot: one JSON blob of time buckets per active mint
+CREATE TABLE IF NOT EXISTS trending_mints (
+  mint TEXT PRIMARY KEY,
+  data TEXT NOT NULL,
+  updated_at INTEGER NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS idx_agg_best_play ON wallet_aggregates(best_play_pnl_usd DESC);
+CREATE INDEX IF NOT EXISTS idx_tracked_address ON tracked_wallets(address);
+CREATE INDEX IF NOT EXISTS idx_mint_pnl ON mint_pnl(mint, pnl_usd DESC);
 CREATE INDEX IF NOT EXISTS idx_events_address_ts ON recent_events(address, ts);
+CREATE INDEX IF NOT EXISTS idx_events_ts ON recent_events(ts);
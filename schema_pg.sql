@@ -0,0 +1,76 @@
+-- Postgres schema (STORAGE_BACKEND=postgres); mirrors schema.sql
+
+-- Users
+CREATE TABLE IF NOT EXISTS users (
+  user_id BIGINT PRIMARY KEY,
+  created_at BIGINT NOT NULL
+);
+
+-- Tracked wallets per user
+CREATE TABLE IF NOT EXISTS tracked_wallets (
+  id BIGSERIAL PRIMARY KEY,
+  user_id BIGINT NOT NULL,
+  address TEXT NOT NULL,
+  name TEXT,
+  created_at BIGINT NOT NULL,
+  UNIQUE(user_id, address)
+);
+
+-- Compact per-wallet aggregates (no raw history)
+CREATE TABLE IF NOT EXISTS wallet_aggregates (
+  address TEXT PRIMARY KEY,
+  last_sig TEXT,
+  total_trades BIGINT DEFAULT 0,
+  wins BIGINT DEFAULT 0,
+  losses BIGINT DEFAULT 0,
+  realized_pnl_sol DOUBLE PRECISION DEFAULT 0,
+  realized_pnl_usd DOUBLE PRECISION DEFAULT 0,
+  best_play_sig TEXT,
+  best_play_pnl_usd DOUBLE PRECISION DEFAULT 0,
+  best_play_summary TEXT,
+  updated_at BIGINT
+);
+
+-- Minimal per-token positions for avg cost math
+CREATE TABLE IF NOT EXISTS wallet_positions (
+  address TEXT NOT NULL,
+  mint TEXT NOT NULL,
+  qty DOUBLE PRECISION NOT NULL,
+  avg_cost_usd DOUBLE PRECISION NOT NULL,
+  updated_at BIGINT NOT NULL,
+  PRIMARY KEY(address, mint)
+);
+
+-- Recent compact events, range-partitioned on ts (unix seconds). pg_store
+-- creates fixed-width partitions ahead of time and drops expired ones;
+-- anything outside them (old backfilled history) lands in the default one.
+CREATE TABLE IF NOT EXISTS recent_events (
+  id BIGSERIAL,
+  address TEXT NOT NULL,
+  ts BIGINT NOT NULL,
+  sig TEXT NOT NULL,
+  summary TEXT NOT NULL
+) PARTITION BY RANGE (ts);
+CREATE TABLE IF NOT EXISTS recent_events_default PARTITION OF recent_events DEFAULT;
+
+-- Realized PnL per (mint, wallet), summed over every swap out of the mint;
+-- /toptraders reads the top of idx_mint_pnl for one mint
+CREATE TABLE IF NOT EXISTS mint_pnl (
+  mint TEXT NOT NULL,
+  address TEXT NOT NULL,
+  pnl_usd DOUBLE PRECISION NOT NULL,
+  updated_at BIGINT NOT NULL,
+  PRIMARY KEY(mint, address)
+);
+
+-- Trending engine snapshot: one JSON blob of time buckets per active mint
+CREATE TABLE IF NOT EXISTS trending_mints (
+  mint TEXT PRIMARY KEY,
+  data TEXT NOT NULL,
+  updated_at BIGINT NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS idx_agg_best_play ON wallet_aggregates(best_play_pnl_usd DESC);
+CREATE INDEX IF NOT EXISTS idx_tracked_address ON tracked_wallets(address);
+CREATE INDEX IF NOT EXISTS idx_mint_pnl ON mint_pnl(mint, pnl_usd DESC);
+CREATE INDEX IF NOT EXISTS idx_events_address_ts ON recent_events(address, ts);
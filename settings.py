@@ -13,12 +13,93 @@ class Settings(BaseModel):
     fallback_rpc: str = os.getenv("FALLBACK_RPC_URL", "https://rpc.ankr.com/solana")
     quicknode_rpc: str = os.getenv("QUICKNODE_RPC_URL", "")
     hellomoon_rpc: str = os.getenv("HELLOMOON_RPC_URL", "")
+    rpc_rate_limit: float = float(os.getenv("RPC_RATE_LIMIT", 0))
+    rpc_hedge: bool = os.getenv("RPC_HEDGE", "1") not in ("0", "false", "False", "")
+    rpc_breaker_failures: int = int(os.getenv("RPC_BREAKER_FAILURES", 5))
+    rpc_breaker_cooldown: float = float(os.getenv("RPC_BREAKER_COOLDOWN", 30))
+    balance_cache_ttl: float = float(os.getenv("BALANCE_CACHE_TTL", 90))
+    balance_concurrency: int = int(os.getenv("BALANCE_CONCURRENCY", 4))
+    balance_refresh_interval: float = float(os.getenv("BALANCE_REFRESH_INTERVAL", 60))
 
     ws_rpc: str = os.getenv("WS_RPC_URL", "wss://api.mainnet-beta.solana.com")
+    # "poll" (scheduler only) or "ws" (logsSubscribe push + slow safety-net polling)
+    ingest_mode: str = os.getenv("INGEST_MODE", "poll")
+    ws_subs_per_socket: int = int(os.getenv("WS_SUBS_PER_SOCKET", 500))
+    ws_poll_interval: float = float(os.getenv("WS_POLL_INTERVAL", 600))
+    # Commitment for getSignaturesForAddress and Helius parses. Pushes arrive at
+    # "confirmed"; every listing must use the same level or the cursor can hold a
+    # signature another listing doesn't show yet.
+    commitment: str = os.getenv("COMMITMENT", "confirmed")
+    ws_retry_delay: float = float(os.getenv("WS_RETRY_DELAY", 1.0))  # pushed signature not listed yet: catch up again after this
+    ws_retry_attempts: int = int(os.getenv("WS_RETRY_ATTEMPTS", 5))
 
     helius_key: str = os.getenv("HELIUS_API_KEY", "")
+    helius_url: str = os.getenv("HELIUS_URL", "https://api.helius.xyz/v0/transactions?api-key=")
+    dex_url: str = os.getenv("DEXSCREENER_URL", "https://api.dexscreener.com/latest/dex/tokens/")
+    helius_batch_window_ms: float = float(os.getenv("HELIUS_BATCH_WINDOW_MS", 50))
+    helius_offload_bytes: int = int(os.getenv("HELIUS_OFFLOAD_BYTES", 262144))  # decode larger responses in a worker process
+    helius_decode_workers: int = int(os.getenv("HELIUS_DECODE_WORKERS", 1))  # 0 decodes everything inline
+    helius_concurrency: int = int(os.getenv("HELIUS_CONCURRENCY", 4))
 
+    http_limit: int = int(os.getenv("HTTP_LIMIT", 100))
+    http_limit_per_host: int = int(os.getenv("HTTP_LIMIT_PER_HOST", 20))
+    http_dns_ttl: int = int(os.getenv("HTTP_DNS_TTL", 300))
+    http_keepalive: float = float(os.getenv("HTTP_KEEPALIVE", 30))
+    http_timeout: float = float(os.getenv("HTTP_TIMEOUT", 30))
+    http_connect_timeout: float = float(os.getenv("HTTP_CONNECT_TIMEOUT", 10))
+
+    dex_cache_ttl: float = float(os.getenv("DEX_CACHE_TTL", 20))
+    dex_cache_stale: float = float(os.getenv("DEX_CACHE_STALE", 120))
+    dex_cache_size: int = int(os.getenv("DEX_CACHE_SIZE", 5000))
+    dex_batch_window_ms: float = float(os.getenv("DEX_BATCH_WINDOW_MS", 5))
+
+    poll_interval: float = float(os.getenv("POLL_INTERVAL", 15))
+    poll_min_interval: float = float(os.getenv("POLL_MIN_INTERVAL", 5))
+    poll_max_interval: float = float(os.getenv("POLL_MAX_INTERVAL", 300))
+    poll_concurrency: int = int(os.getenv("POLL_CONCURRENCY", 32))
+    backfill_max_depth: int = int(os.getenv("BACKFILL_MAX_DEPTH", 1000))
+    backfill_initial_depth: int = int(os.getenv("BACKFILL_INITIAL_DEPTH", 20))
+    backfill_concurrency: int = int(os.getenv("BACKFILL_CONCURRENCY", 4))
+    backfill_parse_attempts: int = int(os.getenv("BACKFILL_PARSE_ATTEMPTS", 5))  # polls before a signature Helius never parses is skipped
+    poll_rate: float = float(os.getenv("POLL_RATE", 20))
+
+    storage_backend: str = os.getenv("STORAGE_BACKEND", "sqlite")  # sqlite | postgres
+    pg_dsn: str = os.getenv("PG_DSN", "postgresql://localhost/solbot")
+    pg_pool_min: int = int(os.getenv("PG_POOL_MIN", 2))
+    pg_pool_max: int = int(os.getenv("PG_POOL_MAX", 10))
+    pg_partition_days: int = int(os.getenv("PG_PARTITION_DAYS", 7))  # recent_events partition width
     sqlite_path: str = os.getenv("SQLITE_PATH", "./bot.db")
+    sqlite_readers: int = int(os.getenv("SQLITE_READERS", 4))
+    sqlite_batch_max: int = int(os.getenv("SQLITE_BATCH_MAX", 256))
+    sqlite_stmt_cache: int = int(os.getenv("SQLITE_STMT_CACHE", 256))
+    alert_global_rate: float = float(os.getenv("ALERT_GLOBAL_RATE", 25))
+    alert_chat_interval: float = float(os.getenv("ALERT_CHAT_INTERVAL", 1.1))
+    alert_max_inflight: int = int(os.getenv("ALERT_MAX_INFLIGHT", 16))  # concurrent Telegram sends
+    alert_max_age: float = float(os.getenv("ALERT_MAX_AGE", 900))
+
+    events_retention_days: int = int(os.getenv("EVENTS_RETENTION_DAYS", 90))
+    events_per_wallet_cap: int = int(os.getenv("EVENTS_PER_WALLET_CAP", 500))
+    maintenance_interval: float = float(os.getenv("MAINTENANCE_INTERVAL", 3600))
+    trending_bucket_seconds: int = int(os.getenv("TRENDING_BUCKET_SECONDS", 300))
+    trending_top_k: int = int(os.getenv("TRENDING_TOP_K", 20))
+    trending_snapshot_interval: float = float(os.getenv("TRENDING_SNAPSHOT_INTERVAL", 60))
+    # /toptraders answers cached per mint; dropped whenever a swap touches the mint
+    toptraders_cache_ttl: float = float(os.getenv("TOPTRADERS_CACHE_TTL", 300))
+    toptraders_cache_size: int = int(os.getenv("TOPTRADERS_CACHE_SIZE", 1000))
+    # Rendered /anywallet and token replies; wallet ones are also dropped on writes
+    wallet_reply_ttl: float = float(os.getenv("WALLET_REPLY_TTL", 30))
+    token_reply_ttl: float = float(os.getenv("TOKEN_REPLY_TTL", 10))
+    reply_cache_size: int = int(os.getenv("REPLY_CACHE_SIZE", 2000))
+    metrics_host: str = os.getenv("METRICS_HOST", "127.0.0.1")
+    metrics_port: int = int(os.getenv("METRICS_PORT", 9108))  # 0 disables the endpoint
+    profile_interval: float = float(os.getenv("PROFILE_INTERVAL", 0))  # 0 disables sampled cProfile
+    profile_duration: float = float(os.getenv("PROFILE_DURATION", 5))
+    record_dir: str = os.getenv("RECORD_DIR", "")  # empty disables tx recording for replay.py
+
+    tracker_workers: int = int(os.getenv("TRACKER_WORKERS", 0))  # 0 runs ingestion inside the bot process
+    # Safety-net rescan of tracked_wallets; add/remove take effect immediately
+    tracking_resync_interval: float = float(os.getenv("TRACKING_RESYNC_INTERVAL", 900))
+
     owner_user_id: int = int(os.getenv("OWNER_USER_ID", 0))
 
 SETTINGS = Settings()
@@ -1,39 +1,243 @@
 from solana.rpc.async_api import AsyncClient
-from solana.publickey import PublicKey
-from typing import Optional
+from collections import deque
+from typing import Optional, Callable
 from settings import SETTINGS
-import asyncio
+from ratelimit import TokenBucket
+from metrics import EXTERNAL_SECONDS, EXTERNAL_ERRORS
+import asyncio, random, time, ujson
+
+try:
+    from solana.publickey import PublicKey
+    _signature = lambda s: s
+except ImportError:
+    # solana>=0.30 takes solders key/signature types and returns typed responses
+    from solders.pubkey import Pubkey
+    from solders.signature import Signature
+    PublicKey = Pubkey.from_string
+    _signature = lambda s: Signature.from_string(s) if s else None
+
+def _as_dict(resp):
+    # Typed (solders) responses -> the JSON-RPC dict shape the rest of this module reads
+    if resp is not None and not isinstance(resp, dict) and hasattr(resp, "to_json"):
+        return ujson.loads(resp.to_json())
+    return resp
+
+# ---------------- RPC router ----------------
+# Every configured endpoint keeps a rolling window of latencies and outcomes.
+# Calls go to the healthiest endpoint first; an endpoint that fails
+# `breaker_failures` times in a row is skipped for `breaker_cooldown` seconds
+# (then gets one trial call). With hedging on, a second endpoint is raced once
+# the first has run past its own p95 latency. A small share of calls goes to
+# a random healthy endpoint so the others keep fresh latency samples.
+
+class _Endpoint:
+    def __init__(self, name: str, url: str, rank: int, window: int = 100):
+        self.name = name
+        self.url = url
+        self.rank = rank
+        self.client = AsyncClient(url)
+        # Per-provider request budget (RPC_RATE_LIMIT req/s, 0 = unlimited)
+        self.bucket = TokenBucket(SETTINGS.rpc_rate_limit)
+        self.latencies: deque = deque(maxlen=window)
+        self.outcomes: deque = deque(maxlen=window)
+        self.consecutive_failures = 0
+        self.open_until = 0.0
+        self.calls = 0
+
+    def record(self, ok: bool, latency: float):
+        self.calls += 1
+        self.outcomes.append(ok)
+        if ok:
+            self.latencies.append(latency)
+            self.consecutive_failures = 0
+        else:
+            self.consecutive_failures += 1
+
+    def error_rate(self) -> float:
+        return (self.outcomes.count(False) / len(self.outcomes)) if self.outcomes else 0.0
+
+    def quantile(self, q: float, default: float, min_samples: int = 10) -> float:
+        if len(self.latencies) < min_samples:
+            return default
+        xs = sorted(self.latencies)
+        return xs[min(len(xs) - 1, int(q * len(xs)))]
+
+    def score(self) -> float:
+        # Lower is better: median latency inflated by recent error rate;
+        # unmeasured endpoints fall back to configuration order
+        return self.quantile(0.5, 0.25 * (self.rank + 1), min_samples=3) * (1 + 5 * self.error_rate())
+
+    def available(self, now: float) -> bool:
+        return now >= self.open_until
+
+    def stats(self) -> dict:
+        return {
+            "url": self.url,
+            "calls": self.calls,
+            "p50": self.quantile(0.5, 0.0),
+            "p95": self.quantile(0.95, 0.0),
+            "error_rate": self.error_rate(),
+            "open": not self.available(time.monotonic()),
+        }
+
+class RpcRouter:
+    def __init__(self, endpoints: list[tuple[str, str]], hedge: bool = True, hedge_min: float = 0.05,
+                 breaker_failures: int = 5, breaker_cooldown: float = 30, explore: float = 0.05):
+        seen = set()
+        self.endpoints: list[_Endpoint] = []
+        for name, url in endpoints:
+            if url and url not in seen:
+                seen.add(url)
+                self.endpoints.append(_Endpoint(name, url, len(self.endpoints)))
+        self.hedge = hedge
+        self.hedge_min = hedge_min
+        self.breaker_failures = breaker_failures
+        self.breaker_cooldown = breaker_cooldown
+        self.explore = explore
+        self.hedged = 0
+
+    def ranked(self) -> list[_Endpoint]:
+        now = time.monotonic()
+        up = [e for e in self.endpoints if e.available(now)]
+        # If every breaker is open, try them all rather than failing outright
+        order = sorted(up or self.endpoints, key=lambda e: e.score())
+        if len(order) > 1 and random.random() < self.explore:
+            order.insert(0, order.pop(random.randrange(1, len(order))))
+        return order
+
+    async def _attempt(self, ep: _Endpoint, method: str, ok: Callable, args, kwargs):
+        await ep.bucket.acquire()
+        t0 = time.monotonic()
+        try:
+            resp = _as_dict(await getattr(ep.client, method)(*args, **kwargs))
+            good = resp is not None and bool(ok(resp))
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            resp, good = None, False
+        elapsed = time.monotonic() - t0
+        ep.record(good, elapsed)
+        EXTERNAL_SECONDS.observe(elapsed, service="rpc", op=method, endpoint=ep.name)
+        if not good:
+            EXTERNAL_ERRORS.inc(service="rpc", op=method, endpoint=ep.name)
+        if not good and ep.consecutive_failures >= self.breaker_failures:
+            ep.open_until = time.monotonic() + self.breaker_cooldown
+        return resp if good else None
+
+    async def call(self, method: str, *args, ok: Callable = lambda r: True, **kwargs):
+        # Returns the first response accepted by `ok`, or None if every endpoint failed
+        order = self.ranked()
+        i = 0
+        while i < len(order):
+            first = asyncio.ensure_future(self._attempt(order[i], method, ok, args, kwargs))
+            racers = [first]
+            if self.hedge and i + 1 < len(order):
+                delay = max(self.hedge_min, order[i].quantile(0.95, 1.0))
+                done, _ = await asyncio.wait([first], timeout=delay)
+                if not done:
+                    self.hedged += 1
+                    racers.append(asyncio.ensure_future(self._attempt(order[i + 1], method, ok, args, kwargs)))
+                    i += 1
+            i += 1
+            try:
+                pending = set(racers)
+                while pending:
+                    done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                    for t in done:
+                        if t.result() is not None:
+                            return t.result()
+            finally:
+                for t in racers:
+                    if not t.done():
+                        t.cancel()
+        return None
+
+    async def close(self):
+        for ep in self.endpoints:
+            await ep.client.close()
+
+    def stats(self) -> dict:
+        return {ep.name: ep.stats() for ep in self.endpoints}
+
+MULTIPLE_ACCOUNTS_MAX = 100
 
 class SolClient:
     def __init__(self):
-        self.primary = AsyncClient(SETTINGS.primary_rpc)
-        self.fallback = AsyncClient(SETTINGS.fallback_rpc)
+        self._balances: dict[str, tuple[float, float]] = {}  # address -> (sol, fetched_at)
+        self.balance_ttl = SETTINGS.balance_cache_ttl
+        self._bulk_sem = asyncio.Semaphore(SETTINGS.balance_concurrency)
+        self.router = RpcRouter(
+            [
+                ("primary", SETTINGS.primary_rpc),
+                ("fallback", SETTINGS.fallback_rpc),
+                ("quicknode", SETTINGS.quicknode_rpc),
+                ("hellomoon", SETTINGS.hellomoon_rpc),
+            ],
+            hedge=SETTINGS.rpc_hedge,
+            breaker_failures=SETTINGS.rpc_breaker_failures,
+            breaker_cooldown=SETTINGS.rpc_breaker_cooldown,
+        )
+
+    def _cached_balance(self, address: str) -> Optional[float]:
+        hit = self._balances.get(address)
+        if hit and time.monotonic() - hit[1] < self.balance_ttl:
+            return hit[0]
+        return None
 
     async def get_balance_sol(self, address: str) -> Optional[float]:
-        lamports = None
-        for c in (self.primary, self.fallback):
-            try:
-                resp = await c.get_balance(PublicKey(address))
-                if resp and resp.get("result"):
-                    lamports = resp["result"]["value"]
-                    break
-            except Exception:
-                continue
+        cached = self._cached_balance(address)
+        if cached is not None:
+            return cached
+        resp = await self.router.call("get_balance", PublicKey(address), ok=lambda r: r.get("result"))
+        lamports = resp["result"]["value"] if resp else None
+        if resp:
+            self._balances[address] = (lamports/1_000_000_000, time.monotonic())
         return (lamports or 0)/1_000_000_000
 
+    async def _balances_chunk(self, chunk: list[str]):
+        async with self._bulk_sem:
+            resp = await self.router.call(
+                "get_multiple_accounts", [PublicKey(a) for a in chunk],
+                ok=lambda r: (r.get("result") or {}).get("value") is not None,
+            )
+        if not resp:
+            return
+        now = time.monotonic()
+        for addr, acct in zip(chunk, resp["result"]["value"]):
+            # Accounts that don't exist on-chain come back as null: 0 SOL
+            lamports = (acct or {}).get("lamports") or 0
+            self._balances[addr] = (lamports/1_000_000_000, now)
+
+    async def get_balances_sol(self, addresses: list[str]) -> dict[str, float]:
+        # Bulk getMultipleAccounts, MULTIPLE_ACCOUNTS_MAX per call, chunks run concurrently
+        missing = []
+        for addr in dict.fromkeys(addresses):
+            if self._cached_balance(addr) is None:
+                missing.append(addr)
+        chunks = [missing[i:i+MULTIPLE_ACCOUNTS_MAX] for i in range(0, len(missing), MULTIPLE_ACCOUNTS_MAX)]
+        await asyncio.gather(*[self._balances_chunk(c) for c in chunks])
+        out = {}
+        for addr in addresses:
+            hit = self._balances.get(addr)
+            out[addr] = hit[0] if hit else 0.0
+        return out
+
+    def prune_balances(self):
+        now = time.monotonic()
+        for addr in [a for a, (_, t) in self._balances.items() if now - t >= self.balance_ttl]:
+            self._balances.pop(addr, None)
+
     async def get_signatures(self, address: str, before: Optional[str]=None, limit: int=50):
-        # Returns list of signature dicts (newest first)
-        last = None
-        for c in (self.primary, self.fallback):
-            try:
-                resp = await c.get_signatures_for_address(PublicKey(address), before=before, limit=limit)
-                if resp and resp.get("result") is not None:
-                    last = resp["result"]
-                    break
-            except Exception:
-                continue
-        return last or []
+        # Returns list of signature dicts (newest first). Raises if every endpoint
+        # failed: an empty page would read as "no older history" to the backfill.
+        resp = await self.router.call(
+            "get_signatures_for_address", PublicKey(address), before=_signature(before), limit=limit,
+            commitment=SETTINGS.commitment,
+            ok=lambda r: r.get("result") is not None,
+        )
+        if resp is None:
+            raise RuntimeError(f"getSignaturesForAddress failed on every endpoint for {address}")
+        return resp["result"] or []
 
     async def close(self):
-        await self.primary.close()
-        await self.fallback.close()
+        await self.router.close()
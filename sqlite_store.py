@@ -0,0 +1,420 @@
+import aiosqlite, asyncio, time
+from typing import Optional, List, Tuple, Callable, Awaitable, Any
+from storage import Storage, AGG_FIELDS
+
+# ---------------- Connection layer ----------------
+# One long-lived writer connection drained by a single task (group commits),
+# plus a small pool of reader connections. WAL mode lets readers run while the
+# writer holds its transaction. sqlite3's per-connection statement cache keeps
+# the prepared statements for our fixed set of queries.
+
+_STOP = object()
+
+class SQLitePool:
+    def __init__(self, path: str, readers: int = 4, batch_max: int = 256, stmt_cache: int = 256):
+        self.path = path
+        self.readers = max(1, readers)
+        self.batch_max = max(1, batch_max)
+        self.stmt_cache = stmt_cache
+        self._readers: Optional[asyncio.Queue] = None
+        self._all_readers: list = []
+        self._writer: Optional[aiosqlite.Connection] = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self._lock = asyncio.Lock()
+        self.commits = 0
+        self.writes = 0
+
+    async def _connect(self) -> aiosqlite.Connection:
+        # isolation_level=None: we issue BEGIN/COMMIT ourselves on the writer,
+        # and readers stay in autocommit so they never pin an old snapshot.
+        conn = await aiosqlite.connect(self.path, isolation_level=None, cached_statements=self.stmt_cache)
+        await conn.execute("PRAGMA busy_timeout=5000")
+        await conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    async def start(self):
+        if self._task is not None:
+            return
+        async with self._lock:
+            if self._task is not None:
+                return
+            self._writer = await self._connect()
+            self._readers = asyncio.Queue()
+            for _ in range(self.readers):
+                conn = await self._connect()
+                self._all_readers.append(conn)
+                self._readers.put_nowait(conn)
+            self._queue = asyncio.Queue()
+            self._task = asyncio.create_task(self._writer_loop())
+
+    async def close(self):
+        if self._task is None:
+            return
+        # Sentinel lets the writer flush whatever is already queued
+        self._queue.put_nowait(_STOP)
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        for conn in self._all_readers:
+            await conn.close()
+        await self._writer.close()
+        self._all_readers = []
+        self._readers = self._writer = self._queue = self._task = None
+
+    async def _writer_loop(self):
+        carry = None
+        while True:
+            job = carry if carry is not None else await self._queue.get()
+            carry = None
+            if job is _STOP:
+                return
+            fn, fut, in_txn = job
+            if not in_txn:
+                await self._run_raw(fn, fut)
+                continue
+            batch = [(fn, fut)]
+            while len(batch) < self.batch_max:
+                try:
+                    nxt = self._queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    break
+                if nxt is _STOP or not nxt[2]:
+                    # Commit what we have, then handle it on the next turn
+                    carry = nxt
+                    break
+                batch.append(nxt[:2])
+            await self._run_batch(batch)
+
+    async def _run_raw(self, fn, fut):
+        # Statements that can't run inside a transaction (wal_checkpoint, VACUUM)
+        try:
+            res = await fn(self._writer)
+        except Exception as e:
+            if not fut.done():
+                fut.set_exception(e)
+        else:
+            if not fut.done():
+                fut.set_result(res)
+
+    async def _run_batch(self, batch: list):
+        conn = self._writer
+        results = []
+        try:
+            await conn.execute("BEGIN IMMEDIATE")
+            for fn, fut in batch:
+                # Savepoint per job so one failing write doesn't sink the group
+                await conn.execute("SAVEPOINT job")
+                try:
+                    res = await fn(conn)
+                except Exception as e:
+                    await conn.execute("ROLLBACK TO job")
+                    await conn.execute("RELEASE job")
+                    results.append((fut, None, e))
+                else:
+                    await conn.execute("RELEASE job")
+                    results.append((fut, res, None))
+            await conn.execute("COMMIT")
+            self.commits += 1
+            self.writes += len(batch)
+        except Exception as e:
+            try:
+                await conn.execute("ROLLBACK")
+            except Exception:
+                pass
+            results = [(fut, None, e) for _, fut in batch]
+        for fut, res, err in results:
+            if fut.done():
+                continue
+            if err is not None:
+                fut.set_exception(err)
+            else:
+                fut.set_result(res)
+
+    async def write(self, fn: Callable[[aiosqlite.Connection], Awaitable[Any]], in_txn: bool = True) -> Any:
+        # Queue fn(conn) for the writer; resolves once its group commit lands.
+        # in_txn=False runs it alone on the writer, outside any transaction.
+        await self.start()
+        fut = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((fn, fut, in_txn))
+        return await fut
+
+    def depth(self) -> int:
+        return self._queue.qsize() if self._queue is not None else 0
+
+    async def read(self, fn: Callable[[aiosqlite.Connection], Awaitable[Any]]) -> Any:
+        await self.start()
+        conn = await self._readers.get()
+        try:
+            return await fn(conn)
+        finally:
+            self._readers.put_nowait(conn)
+
+    async def execute(self, sql: str, params=()) -> int:
+        async def op(db):
+            cur = await db.execute(sql, params)
+            n = cur.rowcount
+            await cur.close()
+            return n
+        return await self.write(op)
+
+    async def fetchone(self, sql: str, params=()):
+        async def op(db):
+            cur = await db.execute(sql, params)
+            row = await cur.fetchone()
+            # Finish the statement so the reader doesn't hold a snapshot open
+            await cur.close()
+            return row
+        return await self.read(op)
+
+    async def fetchall(self, sql: str, params=()):
+        async def op(db):
+            cur = await db.execute(sql, params)
+            return await cur.fetchall()
+        return await self.read(op)
+
+UPSERT_AGG_SQL = (
+    f"INSERT INTO wallet_aggregates(address,{','.join(AGG_FIELDS)}) VALUES(?,{','.join(['?']*len(AGG_FIELDS))})\n"
+    f"ON CONFLICT(address) DO UPDATE SET " + ",".join([f"{k}=excluded.{k}" for k in AGG_FIELDS])
+)
+UPSERT_POSITION_SQL = (
+    "INSERT INTO wallet_positions(address,mint,qty,avg_cost_usd,updated_at) VALUES(?,?,?,?,?)\n"
+    "ON CONFLICT(address,mint) DO UPDATE SET qty=excluded.qty, avg_cost_usd=excluded.avg_cost_usd, updated_at=excluded.updated_at"
+)
+
+ADD_MINT_PNL_SQL = (
+    "INSERT INTO mint_pnl(mint,address,pnl_usd,updated_at) VALUES(?,?,?,?)\n"
+    "ON CONFLICT(mint,address) DO UPDATE SET pnl_usd=mint_pnl.pnl_usd+excluded.pnl_usd, updated_at=excluded.updated_at"
+)
+
+class SQLiteStorage(Storage):
+    name = "sqlite"
+
+    def __init__(self, path: str, readers: int = 4, batch_max: int = 256, stmt_cache: int = 256, schema: str = "schema.sql"):
+        self.path = path
+        self.schema = schema
+        self.pool = SQLitePool(path, readers=readers, batch_max=batch_max, stmt_cache=stmt_cache)
+
+    async def start(self):
+        # Schema runs once on its own connection: executescript() commits implicitly
+        async with aiosqlite.connect(self.path) as db:
+            with open(self.schema, "r", encoding="utf-8") as f:
+                await db.executescript(f.read())
+            await db.commit()
+        await self.pool.start()
+
+    async def close(self):
+        await self.pool.close()
+
+    def stats(self) -> dict:
+        return {"depth": self.pool.depth(), "writes": self.pool.writes, "commits": self.pool.commits}
+
+    # ---------------- Queries ----------------
+
+    async def add_user(self, user_id: int):
+        await self.pool.execute("INSERT OR IGNORE INTO users(user_id, created_at) VALUES(?,?)", (user_id, int(time.time())))
+
+    async def add_track(self, user_id: int, address: str, name: Optional[str]):
+        await self.pool.execute(
+            "INSERT OR IGNORE INTO tracked_wallets(user_id,address,name,created_at) VALUES(?,?,?,?)",
+            (user_id, address, name, int(time.time()))
+        )
+
+    async def rm_track(self, user_id: int, address: str) -> int:
+        return await self.pool.execute("DELETE FROM tracked_wallets WHERE user_id=? AND address=?", (user_id, address))
+
+    async def list_tracks(self, user_id: int) -> List[Tuple[str, str]]:
+        return await self.pool.fetchall("SELECT address, COALESCE(name,'') FROM tracked_wallets WHERE user_id=? ORDER BY created_at DESC", (user_id,))
+
+    async def all_tracks(self) -> List[Tuple[int, str, Optional[str]]]:
+        return await self.pool.fetchall("SELECT user_id, address, name FROM tracked_wallets")
+
+    async def tracked_addresses(self) -> set:
+        rows = await self.pool.fetchall("SELECT DISTINCT address FROM tracked_wallets")
+        return {r[0] for r in rows}
+
+    async def upsert_agg(self, address: str, agg: dict):
+        await self.pool.execute(UPSERT_AGG_SQL, [address] + [agg.get(k) for k in AGG_FIELDS])
+
+    async def get_agg(self, address: str) -> Optional[dict]:
+        async def op(db):
+            cur = await db.execute("SELECT * FROM wallet_aggregates WHERE address=?", (address,))
+            row = await cur.fetchone()
+            await cur.close()
+            if not row:
+                return None
+            # Convert to dict for convenience
+            cols = [d[0] for d in cur.description]
+            return dict(zip(cols, row))
+        return await self.pool.read(op)
+
+    async def upsert_position(self, address: str, mint: str, qty: float, avg_cost_usd: float):
+        await self.pool.execute(UPSERT_POSITION_SQL, (address, mint, qty, avg_cost_usd, int(time.time())))
+
+    async def get_position(self, address: str, mint: str) -> Optional[dict]:
+        row = await self.pool.fetchone("SELECT qty, avg_cost_usd FROM wallet_positions WHERE address=? AND mint=?", (address, mint))
+        if not row:
+            return None
+        return {"qty": row[0], "avg_cost_usd": row[1]}
+
+    async def add_event(self, address: str, ts: int, sig: str, summary: str):
+        async def op(db):
+            await db.execute("INSERT INTO recent_events(address,ts,sig,summary) VALUES(?,?,?,?)", (address, ts, sig, summary))
+        await self.pool.write(op)
+
+    async def get_recent_events(self, address: str, limit: int = 20) -> List[Tuple[int, str, str]]:
+        return await self.pool.fetchall("SELECT ts, sig, summary FROM recent_events WHERE address=? ORDER BY ts DESC LIMIT ?", (address, limit))
+
+    async def best_plays_for_user(self, user_id: int, limit: int = 3) -> List[Tuple[float, str, str, str]]:
+        # (pnl, address, summary, sig) for one user's wallets in a single join;
+        # wallets without aggregates yet rank as $0 like before
+        return await self.pool.fetchall(
+            "SELECT COALESCE(a.best_play_pnl_usd,0), t.address, COALESCE(a.best_play_summary,''), COALESCE(a.best_play_sig,'')\n"
+            "FROM tracked_wallets t LEFT JOIN wallet_aggregates a ON a.address=t.address\n"
+            "WHERE t.user_id=? ORDER BY COALESCE(a.best_play_pnl_usd,0) DESC, t.created_at DESC LIMIT ?",
+            (user_id, limit)
+        )
+
+    async def top_best_plays(self, limit: int = 3) -> List[Tuple[float, str, str, str]]:
+        # Across all users: walks idx_agg_best_play from the top, keeping tracked wallets only
+        return await self.pool.fetchall(
+            "SELECT best_play_pnl_usd, address, COALESCE(best_play_summary,''), COALESCE(best_play_sig,'')\n"
+            "FROM wallet_aggregates a\n"
+            "WHERE best_play_sig IS NOT NULL AND EXISTS (SELECT 1 FROM tracked_wallets t WHERE t.address=a.address)\n"
+            "ORDER BY best_play_pnl_usd DESC LIMIT ?",
+            (limit,)
+        )
+
+    async def load_wallet_state(self, address: str, mints: List[str]):
+        # Aggregate row + the positions for `mints`, read on one connection
+        async def op(db):
+            cur = await db.execute("SELECT * FROM wallet_aggregates WHERE address=?", (address,))
+            row = await cur.fetchone()
+            await cur.close()
+            agg = dict(zip([d[0] for d in cur.description], row)) if row else None
+            positions = {}
+            if mints:
+                cur = await db.execute(
+                    f"SELECT mint, qty, avg_cost_usd FROM wallet_positions WHERE address=? AND mint IN ({','.join(['?']*len(mints))})",
+                    [address] + list(mints)
+                )
+                for mint, qty, avg in await cur.fetchall():
+                    positions[mint] = {"qty": qty, "avg_cost_usd": avg}
+            return agg, positions
+        return await self.pool.read(op)
+
+    async def save_wallet_state(self, address: str, agg: dict, positions: dict, events: List[Tuple[int, str, str]],
+                                mint_pnl: Optional[dict] = None):
+        # Positions, events, per-mint PnL and the aggregate row land in a single transaction
+        async def op(db):
+            now = int(time.time())
+            if positions:
+                await db.executemany(
+                    UPSERT_POSITION_SQL,
+                    [(address, mint, p["qty"], p["avg_cost_usd"], now) for mint, p in positions.items()]
+                )
+            if events:
+                await db.executemany(
+                    "INSERT INTO recent_events(address,ts,sig,summary) VALUES(?,?,?,?)",
+                    [(address, ts, sig, summary) for ts, sig, summary in events]
+                )
+            if mint_pnl:
+                await db.executemany(ADD_MINT_PNL_SQL, [(mint, address, pnl, now) for mint, pnl in mint_pnl.items()])
+            await db.execute(UPSERT_AGG_SQL, [address] + [agg.get(k) for k in AGG_FIELDS])
+        await self.pool.write(op)
+
+    async def top_traders(self, mint: str, limit: int = 5) -> List[Tuple[float, str]]:
+        return await self.pool.fetchall(
+            "SELECT pnl_usd, address FROM mint_pnl WHERE mint=? ORDER BY pnl_usd DESC LIMIT ?",
+            (mint, limit)
+        )
+
+    async def load_trending(self) -> List[Tuple[str, str]]:
+        return await self.pool.fetchall("SELECT mint, data FROM trending_mints")
+
+    async def save_trending(self, rows: List[Tuple[str, str]], deleted: List[str]):
+        async def op(db):
+            now = int(time.time())
+            if rows:
+                await db.executemany(
+                    "INSERT INTO trending_mints(mint,data,updated_at) VALUES(?,?,?)\n"
+                    "ON CONFLICT(mint) DO UPDATE SET data=excluded.data, updated_at=excluded.updated_at",
+                    [(mint, data, now) for mint, data in rows]
+                )
+            if deleted:
+                await db.executemany("DELETE FROM trending_mints WHERE mint=?", [(m,) for m in deleted])
+        await self.pool.write(op)
+
+    async def replace_wallets(self, wallets: List[dict], retention_days: int) -> int:
+        now = int(time.time())
+        cutoff = now - retention_days*24*3600
+        # Keep the live ingestion cursor: replayed data may end before it
+        upsert_agg = UPSERT_AGG_SQL.replace("last_sig=excluded.last_sig", "last_sig=COALESCE(wallet_aggregates.last_sig, excluded.last_sig)")
+        async def op(db):
+            for rec in wallets:
+                address, agg = rec["a"], dict(rec["agg"], updated_at=now)
+                await db.execute("DELETE FROM wallet_positions WHERE address=?", (address,))
+                await db.execute("DELETE FROM recent_events WHERE address=?", (address,))
+                await db.execute("DELETE FROM mint_pnl WHERE address=?", (address,))
+                await db.execute(upsert_agg, [address] + [agg.get(k) for k in AGG_FIELDS])
+                await db.executemany(UPSERT_POSITION_SQL, [(address, m, p["qty"], p["avg_cost_usd"], now) for m, p in rec["pos"].items()])
+                await db.executemany(
+                    "INSERT INTO recent_events(address,ts,sig,summary) VALUES(?,?,?,?)",
+                    [(address, ts, sig, summary) for ts, sig, summary in rec["ev"] if ts >= cutoff]
+                )
+                await db.executemany(
+                    "INSERT INTO mint_pnl(mint,address,pnl_usd,updated_at) VALUES(?,?,?,?)",
+                    [(m, address, pnl, now) for m, pnl in rec["pnl"].items()]
+                )
+        await self.pool.write(op)
+        return len(wallets)
+
+    # ---------------- Maintenance ----------------
+    # Retention runs here on a schedule instead of on every insert. Deletes go in
+    # bounded chunks, each its own write job, so inserts queued meanwhile are
+    # never stuck behind one long DELETE.
+
+    async def prune_events(self, retention_days: int, chunk: int = 5000) -> int:
+        cutoff = int(time.time()) - retention_days*24*3600
+        total = 0
+        while True:
+            n = await self.pool.execute(
+                "DELETE FROM recent_events WHERE id IN (SELECT id FROM recent_events WHERE ts<? LIMIT ?)",
+                (cutoff, chunk)
+            )
+            total += max(n, 0)
+            if n < chunk:
+                return total
+
+    async def cap_events_per_wallet(self, cap: int, chunk: int = 5000) -> int:
+        # Keep only the newest `cap` events per wallet
+        rows = await self.pool.fetchall("SELECT address FROM recent_events GROUP BY address HAVING COUNT(*)>?", (cap,))
+        total = 0
+        for (address,) in rows:
+            while True:
+                n = await self.pool.execute(
+                    "DELETE FROM recent_events WHERE id IN ("
+                    "SELECT id FROM recent_events WHERE address=? ORDER BY ts DESC LIMIT ? OFFSET ?)",
+                    (address, chunk, cap)
+                )
+                total += max(n, 0)
+                if n < chunk:
+                    break
+        return total
+
+    async def run_maintenance(self, retention_days: int, per_wallet_cap: int, vacuum_pages: int = 1000) -> dict:
+        pruned = await self.prune_events(retention_days)
+        capped = await self.cap_events_per_wallet(per_wallet_cap) if per_wallet_cap > 0 else 0
+        # No-op unless the database was created with auto_vacuum=INCREMENTAL.
+        # The pragma frees one page per row stepped, so drain it.
+        async def vacuum(db):
+            cur = await db.execute(f"PRAGMA incremental_vacuum({int(vacuum_pages)})")
+            await cur.fetchall()
+        await self.pool.write(vacuum)
+
+        async def checkpoint(db):
+            cur = await db.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+            return await cur.fetchone()
+        await self.pool.write(checkpoint, in_txn=False)
+        return {"pruned": pruned, "capped": capped}
@@ -0,0 +1,120 @@
+from abc import ABC, abstractmethod
+from typing import List, Optional, Tuple
+
+# Storage backend interface. db.py exposes these operations as module-level
+# functions (with metrics) and forwards them to the backend picked by
+# STORAGE_BACKEND: sqlite_store.SQLiteStorage or pg_store.PostgresStorage.
+# Row shapes are the same for every backend: plain tuples / dicts. A backend
+# missing any of these fails when it's constructed, not on first use.
+
+class Storage(ABC):
+    name = "base"
+
+    @abstractmethod
+    async def start(self):
+        ...
+
+    @abstractmethod
+    async def close(self):
+        ...
+
+    def stats(self) -> dict:
+        # {"depth": queued writes, "writes": write jobs, "commits": transactions}
+        return {"depth": 0, "writes": 0, "commits": 0}
+
+    # ---- users / tracking ----
+    @abstractmethod
+    async def add_user(self, user_id: int):
+        ...
+
+    @abstractmethod
+    async def add_track(self, user_id: int, address: str, name: Optional[str]):
+        ...
+
+    @abstractmethod
+    async def rm_track(self, user_id: int, address: str) -> int:
+        ...
+
+    @abstractmethod
+    async def list_tracks(self, user_id: int) -> List[Tuple[str, str]]:
+        ...
+
+    @abstractmethod
+    async def all_tracks(self) -> List[Tuple[int, str, Optional[str]]]:
+        ...
+
+    @abstractmethod
+    async def tracked_addresses(self) -> set:
+        ...
+
+    # ---- aggregates / positions / events ----
+    @abstractmethod
+    async def upsert_agg(self, address: str, agg: dict):
+        ...
+
+    @abstractmethod
+    async def get_agg(self, address: str) -> Optional[dict]:
+        ...
+
+    @abstractmethod
+    async def upsert_position(self, address: str, mint: str, qty: float, avg_cost_usd: float):
+        ...
+
+    @abstractmethod
+    async def get_position(self, address: str, mint: str) -> Optional[dict]:
+        ...
+
+    @abstractmethod
+    async def add_event(self, address: str, ts: int, sig: str, summary: str):
+        ...
+
+    @abstractmethod
+    async def get_recent_events(self, address: str, limit: int) -> List[Tuple[int, str, str]]:
+        ...
+
+    @abstractmethod
+    async def best_plays_for_user(self, user_id: int, limit: int) -> List[Tuple[float, str, str, str]]:
+        ...
+
+    @abstractmethod
+    async def top_best_plays(self, limit: int) -> List[Tuple[float, str, str, str]]:
+        ...
+
+    @abstractmethod
+    async def load_wallet_state(self, address: str, mints: List[str]) -> Tuple[Optional[dict], dict]:
+        ...
+
+    @abstractmethod
+    async def save_wallet_state(self, address: str, agg: dict, positions: dict, events: List[Tuple[int, str, str]],
+                                mint_pnl: Optional[dict] = None):
+        # mint_pnl: {mint: realized PnL delta} added onto the wallet's mint_pnl rows
+        ...
+
+    @abstractmethod
+    async def top_traders(self, mint: str, limit: int) -> List[Tuple[float, str]]:
+        # [(pnl_usd, address)] best first
+        ...
+
+    # ---- trending snapshot ----
+    @abstractmethod
+    async def load_trending(self) -> List[Tuple[str, str]]:
+        ...
+
+    @abstractmethod
+    async def save_trending(self, rows: List[Tuple[str, str]], deleted: List[str]):
+        ...
+
+    # ---- replay ----
+    @abstractmethod
+    async def replace_wallets(self, wallets: List[dict], retention_days: int) -> int:
+        # replay.py results ({"a", "agg", "pos", "ev", "pnl"}): replace each wallet's
+        # aggregate, positions, recent events (within retention) and mint PnL,
+        # keeping its live last_sig cursor
+        ...
+
+    # ---- maintenance ----
+    @abstractmethod
+    async def run_maintenance(self, retention_days: int, per_wallet_cap: int) -> dict:
+        ...
+
+AGG_FIELDS = ["last_sig","total_trades","wins","losses","realized_pnl_sol","realized_pnl_usd","best_play_sig","best_play_pnl_usd","best_play_summary","updated_at"]
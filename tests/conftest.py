@@ -0,0 +1,71 @@
+import asyncio, os, sys, tempfile, time
+import pytest
+
+# Modules read settings and open the database relative to the repo root at
+# import time: point them at a throwaway SQLite file before anything imports db
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)
+os.environ["SQLITE_PATH"] = os.path.join(tempfile.mkdtemp(prefix="solbot-test-"), "bot.db")
+os.environ.setdefault("METRICS_PORT", "0")
+
+class FakeChain:
+    # Stub RPC (SolClient.get_signatures) and Helius (ParseQueue.parse) for one
+    # wallet. `unparsed` signatures are left out of Helius answers; with
+    # `rpc_down` every page after the first fails; new_tx(sig, lag) keeps a
+    # signature out of listings for `lag` seconds, like a lagging RPC node.
+    def __init__(self, address: str, delay: float = 0):
+        self.address = address
+        self.delay = delay
+        self.history: list[str] = []  # oldest first
+        self.unparsed: set = set()
+        self.rpc_down = False
+        self.listed_at: dict = {}
+
+    def new_tx(self, sig: str, lag: float = 0) -> str:
+        self.history.append(sig)
+        if lag:
+            self.listed_at[sig] = time.monotonic() + lag
+        return sig
+
+    async def get_signatures(self, address: str, before=None, limit: int = 50):
+        await asyncio.sleep(self.delay)
+        if self.rpc_down and before:
+            raise RuntimeError("getSignaturesForAddress failed on every endpoint")
+        now = time.monotonic()
+        newest_first = [s for s in self.history[::-1] if self.listed_at.get(s, 0) <= now]
+        start = newest_first.index(before) + 1 if before else 0
+        return [{"signature": s} for s in newest_first[start:start + limit]]
+
+    # Compact records as helius_parse returns them
+    async def parse(self, address: str, signatures: list[str]) -> list[dict]:
+        return [{
+            "signature": s, "timestamp": 1700000000 + self.history.index(s), "slot": 1,
+            "events": {"swap": [{"user": address, "tokenInputs": [{"mint": "A", "amount": 1}], "tokenOutputs": [{"mint": "B", "amount": 2}]}]},
+        } for s in signatures if s not in self.unparsed]
+
+@pytest.fixture
+def chain(monkeypatch):
+    import aggregates, backfill, tracker
+    async def price(mint):
+        return 1.0
+    c = FakeChain("W" * 32)
+    monkeypatch.setattr(tracker, "SOL", c)
+    monkeypatch.setattr(backfill, "PARSER", c)
+    monkeypatch.setattr(tracker, "PARSER", c)
+    monkeypatch.setattr(aggregates, "price_for_mint", price)
+    return c
+
+@pytest.fixture
+def run():
+    # Runs a scenario coroutine against a freshly opened database
+    from db import init_db, close_db
+    def runner(coro):
+        async def wrapped():
+            await init_db()
+            try:
+                return await coro
+            finally:
+                await close_db()
+        return asyncio.run(wrapped())
+    return runner
@@ -0,0 +1,40 @@
+import asyncio, time
+from alerts import SendQueue
+
+# SendQueue: concurrent sends within the global rate, never two at once for
+# one chat, lines for a chat delivered in order.
+
+def test_sends_overlap_up_to_rate_and_keep_chat_order():
+    async def scenario():
+        inflight = set()
+        overlap = 0
+        got: dict[int, list[str]] = {}
+
+        async def send(chat_id, text):
+            nonlocal overlap
+            assert chat_id not in inflight
+            inflight.add(chat_id)
+            overlap = max(overlap, len(inflight))
+            await asyncio.sleep(0.1)
+            inflight.discard(chat_id)
+            got.setdefault(chat_id, []).extend(text.split("\n\n"))
+
+        q = SendQueue(send, global_rate=200, per_chat_interval=0.05, max_inflight=16)
+        runner = asyncio.create_task(q.run())
+        t0 = time.monotonic()
+        for chat in range(100):
+            q.enqueue(chat, f"{chat}-0")
+        await asyncio.sleep(0.05)
+        for chat in range(100):
+            q.enqueue(chat, f"{chat}-1")
+        while q.depth() or q._sending:
+            await asyncio.sleep(0.01)
+        elapsed = time.monotonic() - t0
+        runner.cancel()
+        return elapsed, overlap, got
+
+    elapsed, overlap, got = asyncio.run(scenario())
+    # One send at a time would take 100 x 0.1s at least
+    assert elapsed < 5
+    assert overlap > 1
+    assert all(got[chat] == [f"{chat}-0", f"{chat}-1"] for chat in range(100))
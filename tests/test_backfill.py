@@ -0,0 +1,69 @@
+import pytest
+import tracker
+from db import get_agg
+
+# The backfill must not move a wallet's cursor past signatures that were not
+# parsed (Helius errors or missing results) or not listed (RPC errors).
+
+def test_unparsed_signature_stops_the_cursor(chain, run):
+    chain.address = "Wbf" + "1" * 29
+    addr = chain.address
+
+    async def scenario():
+        sigs = [chain.new_tx(f"U{i}") for i in range(5)]
+        chain.unparsed.add(sigs[2])
+        with pytest.raises(RuntimeError):
+            await tracker.poll_wallet(addr)
+        first = await get_agg(addr)
+        chain.unparsed.clear()
+        await tracker.poll_wallet(addr)
+        return first, await get_agg(addr)
+
+    first, final = run(scenario())
+    assert (first["total_trades"], first["last_sig"]) == (2, "U1")
+    assert (final["total_trades"], final["last_sig"]) == (5, "U4")
+
+def test_failed_page_fetch_keeps_the_cursor(chain, run):
+    chain.address = "Wrpc" + "1" * 28
+    addr = chain.address
+
+    async def scenario():
+        chain.new_tx("V0")
+        await tracker.poll_wallet(addr)
+        for i in range(1, 61):
+            chain.new_tx(f"V{i}")
+        # First page (25) is fine, the next one fails
+        chain.rpc_down = True
+        with pytest.raises(RuntimeError):
+            await tracker.poll_wallet(addr)
+        first = await get_agg(addr)
+        chain.rpc_down = False
+        await tracker.poll_wallet(addr)
+        return first, await get_agg(addr)
+
+    first, final = run(scenario())
+    assert (first["total_trades"], first["last_sig"]) == (1, "V0")
+    assert (final["total_trades"], final["last_sig"]) == (61, "V60")
+
+def test_signature_never_parsed_is_skipped_after_max_attempts(chain, run, monkeypatch):
+    chain.address = "Wskip" + "1" * 27
+    addr = chain.address
+    monkeypatch.setattr(tracker.SETTINGS, "backfill_parse_attempts", 3)
+
+    async def scenario():
+        chain.new_tx("K0")
+        await tracker.poll_wallet(addr)
+        bad = chain.new_tx("K1")
+        chain.new_tx("K2")
+        chain.unparsed.add(bad)
+        cursors = []
+        for _ in range(2):
+            with pytest.raises(RuntimeError):
+                await tracker.poll_wallet(addr)
+            cursors.append((await get_agg(addr))["last_sig"])
+        await tracker.poll_wallet(addr)
+        return cursors, await get_agg(addr)
+
+    cursors, final = run(scenario())
+    assert cursors == ["K0", "K0"]
+    assert (final["total_trades"], final["last_sig"]) == (2, "K2")
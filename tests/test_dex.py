@@ -0,0 +1,90 @@
+import asyncio
+import aiohttp
+import pytest
+import dex
+from cache import TTLCache
+
+# DexScreener failures must never be cached as "token not found", and must
+# never replace a good (stale) entry.
+
+class FakeResponse:
+    def __init__(self, status: int, data: dict):
+        self.status = status
+        self.data = data
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    def raise_for_status(self):
+        if self.status != 200:
+            raise aiohttp.ClientResponseError(None, (), status=self.status)
+
+    async def json(self):
+        return self.data
+
+class FakeDex:
+    # get_session() stand-in: answers every token with `pairs` pairs priced
+    # from `prices` (or `status`), at most `cap` pairs per answer
+    def __init__(self):
+        self.status = 200
+        self.prices: dict = {}
+        self.pairs: dict = {}
+        self.cap = 30
+        self.urls: list = []
+
+    def get(self, url, timeout=None):
+        self.urls.append(url)
+        pairs = [{"baseToken": {"address": m, "symbol": m[:3]}, "priceUsd": str(p), "liquidity": {"usd": 1}}
+                 for m, p in self.prices.items() if m in url for _ in range(self.pairs.get(m, 1))]
+        return FakeResponse(self.status, {"pairs": pairs[:self.cap]})
+
+@pytest.fixture
+def fake_dex(monkeypatch):
+    f = FakeDex()
+    monkeypatch.setattr(dex, "get_session", lambda: f)
+    return f
+
+def test_http_error_raises(fake_dex):
+    fake_dex.status = 429
+    with pytest.raises(aiohttp.ClientResponseError):
+        asyncio.run(dex.dexscreener_tokens(["SOLMINT"]))
+
+def test_failed_refresh_keeps_stale_entry(fake_dex):
+    async def scenario():
+        cache = TTLCache(lambda k: dex.BATCHER.get(k), ttl=0.05, stale_ttl=10, max_entries=10)
+        fake_dex.prices["SOLMINT"] = 150
+        first = await cache.get("SOLMINT")
+        await asyncio.sleep(0.06)
+        fake_dex.status = 429
+        stale = await cache.get("SOLMINT")  # serves stale, refresh fails
+        await asyncio.sleep(0.05)
+        return first, stale, await cache.get("SOLMINT")
+
+    first, stale, after = asyncio.run(scenario())
+    assert first["priceUsd"] == stale["priceUsd"] == after["priceUsd"] == 150
+
+def test_empty_answer_is_not_found(fake_dex):
+    assert asyncio.run(dex.dexscreener_tokens(["NOPAIRS"])) == {"NOPAIRS": None}
+
+def test_batch_failure_fails_every_lookup(fake_dex):
+    async def scenario():
+        fake_dex.status = 500
+        return await asyncio.gather(dex.BATCHER.get("MINTA"), dex.BATCHER.get("MINTB"), return_exceptions=True)
+
+    assert all(isinstance(r, aiohttp.ClientResponseError) for r in asyncio.run(scenario()))
+
+def test_token_crowded_out_of_batch_is_queried_alone(fake_dex):
+    async def scenario():
+        fake_dex.prices.update({"SOLMINT": 150, "BONKMINT": 0.00002, "GONEMINT": 1})
+        fake_dex.pairs["SOLMINT"] = 30
+        del fake_dex.prices["GONEMINT"]
+        return await asyncio.gather(dex.BATCHER.get("SOLMINT"), dex.BATCHER.get("BONKMINT"), dex.BATCHER.get("GONEMINT"))
+
+    sol, bonk, gone = asyncio.run(scenario())
+    assert sol["priceUsd"] == 150
+    assert bonk["priceUsd"] == 0.00002
+    assert gone is None
+    assert len(fake_dex.urls) == 3  # one batch, then each missing token alone
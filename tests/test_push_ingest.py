@@ -0,0 +1,72 @@
+import asyncio
+import tracker
+from db import get_agg
+
+# Push ingestion (INGEST_MODE=ws) against stub RPC / Helius and a real SQLite
+# database: pushes must never apply a signature twice or move the cursor past
+# signatures that were not applied.
+
+def test_push_during_poll_applies_each_signature_once(chain, run):
+    chain.address = "Wpoll" + "1" * 27
+    addr = chain.address
+
+    async def scenario():
+        x, y = chain.new_tx("X1"), chain.new_tx("Y1")
+        chain.delay = 0.05
+        poll = asyncio.create_task(tracker.poll_wallet(addr))
+        await asyncio.sleep(0.01)  # the poll holds the wallet lock
+        await asyncio.gather(poll, tracker.ingest_signature(addr, x), tracker.ingest_signature(addr, y))
+        return await get_agg(addr)
+
+    agg = run(scenario())
+    assert agg["total_trades"] == 2
+    assert agg["last_sig"] == "Y1"
+
+def test_push_after_reconnect_fills_the_gap(chain, run):
+    chain.address = "Wgap" + "1" * 28
+    addr = chain.address
+
+    async def scenario():
+        chain.new_tx("O2")
+        await tracker.poll_wallet(addr)
+        # P and Q happen while the socket is down, R is pushed after reconnect
+        chain.new_tx("P2"), chain.new_tx("Q2")
+        r = chain.new_tx("R2")
+        await tracker.ingest_signature(addr, r)
+        return await get_agg(addr)
+
+    agg = run(scenario())
+    assert agg["total_trades"] == 4
+    assert agg["last_sig"] == "R2"
+
+def test_push_ahead_of_rpc_is_retried(chain, run, monkeypatch):
+    # The socket reports a signature before the RPC node lists it
+    chain.address = "Wlag" + "1" * 28
+    addr = chain.address
+    monkeypatch.setattr(tracker.SETTINGS, "ws_retry_delay", 0.05)
+
+    async def scenario():
+        chain.new_tx("A3")
+        await tracker.poll_wallet(addr)
+        b = chain.new_tx("B3", lag=0.12)
+        await tracker.ingest_signature(addr, b)
+        missed = await get_agg(addr)
+        await asyncio.sleep(0.3)
+        return missed, await get_agg(addr)
+
+    missed, caught_up = run(scenario())
+    assert (missed["total_trades"], missed["last_sig"]) == (1, "A3")
+    assert (caught_up["total_trades"], caught_up["last_sig"]) == (2, "B3")
+
+def test_signatures_are_listed_at_push_commitment(monkeypatch):
+    from solana_client import SolClient
+    sol = SolClient()
+    seen = {}
+
+    async def call(method, *args, ok=None, **kwargs):
+        seen.update(kwargs)
+        return {"result": []}
+
+    monkeypatch.setattr(sol.router, "call", call)
+    asyncio.run(sol.get_signatures("11111111111111111111111111111111"))
+    assert seen["commitment"] == "confirmed"
@@ -0,0 +1,29 @@
+import asyncio, ujson
+import helio
+
+# Recording gets the full enriched tx; parse callers only the compact record.
+
+TX = {
+    "signature": "S1", "timestamp": 1700000000, "slot": 5,
+    "nativeTransfers": [{"fromUserAccount": "W", "amount": 5000}],
+    "tokenTransfers": [{"mint": "A", "rawTokenAmount": {"tokenAmount": "100", "decimals": 2}}],
+    "events": {"swap": [{"user": "W", "nativeInput": {"account": "W", "amount": "1"},
+                         "tokenInputs": [{"mint": "A", "amount": 1}], "tokenOutputs": [{"mint": "B", "amount": 2}]}]},
+}
+
+def test_recorder_sees_full_tx(monkeypatch):
+    async def fake_parse(signatures, keep_raw=False):
+        return helio.decode_parsed(ujson.dumps([TX]).encode(), keep_raw)
+    monkeypatch.setattr(helio, "helius_parse", fake_parse)
+
+    async def scenario():
+        recorded = []
+        q = helio.ParseQueue(window=0.001)
+        q.on_parsed = lambda tx, addresses: recorded.append((tx, addresses))
+        parsed = await q.parse("W", ["S1"])
+        return parsed, recorded
+
+    parsed, recorded = asyncio.run(scenario())
+    assert recorded == [(TX, ["W"])]
+    assert parsed == [helio.project_tx(TX)]
+    assert helio.summarize_helius_tx(recorded[0][0], "W") == helio.summarize_helius_tx(parsed[0], "W")
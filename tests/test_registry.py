@@ -0,0 +1,47 @@
+import asyncio, time
+import db
+from alerts import AlertDispatcher
+
+# One registry: tracking changes made through db reach ingestion listeners,
+# alert fan-out and the balance refresh address list together.
+
+class FakeQueue:
+    def __init__(self):
+        self.sent = []
+
+    def enqueue(self, chat_id, text):
+        self.sent.append((chat_id, text))
+
+def test_alerts_follow_tracked_registry():
+    async def scenario():
+        await db.init_db()
+        try:
+            events = []
+            db.TRACKED.load(await db.all_tracks())
+            db.TRACKED.add_listener(lambda op, address: events.append((op, address)))
+            queue = FakeQueue()
+            alerts = AlertDispatcher(queue, db.TRACKED)
+            swap = [{"ts": time.time(), "summary": "bought", "sig": "S1"}]
+
+            await db.add_track(1, "W1", "whale")
+            await db.add_track(2, "W1", None)
+            alerts.on_swaps("W1", swap)
+            assert sorted(c for c, _ in queue.sent) == [1, 2]
+            assert "whale" in dict(queue.sent)[1]
+            assert db.TRACKED.addresses() == {"W1"}
+
+            await db.rm_track(1, "W1")
+            await db.rm_track(2, "W1")
+            queue.sent.clear()
+            alerts.on_swaps("W1", swap)
+            assert queue.sent == []
+            assert db.TRACKED.addresses() == set()
+            assert events == [("add", "W1"), ("remove", "W1")]
+
+            # A resync from the table restores names too
+            await db.add_track(3, "W2", "degen")
+            db.TRACKED.load(await db.all_tracks())
+            assert db.TRACKED.subscribers("W2") == {3: "degen"}
+        finally:
+            await db.close_db()
+    asyncio.run(scenario())
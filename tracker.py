@@ -0,0 +1,203 @@
+import asyncio
+from typing import Optional
+from settings import SETTINGS
+from metrics import REGISTRY, BACKGROUND_ERRORS, PUSH_RETRIES
+from db import TRACKED, db_stats, get_agg, all_tracks, tracked_addresses
+from solana_client import SolClient
+from dex import TOKEN_CACHE
+from helio import PARSER
+from aggregates import add_swap_listener
+from scheduler import PollScheduler
+from ws_ingest import LogsSubscriber
+from backfill import backfill_wallet
+from replay import TxRecorder
+from workers import shard_of
+
+# Wallet ingestion: polling scheduler, optional logsSubscribe push path and the
+# code that keeps both in sync with tracked_wallets. Runs inside the bot
+# process, or inside each tracker worker (workers.py) for its shard only.
+
+SOL = SolClient()
+
+WALLET_LOCKS: dict[str, asyncio.Lock] = {}
+BG_TASKS: set = set()
+
+def wallet_lock(address: str) -> asyncio.Lock:
+    # Serialises polls and push-ingested signatures for one wallet
+    lock = WALLET_LOCKS.get(address)
+    if lock is None:
+        lock = WALLET_LOCKS[address] = asyncio.Lock()
+    return lock
+
+def spawn(coro):
+    task = asyncio.create_task(coro)
+    BG_TASKS.add(task)
+    task.add_done_callback(BG_TASKS.discard)
+    return task
+
+async def poll_wallet(address: str) -> int:
+    async with wallet_lock(address):
+        return await _poll_wallet(address)
+
+async def _poll_wallet(address: str, listed: Optional[set] = None) -> int:
+    # One poll: page back to last_sig, parse new signatures with Helius, apply oldest-first.
+    # Returns the number of new signatures so the scheduler can adapt the interval.
+    agg = await get_agg(address) or {}
+    last_known = agg.get("last_sig")
+    # Wallets without a cursor start from recent history only
+    depth = SETTINGS.backfill_max_depth if last_known else SETTINGS.backfill_initial_depth
+    return await backfill_wallet(SOL, address, last_known, depth, concurrency=SETTINGS.backfill_concurrency,
+                                 max_parse_attempts=SETTINGS.backfill_parse_attempts, listed=listed)
+
+# Wallets with a push-triggered catch-up waiting for the wallet lock
+PUSH_PENDING: set = set()
+
+async def ingest_signature(address: str, sig: str, attempt: int = 0):
+    # Push path: a signature seen on the websocket triggers the normal
+    # cursor-driven catch-up, so signatures missed while the socket was down
+    # are applied in order and nothing is applied twice. Pushes that arrive
+    # while a catch-up is still waiting for the lock are covered by it.
+    if address in PUSH_PENDING:
+        return
+    PUSH_PENDING.add(address)
+    listed: set = set()
+    try:
+        async with wallet_lock(address):
+            PUSH_PENDING.discard(address)
+            await _poll_wallet(address, listed=listed)
+    except Exception:
+        BACKGROUND_ERRORS.inc(loop="ingest_signature")
+        # Fall back to the poller
+        SCHEDULER.poke(address)
+        return
+    finally:
+        PUSH_PENDING.discard(address)
+    if sig not in listed:
+        # The RPC node hasn't caught up with the socket yet: try again shortly
+        # instead of waiting for the safety-net poll
+        PUSH_RETRIES.inc()
+        if attempt < SETTINGS.ws_retry_attempts:
+            asyncio.get_running_loop().call_later(SETTINGS.ws_retry_delay, lambda: spawn(ingest_signature(address, sig, attempt + 1)))
+        else:
+            SCHEDULER.poke(address)
+
+WS_MODE = SETTINGS.ingest_mode == "ws"
+
+if WS_MODE:
+    # Pushes carry the load; polling is only a slow safety net
+    SCHEDULER = PollScheduler(
+        poll_wallet,
+        base_interval=SETTINGS.ws_poll_interval,
+        min_interval=SETTINGS.ws_poll_interval,
+        max_interval=SETTINGS.ws_poll_interval,
+        concurrency=SETTINGS.poll_concurrency,
+        rate=SETTINGS.poll_rate,
+    )
+else:
+    SCHEDULER = PollScheduler(
+        poll_wallet,
+        base_interval=SETTINGS.poll_interval,
+        min_interval=SETTINGS.poll_min_interval,
+        max_interval=SETTINGS.poll_max_interval,
+        concurrency=SETTINGS.poll_concurrency,
+        rate=SETTINGS.poll_rate,
+    )
+
+def on_ws_reconnect(addresses: list):
+    # Gap-fill anything missed while the socket was down
+    for addr in addresses:
+        SCHEDULER.poke(addr)
+
+LOGS = LogsSubscriber(
+    SETTINGS.ws_rpc,
+    on_signature=lambda addr, sig: spawn(ingest_signature(addr, sig)),
+    on_reconnect=on_ws_reconnect,
+    per_socket=SETTINGS.ws_subs_per_socket,
+)
+
+def start_recording(name: str = "helius") -> Optional[TxRecorder]:
+    # Raw parsed txs + the prices applied, for offline rebuilds with replay.py.
+    # Only the process that parses (bot or tracker worker) records.
+    if not SETTINGS.record_dir:
+        return None
+    recorder = TxRecorder(SETTINGS.record_dir, name=name)
+    PARSER.on_parsed = recorder.record_tx
+    add_swap_listener(recorder.record_prices)
+    return recorder
+
+def watch(address: str, immediate: bool = True):
+    SCHEDULER.add(address, immediate=immediate)
+    if WS_MODE:
+        spawn(LOGS.add(address))
+
+def unwatch(address: str):
+    SCHEDULER.remove(address)
+    WALLET_LOCKS.pop(address, None)
+    if WS_MODE:
+        spawn(LOGS.remove(address))
+
+def on_tracked_change(op: str, address: str):
+    # TRACKED listener (single-process mode); workers get these over their control queue
+    if op == "add":
+        watch(address)
+    else:
+        unwatch(address)
+
+def sync_tracking(addrs: set):
+    # Initial polls are spread out, see PollScheduler.add
+    for addr in addrs - SCHEDULER.addresses():
+        watch(addr, immediate=False)
+    for addr in SCHEDULER.addresses() - addrs:
+        unwatch(addr)
+
+async def resync(shard: Optional[tuple[int, int]] = None):
+    # Reconcile ingestion with tracked_wallets. In the bot process the registry
+    # is reloaded too; a worker only reads the addresses it owns.
+    if shard is None:
+        TRACKED.load(await all_tracks())
+        addrs = TRACKED.addresses()
+    else:
+        addrs = {a for a in await tracked_addresses() if shard_of(a, shard[1]) == shard[0]}
+    sync_tracking(addrs)
+
+async def tracking_manager(shard: Optional[tuple[int, int]] = None):
+    # Runs ingestion for the tracked wallets (shard=(index, count): only the ones
+    # this worker owns). Changes arrive as TRACKED notifications or worker
+    # control messages; the database is only rescanned every
+    # TRACKING_RESYNC_INTERVAL as a safety net.
+    runner = asyncio.create_task(SCHEDULER.run())
+    ws_runner = asyncio.create_task(LOGS.run()) if WS_MODE else None
+    try:
+        if shard is None:
+            # TRACKED was loaded at startup
+            TRACKED.add_listener(on_tracked_change)
+            sync_tracking(TRACKED.addresses())
+        while True:
+            await asyncio.sleep(SETTINGS.tracking_resync_interval)
+            try:
+                await resync(shard)
+            except Exception:
+                BACKGROUND_ERRORS.inc(loop="tracking_manager")
+    finally:
+        runner.cancel()
+        if ws_runner:
+            ws_runner.cancel()
+
+def collect_gauges():
+    # Refreshed on every /metrics scrape
+    g = REGISTRY.gauge
+    st = SCHEDULER.stats()
+    g("tracked_wallets", "Wallets known to the poll scheduler").set(st["wallets"])
+    g("active_pollers", "Wallet polls in flight").set(st["inflight"])
+    g("poll_overdue_wallets", "Wallets past their due time and not yet polled").set(st["overdue"])
+    g("poll_lag_oldest_seconds", "Lag of the most overdue wallet").set(st["lag_oldest"])
+    g("queue_depth", "Items waiting in internal queues").set(PARSER.depth(), queue="helius_parse")
+    g("queue_depth").set(db_stats()["depth"], queue="db_writer")
+    for k, v in TOKEN_CACHE.stats().items():
+        g("token_cache", "DexScreener token cache counters").set(v, stat=k)
+    if WS_MODE:
+        for k, v in LOGS.stats().items():
+            g("ws_ingest", "logsSubscribe ingestion state").set(v, stat=k)
+    for name, ep in SOL.router.stats().items():
+        g("rpc_endpoint_error_rate", "Rolling error rate per RPC endpoint").set(ep["error_rate"], endpoint=name)
+        g("rpc_endpoint_open", "1 while the endpoint's circuit breaker is open").set(int(ep["open"]), endpoint=name)
@@ -0,0 +1,205 @@
+import asyncio, heapq, time, ujson
+from typing import Optional
+from metrics import BACKGROUND_ERRORS
+
+# Sliding-window trending over every committed swap (fed as a swap listener).
+# Per mint: sparse time buckets {bucket: [swaps, usd_volume]} plus each
+# wallet's last active bucket, and cached 1h/6h/24h totals (swaps, distinct
+# wallets, USD volume). Between bucket rollovers totals only grow, so each
+# window keeps a bounded top-K heap updated in place; on rollover expired
+# buckets are dropped, totals recomputed and the heaps rebuilt. Mint state is
+# snapshotted to the database periodically so windows survive restarts.
+
+WINDOWS = {"1h": 3600, "6h": 6 * 3600, "24h": 24 * 3600}
+
+# Quote assets every swap touches; ranking them would drown out real tokens
+QUOTE_MINTS = {
+    "So11111111111111111111111111111111111111112",   # wSOL
+    "EPjFWdd5AufqSSqeM2qN1xzybapC8G4wEGGkZwyTDt1v",  # USDC
+    "Es9vMFrzaCERmJfrF4H2FYD4KCoNkY11McCeFJjvtgLb",  # USDT
+}
+
+class _Mint:
+    __slots__ = ("buckets", "wallets", "sums")
+
+    def __init__(self):
+        self.buckets: dict = {}  # bucket -> [swaps, usd_volume]
+        self.wallets: dict = {}  # address -> last active bucket
+        self.sums = {w: [0, 0, 0.0] for w in WINDOWS}  # swaps, wallets, volume
+
+class TopK:
+    # Bounded min-heap of (score, mint) with lazy deletion: `best` holds each
+    # member's live score, heap entries that don't match it are stale
+    def __init__(self, k: int):
+        self.k = k
+        self.best: dict = {}
+        self._heap: list = []
+
+    def _min(self):
+        while self._heap and self.best.get(self._heap[0][1]) != self._heap[0][0]:
+            heapq.heappop(self._heap)
+        return self._heap[0] if self._heap else None
+
+    def offer(self, mint: str, score: tuple):
+        if mint in self.best:
+            self.best[mint] = score
+            heapq.heappush(self._heap, (score, mint))
+        elif len(self.best) < self.k:
+            self.best[mint] = score
+            heapq.heappush(self._heap, (score, mint))
+        else:
+            low = self._min()
+            if low is not None and score > low[0]:
+                heapq.heappop(self._heap)
+                del self.best[low[1]]
+                self.best[mint] = score
+                heapq.heappush(self._heap, (score, mint))
+        if len(self._heap) > 4 * self.k:
+            self._heap = [(s, m) for m, s in self.best.items()]
+            heapq.heapify(self._heap)
+
+    def rebuild(self, scores):
+        # scores: iterable of (score, mint)
+        top = heapq.nlargest(self.k, scores)
+        self.best = {m: s for s, m in top}
+        self._heap = [(s, m) for s, m in top]
+        heapq.heapify(self._heap)
+
+    def ranked(self) -> list:
+        return sorted(((s, m) for m, s in self.best.items()), reverse=True)
+
+def _score(sums: list) -> tuple:
+    # Distinct wallets first (hardest to fake), then swaps, then volume
+    return (sums[1], sums[0], round(sums[2], 2))
+
+class TrendingEngine:
+    def __init__(self, bucket_seconds: int = 300, k: int = 20, quote_mints=QUOTE_MINTS):
+        self.bucket_seconds = bucket_seconds
+        self.k = k
+        self.quote_mints = set(quote_mints)
+        self.nb = {w: max(1, span // bucket_seconds) for w, span in WINDOWS.items()}
+        self.horizon = max(self.nb.values())
+        self.mints: dict[str, _Mint] = {}
+        self.top = {w: TopK(k) for w in WINDOWS}
+        self.current = int(time.time()) // bucket_seconds
+        self._dirty: set = set()
+        self._expired: set = set()
+        self.swaps = 0
+
+    def _in_window(self, b: int, window: str) -> bool:
+        return b > self.current - self.nb[window]
+
+    def add(self, mint: str, address: str, ts: int, usd: float):
+        b = min(int(ts), int(time.time())) // self.bucket_seconds
+        if b <= self.current - self.horizon:
+            return
+        if b > self.current:
+            self.rollover(b)
+        st = self.mints.get(mint)
+        if st is None:
+            st = self.mints[mint] = _Mint()
+            self._expired.discard(mint)
+        cell = st.buckets.get(b)
+        if cell is None:
+            cell = st.buckets[b] = [0, 0.0]
+        cell[0] += 1
+        cell[1] += usd
+        prev = st.wallets.get(address)
+        if prev is None or prev < b:
+            st.wallets[address] = b
+        for w, sums in st.sums.items():
+            if not self._in_window(b, w):
+                continue
+            sums[0] += 1
+            sums[2] += usd
+            if prev is None or (prev < b and not self._in_window(prev, w)):
+                sums[1] += 1
+            self.top[w].offer(mint, _score(sums))
+        self._dirty.add(mint)
+
+    def on_swaps(self, address: str, results: list):
+        # Swap listener
+        for r in results:
+            usd = max(float(r["in"].get("qty") or 0) * r["in_price"], float(r["out"].get("qty") or 0) * r["out_price"])
+            for leg in (r["in"], r["out"]):
+                mint = leg.get("mint")
+                if mint and mint not in self.quote_mints:
+                    self.add(mint, address, r["ts"], usd)
+            self.swaps += 1
+
+    def _recompute(self, st: _Mint):
+        floor = self.current - self.horizon
+        for b in [b for b in st.buckets if b <= floor]:
+            del st.buckets[b]
+        for a in [a for a, b in st.wallets.items() if b <= floor]:
+            del st.wallets[a]
+        for w, sums in st.sums.items():
+            lo = self.current - self.nb[w]
+            sums[0] = sum(c[0] for b, c in st.buckets.items() if b > lo)
+            sums[2] = sum(c[1] for b, c in st.buckets.items() if b > lo)
+            sums[1] = sum(1 for b in st.wallets.values() if b > lo)
+
+    def rollover(self, bucket: Optional[int] = None):
+        # Advance to `bucket` (default: now), expire old buckets, rebuild top-K
+        bucket = bucket if bucket is not None else int(time.time()) // self.bucket_seconds
+        if bucket < self.current:
+            return
+        self.current = bucket
+        for mint in list(self.mints):
+            st = self.mints[mint]
+            self._recompute(st)
+            if not st.buckets:
+                del self.mints[mint]
+                self._dirty.discard(mint)
+                self._expired.add(mint)
+        for w, top in self.top.items():
+            top.rebuild((_score(st.sums[w]), m) for m, st in self.mints.items() if st.sums[w][0])
+
+    def ranked(self, window: str = "1h") -> list:
+        # [(mint, swaps, wallets, usd_volume)] best first
+        out = []
+        for _, mint in self.top[window].ranked():
+            s = self.mints[mint].sums[window]
+            out.append((mint, s[0], s[1], s[2]))
+        return out
+
+    # ---------------- Snapshots ----------------
+
+    def dump(self) -> tuple[list, list]:
+        # (rows to upsert [(mint, json)], mints to delete) since the last dump
+        rows = []
+        for mint in self._dirty:
+            st = self.mints.get(mint)
+            if st is not None:
+                rows.append((mint, ujson.dumps({"b": [[b, c[0], c[1]] for b, c in st.buckets.items()], "w": st.wallets})))
+        deleted = list(self._expired)
+        self._dirty, self._expired = set(), set()
+        return rows, deleted
+
+    def load(self, rows: list):
+        for mint, data in rows:
+            d = ujson.loads(data)
+            st = _Mint()
+            st.buckets = {int(b): [int(n), float(v)] for b, n, v in d.get("b") or []}
+            st.wallets = {a: int(b) for a, b in (d.get("w") or {}).items()}
+            self.mints[mint] = st
+        self.rollover()
+
+    async def run(self, save, interval: float = 60):
+        # save(rows, deleted) persists a snapshot; rollover on bucket boundaries
+        last_save = time.monotonic()
+        while True:
+            now = time.time()
+            await asyncio.sleep(min(interval, self.bucket_seconds - now % self.bucket_seconds + 0.01))
+            self.rollover()
+            if time.monotonic() - last_save >= interval:
+                last_save = time.monotonic()
+                rows, deleted = self.dump()
+                if rows or deleted:
+                    try:
+                        await save(rows, deleted)
+                    except Exception:
+                        # Keep them dirty for the next attempt
+                        BACKGROUND_ERRORS.inc(loop="trending_snapshot")
+                        self._dirty.update(m for m, _ in rows)
+                        self._expired.update(deleted)
@@ -0,0 +1,176 @@
+import asyncio, multiprocessing, queue, signal, time, zlib
+from typing import Callable
+from settings import SETTINGS
+
+# Sharded tracking (TRACKER_WORKERS=N): the bot process keeps Pyrogram, alerts
+# and maintenance; N spawned tracker processes each own the tracked addresses
+# with shard_of(address, N) == index and run polling / websocket ingestion,
+# parsing and PnL math for them. Workers write aggregates to the database themselves
+# and send every committed swap batch back over a multiprocessing queue, where
+# the bot feeds it to its own swap listeners (alerts etc.).
+# Cursors live in the database, so when the worker count changes all workers are
+# stopped first and the new set resumes each wallet where the old owner left it.
+# Tracked-wallet changes reach the owning worker as ("add"|"remove", address)
+# control messages; a worker reads its shard from the database only at startup
+# and on the slow resync.
+
+def shard_of(address: str, count: int) -> int:
+    # Stable across processes and runs (unlike hash())
+    return zlib.crc32(address.encode()) % count
+
+# ---------------- Worker process ----------------
+
+def worker_main(index: int, count: int, results, control):
+    # Ctrl-C goes to the whole process group; the bot process stops us
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    asyncio.run(_run_worker(index, count, results, control))
+
+async def _run_worker(index: int, count: int, results, control):
+    from helio import start_decoder, close_decoder
+    start_decoder(SETTINGS.helius_decode_workers)
+
+    import tracker
+    from db import init_db, close_db
+    from http_client import close_http
+    from aggregates import add_swap_listener
+    from metrics import REGISTRY, start_server
+
+    await init_db()
+    add_swap_listener(lambda address, res: results.put((address, res)))
+    recorder = tracker.start_recording(name=f"helius-w{index}")
+    recording = asyncio.create_task(recorder.run()) if recorder else None
+    metrics_runner = None
+    if SETTINGS.metrics_port:
+        REGISTRY.add_collector(tracker.collect_gauges)
+        metrics_runner = await start_server(SETTINGS.metrics_host, SETTINGS.metrics_port + 1 + index)
+
+    # Load the shard before handling control messages so queued adds/removes apply on top
+    await tracker.resync(shard=(index, count))
+    manager = asyncio.create_task(tracker.tracking_manager(shard=(index, count)))
+
+    def next_command():
+        try:
+            return control.get(timeout=1)
+        except queue.Empty:
+            return None
+
+    try:
+        while not manager.done():
+            msg = await asyncio.to_thread(next_command)
+            if msg is None:
+                continue
+            if msg[0] == "stop":
+                break
+            if msg[0] == "add":
+                tracker.watch(msg[1])
+            elif msg[0] == "remove":
+                tracker.unwatch(msg[1])
+    finally:
+        manager.cancel()
+        await asyncio.gather(manager, return_exceptions=True)
+        if recording:
+            recording.cancel()
+            await asyncio.gather(recording, return_exceptions=True)
+        if metrics_runner:
+            await metrics_runner.cleanup()
+        await close_http()
+        await tracker.SOL.close()
+        await close_db()
+        close_decoder()
+
+# ---------------- Bot side ----------------
+
+class TrackerPool:
+    def __init__(self, count: int, on_results: Callable[[str, list], None], stop_timeout: float = 15):
+        self.count = count
+        self.on_results = on_results
+        self.stop_timeout = stop_timeout
+        # spawn: workers start from a clean interpreter, not a fork of the bot
+        self._ctx = multiprocessing.get_context("spawn")
+        self._results = self._ctx.Queue()
+        self._procs: list = []
+        self._controls: list = []
+        self._stopping = False
+        self.restarts = 0
+        self.batches = 0
+
+    def _start_one(self, index: int):
+        control = self._ctx.Queue()
+        proc = self._ctx.Process(
+            target=worker_main, args=(index, self.count, self._results, control),
+            name=f"tracker-{index}",
+        )
+        proc.start()
+        self._procs[index] = proc
+        self._controls[index] = control
+
+    def start(self):
+        self._procs = [None] * self.count
+        self._controls = [None] * self.count
+        for i in range(self.count):
+            self._start_one(i)
+
+    def owner(self, address: str) -> int:
+        return shard_of(address, self.count)
+
+    def notify(self, op: str, address: str):
+        # TRACKED listener: forward ("add"|"remove", address) to the owning worker.
+        # A worker being (re)started picks the change up from the database instead.
+        if self._stopping or not self._controls:
+            return
+        control = self._controls[self.owner(address)]
+        if control is not None:
+            control.put((op, address))
+
+    def alive(self) -> int:
+        return sum(1 for p in self._procs if p is not None and p.is_alive())
+
+    def _stop_all(self):
+        self._stopping = True
+        for c in self._controls:
+            if c is not None:
+                c.put(("stop",))
+        deadline = time.monotonic() + self.stop_timeout
+        for p in self._procs:
+            if p is None:
+                continue
+            p.join(max(0.0, deadline - time.monotonic()))
+            if p.is_alive():
+                p.terminate()
+                p.join()
+        self._procs, self._controls = [], []
+        self._stopping = False
+
+    async def stop(self):
+        await asyncio.to_thread(self._stop_all)
+
+    async def resize(self, count: int):
+        # Stop the old set before starting the new one so no wallet is
+        # ever tracked by two workers at once
+        await self.stop()
+        self.count = count
+        self.start()
+
+    def _next_result(self):
+        try:
+            return self._results.get(timeout=1)
+        except queue.Empty:
+            return None
+
+    async def run(self):
+        # Deliver worker results and restart workers that died
+        last_check = time.monotonic()
+        while True:
+            item = await asyncio.to_thread(self._next_result)
+            if item is not None:
+                self.batches += 1
+                try:
+                    self.on_results(*item)
+                except Exception:
+                    pass
+            if not self._stopping and time.monotonic() - last_check >= 5:
+                last_check = time.monotonic()
+                for i, p in enumerate(self._procs):
+                    if p is not None and not p.is_alive():
+                        self.restarts += 1
+                        self._start_one(i)
@@ -0,0 +1,156 @@
+import asyncio, ujson, websockets
+from typing import Callable
+
+# Push ingestion over Solana's logsSubscribe. Each tracked address gets one
+# `mentions` subscription; subscriptions are packed onto a few sockets
+# (per_socket each). On reconnect every socket resubscribes and reports its
+# addresses through on_reconnect so the caller can gap-fill via get_signatures.
+
+class _LogsSocket:
+    def __init__(self, url: str, on_signature: Callable[[str, str], None], on_reconnect: Callable[[list], None]):
+        self.url = url
+        self.on_signature = on_signature
+        self.on_reconnect = on_reconnect
+        self.addresses: set = set()
+        self.ws = None
+        self._next_id = 0
+        self._pending: dict = {}  # request id -> (method, address)
+        self._subs: dict = {}  # subscription id -> address
+        self._sub_of: dict = {}  # address -> subscription id
+        self._connected_once = False
+        self.reconnects = 0
+        self.notifications = 0
+
+    async def _send(self, method: str, params: list, address: str):
+        self._next_id += 1
+        self._pending[self._next_id] = (method, address)
+        await self.ws.send(ujson.dumps({"jsonrpc": "2.0", "id": self._next_id, "method": method, "params": params}))
+
+    async def subscribe(self, address: str):
+        self.addresses.add(address)
+        if self.ws is not None:
+            await self._send("logsSubscribe", [{"mentions": [address]}, {"commitment": "confirmed"}], address)
+
+    async def unsubscribe(self, address: str):
+        self.addresses.discard(address)
+        sub = self._sub_of.pop(address, None)
+        if sub is not None:
+            self._subs.pop(sub, None)
+            if self.ws is not None:
+                await self._send("logsUnsubscribe", [sub], address)
+
+    def _handle(self, raw):
+        msg = ujson.loads(raw)
+        if "id" in msg:
+            method, address = self._pending.pop(msg["id"], (None, None))
+            if method == "logsSubscribe" and isinstance(msg.get("result"), int):
+                if address in self.addresses:
+                    self._subs[msg["result"]] = address
+                    self._sub_of[address] = msg["result"]
+            return
+        if msg.get("method") != "logsNotification":
+            return
+        params = msg.get("params") or {}
+        address = self._subs.get(params.get("subscription"))
+        value = (params.get("result") or {}).get("value") or {}
+        # Failed transactions can't contain a swap; skip them
+        if address and value.get("signature") and value.get("err") is None:
+            self.notifications += 1
+            self.on_signature(address, value["signature"])
+
+    async def run(self):
+        backoff = 1
+        while True:
+            try:
+                async with websockets.connect(self.url, ping_interval=20, ping_timeout=20, max_size=2**22) as ws:
+                    self.ws = ws
+                    self._pending.clear()
+                    self._subs.clear()
+                    self._sub_of.clear()
+                    for address in list(self.addresses):
+                        await self.subscribe(address)
+                    if self._connected_once:
+                        self.reconnects += 1
+                        self.on_reconnect(list(self.addresses))
+                    self._connected_once = True
+                    backoff = 1
+                    async for raw in ws:
+                        try:
+                            self._handle(raw)
+                        except Exception:
+                            continue
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                pass
+            finally:
+                self.ws = None
+            await asyncio.sleep(backoff)
+            backoff = min(60, backoff * 2)
+
+class LogsSubscriber:
+    def __init__(self, url: str, on_signature: Callable[[str, str], None], on_reconnect: Callable[[list], None], per_socket: int = 500):
+        self.url = url
+        self.on_signature = on_signature
+        self.on_reconnect = on_reconnect
+        self.per_socket = max(1, per_socket)
+        self._sockets: list[_LogsSocket] = []
+        self._owner: dict[str, _LogsSocket] = {}
+        self._tasks: list[asyncio.Task] = []
+        self._running = False
+
+    def __contains__(self, address: str) -> bool:
+        return address in self._owner
+
+    def addresses(self) -> set:
+        return set(self._owner)
+
+    def _socket_for_new(self) -> _LogsSocket:
+        for sock in self._sockets:
+            if len(sock.addresses) < self.per_socket:
+                return sock
+        sock = _LogsSocket(self.url, self.on_signature, self.on_reconnect)
+        self._sockets.append(sock)
+        if self._running:
+            self._tasks.append(asyncio.create_task(sock.run()))
+        return sock
+
+    async def add(self, address: str):
+        if address in self._owner:
+            return
+        sock = self._socket_for_new()
+        self._owner[address] = sock
+        try:
+            await sock.subscribe(address)
+        except Exception:
+            # Socket is going down; run() resubscribes everything on reconnect
+            pass
+
+    async def remove(self, address: str):
+        sock = self._owner.pop(address, None)
+        if sock is None:
+            return
+        try:
+            await sock.unsubscribe(address)
+        except Exception:
+            pass
+
+    async def run(self):
+        self._running = True
+        self._tasks = [asyncio.create_task(s.run()) for s in self._sockets]
+        try:
+            while True:
+                await asyncio.sleep(3600)
+        finally:
+            self._running = False
+            for t in self._tasks:
+                t.cancel()
+
+    def stats(self) -> dict:
+        return {
+            "sockets": len(self._sockets),
+            "connected": sum(1 for s in self._sockets if s.ws is not None),
+            "subscriptions": len(self._owner),
+            "notifications": sum(s.notifications for s in self._sockets),
+            "reconnects": sum(s.reconnects for s in self._sockets),
+        }